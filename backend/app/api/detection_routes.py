@@ -1,13 +1,20 @@
 
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse, JSONResponse
-from typing import Iterator
-import time
+import base64, hashlib, time
+from fastapi import APIRouter, Request
+from fastapi.responses import Response, StreamingResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import nullcontext
+from typing import AsyncIterator, Optional
 
 from ..services.camera_service import CameraService
 from ..services.stream_service import StreamService
-from ..services.detection_service import DetectionService
-from ..infrastructure.yolo_model import YoloDetector
+from ..services.detection_service import DetectionService, ClassFilterCache
+from ..services.inference_scheduler import InferenceScheduler
+from ..services.broadcast_hub import BroadcastHub, EncodedFrame, detection_record, normalize_variant
+from ..services.motion_gate import MotionGate
+from ..services.rate_controller import RateController
+from ..core.config import DETECT_RATE_MODE, JPEG_QUALITY
+from ..services.lifecycle import AppLifecycle
 from ..domain.models import CameraIn, CameraOut, ClassesConfig, DeleteResult
 from ..core.logger import get_logger
 
@@ -15,9 +22,18 @@ router = APIRouter()
 log = get_logger("routes")
 
 camera_service = CameraService()
-stream_service = StreamService()
-detector = YoloDetector()
-detection_service = DetectionService(detector, stream_service)
+hub = BroadcastHub()
+# โมเดลยังไม่ถูกโหลดตรงนี้: lifecycle.start() (startup event ของ main) จะโหลด + warm-up ใน background
+inference_scheduler = InferenceScheduler(
+    class_filters=ClassFilterCache(camera_service),
+    motion_gate=MotionGate(),
+    rate_controller=RateController() if DETECT_RATE_MODE == "adaptive" else None,
+)
+stream_service = StreamService(inference_scheduler, hub)
+detection_service = DetectionService(stream_service, hub)
+inference_scheduler.add_listener(detection_service.process)
+inference_scheduler.add_remove_listener(detection_service.forget_camera)
+lifecycle = AppLifecycle(camera_service, stream_service, inference_scheduler)
 
 @router.get("/cameras", response_model=list[CameraOut])
 def list_cameras():
@@ -26,7 +42,11 @@ def list_cameras():
 
 @router.post("/cameras", response_model=CameraOut, status_code=201)
 def add_camera(cam: CameraIn):
-    item = camera_service.add(cam.name, cam.location, cam.protocol, cam.source, cam.detect_classes)
+    item = camera_service.add(
+        cam.name, cam.location, cam.protocol, cam.source, cam.detect_classes,
+        motion_enabled=cam.motion_enabled, motion_sensitivity=cam.motion_sensitivity, motion_mask=cam.motion_mask,
+        priority=cam.priority, min_fps=cam.min_fps, roi=cam.roi, imgsz=cam.imgsz,
+    )
     return item
 
 @router.delete("/cameras/{cam_id}", response_model=DeleteResult)
@@ -45,32 +65,189 @@ def get_global_classes():
     v = camera_service.get_global_classes()
     return ClassesConfig(detect_classes=v or "all")
 
-def mjpeg_generator(cam: dict) -> Iterator[bytes]:
-    w = stream_service.ensure_worker(cam)
+@router.get("/stats")
+def get_stats():
+    detector = lifecycle.detector
+    return {
+        "scheduler": inference_scheduler.stats(),
+        "detectors": detector.stats() if detector is not None else None,
+        "events": detection_service.writer.stats(),
+    }
+
+@router.get("/autotune")
+def get_autotune():
+    from ..infrastructure.model_backends import load_autotune   # import torch เฉพาะตอนเรียก
+
+    detector = lifecycle.detector
+    active = None
+    if detector is not None:
+        active = {
+            "model": detector.model_name,
+            "imgsz": detector.imgsz,
+            "backend": detector.backend,
+            "source": detector.model_source,
+        }
+    return {"active": active, "result": load_autotune()}
+
+async def mjpeg_generator(cam: dict, raw: bool = False, width: int = 0, quality: int = 0) -> AsyncIterator[bytes]:
+    """
+    async generator: ระหว่างรอเฟรมเป็นแค่ coroutine ไม่จอง thread ของ threadpool ต่อผู้ชม
+    (เปิดกล้องครั้งแรกอาจช้า จึงทำใน threadpool ครั้งเดียว)
+    width / quality: ภาพย่อสำหรับ preview (เช่น หน้ารวมหลายกล้อง) encode ครั้งเดียวต่อเฟรม แชร์ทุกผู้ชม
+    """
+    w = await run_in_threadpool(stream_service.ensure_worker, cam)
     boundary = b"--frame"
-    while True:
-        # ถ้า stream ถูกหยุด
-        if not w.running:
-            print(f"Stream {cam['id']} stopped. Exiting generator.")
-            break
-
-        frame = w.get_latest()
-        if frame is None:
-            time.sleep(0.05)
-            continue
-
-        jpg_bytes, _dets = detection_service.process(cam, frame)
-        if not jpg_bytes:
-            continue
-
-        yield boundary + b"\r\n" + b"Content-Type: image/jpeg\r\n\r\n" + jpg_bytes + b"\r\n"
+    last_seq = 0
+    width, quality = normalize_variant(width, quality)
+    full = width == 0 and quality == JPEG_QUALITY
+    # ภาพเต็ม: นับเป็นผู้ชมตลอดอายุ generator → DetectionService จะ encode JPEG ให้กล้องนี้
+    # ภาพย่อ: ไม่ต้อง encode ภาพเต็ม encode เฉพาะขนาดที่ขอจากเฟรมดิบใน hub
+    # raw=True: ภาพไม่วาดกรอบ ให้ browser วาดเองจาก /ws/detections/{cam_id}
+    with hub.viewer(cam["id"], raw=raw) if full else nullcontext():
+        while True:
+            # ถ้า stream ถูกหยุด
+            if not w.running:
+                print(f"Stream {cam['id']} stopped. Exiting generator.")
+                break
+
+            # รอเฟรมใหม่จาก hub (detect + encode แล้ว ใช้ร่วมกับผู้ชมคนอื่น)
+            got = await hub.wait_async(cam["id"], last_seq, timeout=1.0)
+            if got is None:
+                continue
+            last_seq, item = got
+            if full:
+                jpg = item.raw_jpg if raw else item.jpg
+            else:
+                jpg = hub.cached_variant(item, raw, width, quality)
+                if jpg is None:
+                    jpg = await run_in_threadpool(hub.variant, item, raw, width, quality)
+            if not jpg:
+                continue
+
+            yield boundary + b"\r\n" + b"Content-Type: image/jpeg\r\n\r\n" + jpg + b"\r\n"
 
     print(f"Stream {cam['id']} generator closed cleanly.")
 
 
 @router.get("/stream/{cam_id}")
-def stream_mjpeg(cam_id: str):
+def stream_mjpeg(cam_id: str, raw: bool = False, width: int = 0, quality: int = 0):
     cam = camera_service.get(cam_id)
     if not cam:
         return JSONResponse({"detail": "camera not found"}, status_code=404)
-    return StreamingResponse(mjpeg_generator(cam), media_type="multipart/x-mixed-replace; boundary=frame")
+    return StreamingResponse(mjpeg_generator(cam, raw, width, quality), media_type="multipart/x-mixed-replace; boundary=frame")
+
+
+def snapshot_etag(item: EncodedFrame, raw: bool, width: int, quality: int) -> str:
+    # เฟรมเดียวกัน + แบบภาพเดียวกัน = bytes เดียวกัน (ts กัน seq ซ้ำหลัง worker เริ่มใหม่)
+    return f'"{item.seq}-{int(item.ts * 1000)}-{int(raw)}-{width}-{quality}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def snapshot_info(cam_id: str, item: EncodedFrame) -> dict:
+    """
+    ข้อมูลของภาพล่าสุด: อายุ (วินาที) และผล detect ล่าสุด (อาจเป็นของเฟรมก่อนหน้า ถ้าเฟรมนี้ไม่ได้ detect)
+    """
+    now = time.time()
+    last = hub.last_inferred(cam_id)
+    dets = None
+    if last is not None:
+        dets = {**detection_record(last), "age": round(now - last.ts, 3)}
+    return {
+        "cam_id": cam_id,
+        "seq": item.seq,
+        "ts": round(item.ts, 3),
+        "age": round(now - item.ts, 3),
+        "w": item.width,
+        "h": item.height,
+        "inferred": item.inferred,
+        "detections": dets,
+    }
+
+
+def latest_snapshot(cam_id: str) -> Optional[EncodedFrame]:
+    item = hub.latest(cam_id)
+    if item is None or (item.frame is None and not item.jpg):
+        return None
+    return item
+
+
+@router.get("/snapshot/{cam_id}")
+def get_snapshot(
+    request: Request, cam_id: str, raw: bool = False, width: int = 0, quality: int = 0, meta: bool = False,
+):
+    """
+    ภาพล่าสุดของกล้องจาก BroadcastHub (JPEG) ไม่เปิด stream และไม่สั่ง detect เพิ่ม
+    ใช้ภาพที่ encode ไว้แล้วถ้ามี ไม่งั้น encode จากเฟรมดิบครั้งเดียว (แชร์กับผู้ขอแบบเดียวกัน)
+    ส่ง ETag มาด้วย client ที่ poll ส่ง If-None-Match กลับมาจะได้ 304 ถ้ายังเป็นเฟรมเดิม
+    header มีแค่อายุภาพ / จำนวนวัตถุ (X-Frame-Age / X-Detections) ให้ขนาดคงที่ ไม่เกิน buffer ของ proxy
+    meta=1 = JSON อายุภาพ + ผล detect ล่าสุดแบบเต็ม (ไม่มีภาพ)
+    """
+    if not camera_service.get(cam_id):
+        return JSONResponse({"detail": "camera not found"}, status_code=404)
+    item = latest_snapshot(cam_id)
+    if item is None:
+        return JSONResponse({"detail": "no frame yet (stream not running)"}, status_code=503)
+
+    width, quality = normalize_variant(width, quality)
+    info = snapshot_info(cam_id, item)
+    etag = snapshot_etag(item, raw, width, quality)
+    if meta:
+        etag = etag[:-1] + '-meta"'
+    dets = info["detections"]
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "X-Frame-Seq": str(item.seq),
+        "X-Frame-Age": str(info["age"]),
+        "X-Detections": str(len(dets["boxes"])) if dets else "0",
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if meta:
+        return JSONResponse(info, headers=headers)
+
+    jpg = hub.variant(item, raw, width, quality)
+    if not jpg:
+        return JSONResponse({"detail": "encode failed"}, status_code=500)
+    return Response(jpg, media_type="image/jpeg", headers=headers)
+
+
+@router.get("/snapshots")
+def get_snapshots(request: Request, raw: bool = False, width: int = 0, quality: int = 0, images: bool = True):
+    """
+    ภาพล่าสุดของทุกกล้องในครั้งเดียว (JSON, ภาพเป็น base64) สำหรับ dashboard / health check
+    images=false = เอาแค่อายุภาพและผล detect ไม่ encode ภาพ
+    ETag คิดจากเฟรมของทุกกล้อง: 304 ถ้าไม่มีกล้องไหนมีเฟรมใหม่
+    """
+    width, quality = normalize_variant(width, quality)
+    entries = []
+    for cam in camera_service.list():
+        if "id" not in cam:
+            continue
+        item = latest_snapshot(cam["id"])
+        entries.append((cam["id"], item))
+
+    tags = [f"{cam_id}:{snapshot_etag(item, raw, width, quality) if item else '-'}" for cam_id, item in entries]
+    etag = '"' + hashlib.sha1(f"{int(images)}|{'|'.join(tags)}".encode()).hexdigest()[:20] + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    cameras = []
+    for cam_id, item in entries:
+        if item is None:
+            cameras.append({"cam_id": cam_id, "available": False})
+            continue
+        entry = {**snapshot_info(cam_id, item), "available": True}
+        if images:
+            jpg = hub.variant(item, raw, width, quality)
+            entry["jpeg"] = base64.b64encode(jpg).decode() if jpg else None
+        cameras.append(entry)
+    return JSONResponse({"cameras": cameras}, headers=headers)
@@ -1,3 +1,165 @@
+import asyncio, json, struct
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from ..services.broadcast_hub import EncodedFrame, detection_record, normalize_variant
+from ..core.config import WS_VIDEO_MAX_FPS, WS_VIDEO_MAX_INFLIGHT
+from ..core.logger import get_logger
+from .detection_routes import camera_service, hub, stream_service
 
-from fastapi import APIRouter
 router = APIRouter()
+log = get_logger("ws_routes")
+
+
+@router.websocket("/detections/{cam_id}")
+async def detections_ws(websocket: WebSocket, cam_id: str):
+    """
+    ส่ง JSON 1 ข้อความต่อเฟรมที่ detect แล้ว ให้ browser วาดกรอบเองบนภาพจาก /api/stream/{cam_id}?raw=1
+    เฟรมที่ไม่ได้ detect (DETECT_EVERY_N / โมเดลยังไม่พร้อม) ไม่ถูกส่ง ฝั่ง client ใช้กรอบล่าสุดต่อ
+    """
+    cam = camera_service.get(cam_id)
+    if not cam:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+
+    # ผู้ฟังแบบนี้ไม่นับเป็นผู้ชม: ไม่ทำให้ server ต้อง encode JPEG เพิ่ม
+    w = await run_in_threadpool(stream_service.ensure_worker, cam)
+    last_seq = 0
+    try:
+        while w.running:
+            got = await hub.wait_async(cam_id, last_seq, 1.0)
+            if got is None:
+                continue
+            last_seq, item = got
+            if not item.inferred:
+                continue
+            await websocket.send_json(detection_record(item))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        log.warning(f"Detection websocket {cam_id} closed: {e}")
+    finally:
+        log.info(f"Detection websocket {cam_id} disconnected")
+
+
+class VideoClient:
+    """
+    สถานะต่อ client ของ /ws/video: fps / ความกว้าง / quality / raw ที่ขอ และจำนวนเฟรมที่ยังไม่ ack
+    ส่งได้เมื่อ inflight < WS_VIDEO_MAX_INFLIGHT เท่านั้น เฟรมที่มาระหว่างรอจะถูกข้าม (ไม่เข้าคิว)
+    """
+
+    def __init__(self, fps: float, width: int, raw: bool, quality: int = 0):
+        self.fps = WS_VIDEO_MAX_FPS
+        self.width, self.quality = normalize_variant(0, 0)
+        self.raw = raw
+        self.configure({"fps": fps, "width": width, "quality": quality})
+        self.inflight = 0
+        self.credit = asyncio.Event()
+        self.credit.set()
+        self.sent_frames = 0
+
+    def configure(self, msg: dict):
+        if "fps" in msg:
+            fps = float(msg["fps"] or 0)
+            self.fps = min(fps, WS_VIDEO_MAX_FPS) if fps > 0 else WS_VIDEO_MAX_FPS
+        if "width" in msg or "quality" in msg:
+            # ปัดเป็นขั้น client ที่ขอใกล้ๆ กันจะได้ภาพย่อชุดเดียวกัน
+            width = int(msg["width"] or 0) if "width" in msg else self.width
+            quality = int(msg["quality"] or 0) if "quality" in msg else self.quality
+            self.width, self.quality = normalize_variant(width, quality)
+        if "raw" in msg:
+            self.raw = bool(msg["raw"])
+
+    def on_message(self, msg: dict):
+        if "ack" in msg:
+            self.inflight = max(0, self.inflight - 1)
+            self.credit.set()
+        self.configure(msg)
+
+    def on_sent(self):
+        self.sent_frames += 1
+        self.inflight += 1
+        if self.inflight >= WS_VIDEO_MAX_INFLIGHT:
+            self.credit.clear()
+
+
+def video_message(item: EncodedFrame, jpg: bytes) -> bytes:
+    """
+    ข้อความ binary: [ความยาว header 4 ไบต์ big-endian][header JSON][JPEG]
+    w/h ใน header คือขนาดเฟรมต้นทาง (พิกัดเดียวกับ /ws/detections) ไม่ใช่ขนาดภาพที่ย่อแล้ว
+    """
+    header = {"seq": item.seq, "ts": round(item.ts, 3), "w": item.width, "h": item.height, "inferred": item.inferred}
+    head = json.dumps(header, separators=(",", ":")).encode()
+    return struct.pack(">I", len(head)) + head + jpg
+
+
+@router.websocket("/video/{cam_id}")
+async def video_ws(
+    websocket: WebSocket, cam_id: str, fps: float = 0, width: int = 0, quality: int = 0, raw: bool = False,
+):
+    """
+    วิดีโอแบบ binary ต่อ client พร้อม flow control
+
+    - ส่งเฉพาะเฟรมล่าสุดเมื่อ client พร้อม (ack ครบ) เฟรมที่ตกค้างถูกข้าม ไม่สะสมใน buffer
+    - client ส่ง {"ack": seq} หลังแสดงแต่ละเฟรม และเปลี่ยน {"fps", "width", "quality", "raw"} ระหว่างทางได้
+    - ภาพย่อ encode ครั้งเดียวต่อเฟรมต่อขนาด/quality แชร์ทุก client (BroadcastHub.variant)
+    """
+    cam = camera_service.get(cam_id)
+    if not cam:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+
+    client = VideoClient(fps, width, raw, quality)
+    w = await run_in_threadpool(stream_service.ensure_worker, cam)
+
+    async def receive():
+        while True:
+            text = await websocket.receive_text()
+            try:
+                msg = json.loads(text)
+            except ValueError:
+                continue
+            if isinstance(msg, dict):
+                client.on_message(msg)
+
+    receiver = asyncio.create_task(receive())
+    loop = asyncio.get_running_loop()
+    last_seq = 0
+    next_at = 0.0
+    try:
+        while w.running and not receiver.done():
+            try:
+                await asyncio.wait_for(client.credit.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            got = await hub.wait_async(cam_id, last_seq, 1.0)
+            if got is None:
+                continue
+            last_seq, item = got
+            # client ส่วนใหญ่ได้ภาพที่ encode แล้ว ไม่ต้องใช้ thread; ขนาดใหม่ encode ใน threadpool
+            jpg = hub.cached_variant(item, client.raw, client.width, client.quality)
+            if jpg is None:
+                jpg = await run_in_threadpool(hub.variant, item, client.raw, client.width, client.quality)
+            if not jpg:
+                continue
+
+            await websocket.send_bytes(video_message(item, jpg))
+            client.on_sent()
+            next_at = loop.time() + 1.0 / client.fps
+        if not receiver.done():
+            await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        log.warning(f"Video websocket {cam_id} closed: {e}")
+    finally:
+        receiver.cancel()
+        log.info(f"Video websocket {cam_id} disconnected after {client.sent_frames} frames")
@@ -20,17 +20,120 @@ SAVED_DIR = DATA_DIR / "saved"
 DETECT_CLASSES = os.getenv("DETECT_CLASSES", "person")
 MAX_SAVED = int(os.getenv("MAX_SAVED", "30"))
 MODEL_NAME = os.getenv("MODEL_NAME", "yolov8l.pt")
+CPU_MODEL_NAME = os.getenv("CPU_MODEL_NAME", "yolov8n.pt")     # DEVICE=cpu และยังไม่มีผล autotune → ใช้โมเดลเล็กนี้ (ว่าง = ใช้ MODEL_NAME)
 CONF_THRES = float(os.getenv("CONF_THRES", "0.25"))
 IOU_THRES = float(os.getenv("IOU_THRES", "0.45"))
 DEVICE = os.getenv("DEVICE", "cpu")
 NOTIFY_URL = os.getenv("NOTIFY_URL", "").strip()
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", "2"))              # ส่งพร้อมกันได้กี่งาน
+NOTIFY_BACKOFF = float(os.getenv("NOTIFY_BACKOFF", "1.0"))          # วินาที (เพิ่มเท่าตัวทุกครั้งที่ retry)
+NOTIFY_BACKOFF_MAX = float(os.getenv("NOTIFY_BACKOFF_MAX", "300"))
+NOTIFY_TIMEOUT = float(os.getenv("NOTIFY_TIMEOUT", "5"))
+NOTIFY_BATCH_MAX = int(os.getenv("NOTIFY_BATCH_MAX", "1"))          # >1 = ส่งเป็น JSON array (gzip)
+NOTIFY_BATCH_LATENCY = float(os.getenv("NOTIFY_BATCH_LATENCY", "2"))  # รอรวมชุดนานสุดกี่วินาที
+NOTIFY_OUTBOX_MAX = int(os.getenv("NOTIFY_OUTBOX_MAX", "100000"))   # งานค้างใน outbox ได้สูงสุด
+NOTIFY_SUBMIT_TIMEOUT = float(os.getenv("NOTIFY_SUBMIT_TIMEOUT", "0.2"))  # รอ lock ของ outbox ตอน submit ได้กี่วินาที (เกิน = พักในหน่วยความจำ)
+NOTIFY_DEAD_MAX = int(os.getenv("NOTIFY_DEAD_MAX", "1000"))          # งานที่ถูกปฏิเสธถาวร เก็บไว้ตรวจสอบได้สูงสุด
+NOTIFY_DEAD_HOURS = float(os.getenv("NOTIFY_DEAD_HOURS", "168"))     # และเก็บไว้ไม่เกินกี่ชั่วโมง (0 = ไม่จำกัด)
 TZ = os.getenv("TZ", "Asia/Bangkok")
 DETECT_EVERY_N = int(os.getenv("DETECT_EVERY_N", "1"))
 MAX_SAVED_PER_FOLDER = int(os.getenv("MAX_SAVED_PER_FOLDER", "0"))
+MAX_SAVED_MB_PER_FOLDER = float(os.getenv("MAX_SAVED_MB_PER_FOLDER", "0"))   # 0 = ไม่จำกัดขนาดรวม
+MAX_SAVED_AGE_HOURS = float(os.getenv("MAX_SAVED_AGE_HOURS", "0"))           # 0 = ไม่จำกัดอายุ
+RETENTION_POLICIES = os.getenv("RETENTION_POLICIES", "")                      # JSON policy แยกตามโฟลเดอร์
+RETENTION_SWEEP_SECONDS = float(os.getenv("RETENTION_SWEEP_SECONDS", "60"))
+STORAGE_WRITERS = int(os.getenv("STORAGE_WRITERS", "1"))             # thread เขียนไฟล์ภาพ
+STORAGE_QUEUE_SIZE = int(os.getenv("STORAGE_QUEUE_SIZE", "256"))     # ภาพรอเขียนได้สูงสุด
+STORAGE_FSYNC = os.getenv("STORAGE_FSYNC", "none")                  # none | file | dir
+STORAGE_BLOCK_TIMEOUT = float(os.getenv("STORAGE_BLOCK_TIMEOUT", "0"))  # คิวเต็มรอได้กี่วินาที (0 = ทิ้งทันที)
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "64"))         # event รอเซฟ/แจ้งเตือนได้สูงสุด (เต็ม = ทิ้ง event ใหม่)
+DETECT_BATCH_SIZE = int(os.getenv("DETECT_BATCH_SIZE", "8"))
+
+# capture buffer ต่อกล้อง
+CAPTURE_BUFFER_MB = float(os.getenv("CAPTURE_BUFFER_MB", "64"))       # งบหน่วยความจำ ring buffer ต่อกล้อง
+CAPTURE_POLICY = os.getenv("CAPTURE_POLICY", "auto")                 # auto | smooth | latest
+CAPTURE_GRAB_SKIP = os.getenv("CAPTURE_GRAB_SKIP", "0") == "1"        # เฟรมที่ไม่ถึงรอบ DETECT_EVERY_N ใช้ grab() ไม่ decode
+CAPTURE_BACKEND = os.getenv("CAPTURE_BACKEND", "opencv")             # opencv | ffmpeg (สำหรับ URL stream)
+CAPTURE_WIDTH = int(os.getenv("CAPTURE_WIDTH", "0"))                 # ffmpeg: ขนาดที่ decode ออกมา (0 = ตามต้นทาง)
+CAPTURE_HEIGHT = int(os.getenv("CAPTURE_HEIGHT", "0"))
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+
+# คิว inference กลาง (ใช้ร่วมกันทุก StreamWorker)
+INFER_MAX_BATCH = int(os.getenv("INFER_MAX_BATCH", str(DETECT_BATCH_SIZE)))
+INFER_QUEUE_DEPTH = int(os.getenv("INFER_QUEUE_DEPTH", "1"))        # เฟรมค้างต่อกล้อง เกินนี้ทิ้งเฟรมเก่าสุด
+INFER_FAIRNESS = os.getenv("INFER_FAIRNESS", "round_robin")         # round_robin | oldest_first
+INFER_CAMERA_QUOTA = int(os.getenv("INFER_CAMERA_QUOTA", "1"))      # เฟรมสูงสุดต่อกล้องใน 1 batch (round_robin)
+INFER_THREADS = int(os.getenv("INFER_THREADS", "0"))                # thread ที่เรียก inference (0 = เท่า DETECTOR_REPLICAS)
+DETECTOR_REPLICAS = int(os.getenv("DETECTOR_REPLICAS", "1"))        # จำนวนสำเนาโมเดลใน DetectorPool
+TORCH_THREADS_PER_REPLICA = int(os.getenv("TORCH_THREADS_PER_REPLICA", "0"))  # 0 = จำนวน core / replica
+
+# backend ของ inference
+INFER_BACKEND = os.getenv("INFER_BACKEND", "torch")                  # torch | onnx | openvino
+INFER_IMGSZ = int(os.getenv("INFER_IMGSZ", "640"))                   # ขนาดภาพเข้าโมเดล (ใช้ตอน export ด้วย)
+INFER_INT8 = os.getenv("INFER_INT8", "0") == "1"                     # openvino: quantize เป็น INT8
+INFER_INT8_DATA = os.getenv("INFER_INT8_DATA", "coco8.yaml")         # dataset สำหรับ calibrate INT8
+
+# autotune: เลือกโมเดล + imgsz ที่เร็วพอสำหรับเครื่องนี้ (python -m app.services.autotune)
+AUTOTUNE_APPLY = os.getenv("AUTOTUNE_APPLY", "1") == "1"            # ใช้ผลใน data/autotune.json แทน MODEL_NAME/INFER_IMGSZ
+AUTOTUNE_ON_START = os.getenv("AUTOTUNE_ON_START", "0") == "1"      # ยังไม่มีผล (หรือเครื่องเปลี่ยน) → วัดตอนเริ่ม
+AUTOTUNE_MODELS = os.getenv("AUTOTUNE_MODELS", "yolov8n.pt,yolov8s.pt,yolov8m.pt,yolov8l.pt")  # เรียงจากเล็ก → แม่นสุด
+AUTOTUNE_IMGSZ = os.getenv("AUTOTUNE_IMGSZ", "320,480,640")
+AUTOTUNE_TARGET_MS = float(os.getenv("AUTOTUNE_TARGET_MS", "500"))  # เวลาสูงสุดที่ยอมให้ detect ครบทุกกล้อง 1 รอบ
+AUTOTUNE_CAMERAS = int(os.getenv("AUTOTUNE_CAMERAS", "0"))          # 0 = นับจาก cameras.json
+AUTOTUNE_RUNS = int(os.getenv("AUTOTUNE_RUNS", "5"))
+
+# การเริ่มระบบ
+AUTOSTART_CAMERAS = os.getenv("AUTOSTART_CAMERAS", "0") == "1"       # เปิดทุกกล้องตอนเริ่ม (ไม่ต้องรอคนเปิดดู)
+CAMERA_START_WORKERS = int(os.getenv("CAMERA_START_WORKERS", "8"))   # เปิดกล้องพร้อมกันได้กี่ตัว
+WARMUP_WIDTH = int(os.getenv("WARMUP_WIDTH", str(CAPTURE_WIDTH or 1280)))    # ขนาดภาพ warm-up (ควรเท่ากล้อง)
+WARMUP_HEIGHT = int(os.getenv("WARMUP_HEIGHT", str(CAPTURE_HEIGHT or 720)))
+
+# tracking + การเซฟ/แจ้งเตือนตาม track
+TRACKER = os.getenv("TRACKER", "bytetrack.yaml")                     # bytetrack.yaml | botsort.yaml | path ของ yaml
+TRACKER_FRAME_RATE = int(os.getenv("TRACKER_FRAME_RATE", "30"))      # ใช้คำนวณอายุ track ที่หายไป
+EVENT_POLICY = os.getenv("EVENT_POLICY", "track")                    # track = เซฟครั้งเดียวต่อ track ใหม่ | interval = ทุก EVENT_INTERVAL วินาที
+EVENT_INTERVAL = float(os.getenv("EVENT_INTERVAL", "5"))             # วินาที (โหมด interval หรือเมื่อไม่มี track id)
+EVENT_BEST_CONF_DELTA = float(os.getenv("EVENT_BEST_CONF_DELTA", "0"))  # >0 = เซฟซ้ำเมื่อ conf ของ track เดิมสูงขึ้นเกินค่านี้
+TRACK_FORGET_SECONDS = float(os.getenv("TRACK_FORGET_SECONDS", "60"))   # ลืม track ที่ไม่เห็นนานเกินนี้
+
+# อัตรา detect ต่อกล้อง
+DETECT_RATE_MODE = os.getenv("DETECT_RATE_MODE", "fixed")            # fixed = ใช้ DETECT_EVERY_N | adaptive = ปรับตามเวลา inference จริง
+DETECT_TARGET_UTIL = float(os.getenv("DETECT_TARGET_UTIL", "0.8"))   # adaptive: ใช้ความจุ inference ไม่เกินสัดส่วนนี้
+DETECT_MAX_FPS = float(os.getenv("DETECT_MAX_FPS", "15"))            # adaptive: เพดาน detect/วินาที ต่อกล้อง
+DETECT_MIN_FPS = float(os.getenv("DETECT_MIN_FPS", "0.5"))           # adaptive: ขั้นต่ำต่อกล้อง (ตั้ง min_fps ต่อกล้องได้)
+DETECT_RATE_UPDATE_SECONDS = float(os.getenv("DETECT_RATE_UPDATE_SECONDS", "1"))  # คำนวณส่วนแบ่งใหม่ทุกกี่วินาที
+
+# motion gate: detect เต็มเฉพาะเมื่อภาพมีการเคลื่อนไหว (ตั้งแยกกล้องได้ใน cameras.json)
+MOTION_GATE = os.getenv("MOTION_GATE", "0") == "1"
+MOTION_WIDTH = int(os.getenv("MOTION_WIDTH", "160"))                 # ย่อภาพเหลือกว้างเท่านี้ก่อนเทียบ
+MOTION_SENSITIVITY = float(os.getenv("MOTION_SENSITIVITY", "0.5"))   # 0..1 มาก = ไวขึ้น
+MOTION_PIXEL_DELTA = int(os.getenv("MOTION_PIXEL_DELTA", "25"))      # ค่าความสว่างต่างกันเกินนี้ = pixel เปลี่ยน
+MOTION_BG_ALPHA = float(os.getenv("MOTION_BG_ALPHA", "0.05"))        # ความเร็วที่ background ปรับตามภาพ
+MOTION_KEEPALIVE_SECONDS = float(os.getenv("MOTION_KEEPALIVE_SECONDS", "10"))  # ภาพนิ่งก็ detect อย่างน้อยทุกกี่วินาที
+MOTION_HOLD_SECONDS = float(os.getenv("MOTION_HOLD_SECONDS", "2"))   # detect ต่ออีกกี่วินาทีหลังการเคลื่อนไหวหยุด
+
+# วิดีโอผ่าน WebSocket (/ws/video/{cam_id})
+WS_VIDEO_MAX_FPS = float(os.getenv("WS_VIDEO_MAX_FPS", "15"))       # fps สูงสุดต่อ client (client ขอต่ำกว่านี้ได้)
+WS_VIDEO_MAX_INFLIGHT = int(os.getenv("WS_VIDEO_MAX_INFLIGHT", "2"))  # เฟรมที่ส่งไปแล้วแต่ client ยังไม่ ack ได้สูงสุด
+
+# encode ภาพสำหรับดูสด (MJPEG ?width=&quality= / WebSocket)
+JPEG_ENCODER = os.getenv("JPEG_ENCODER", "auto")                     # auto | turbojpeg | opencv (auto = turbojpeg ถ้าติดตั้ง)
+JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", "80"))                  # ค่าเริ่มต้นของภาพสดและรูปที่เซฟ
+STREAM_WIDTH_STEP = int(os.getenv("STREAM_WIDTH_STEP", "160"))       # ปัดความกว้างที่ขอลงเป็นขั้น ให้ client ใช้ภาพย่อชุดเดียวกัน
+STREAM_QUALITY_STEP = int(os.getenv("STREAM_QUALITY_STEP", "10"))    # ปัด quality ที่ขอเป็นขั้นเช่นกัน
 
 # ไฟล์ JSON เก็บ config กล้อง
 CAMERAS_JSON = DATA_DIR / "cameras.json"
 
+# โมเดลที่ export แล้ว (ONNX / OpenVINO) เก็บไว้ใช้ซ้ำ
+MODEL_CACHE_DIR = DATA_DIR / "models"
+
+# ผล autotune ล่าสุด
+AUTOTUNE_PATH = DATA_DIR / "autotune.json"
+
+# outbox ของ webhook (SQLite) งานที่ยังส่งไม่สำเร็จอยู่ในนี้
+NOTIFY_OUTBOX_PATH = DATA_DIR / "notify_outbox.sqlite3"
+
 # สร้างโฟลเดอร์ถ้ายังไม่มี
 for d in [DATA_DIR, SAVED_DIR]:
     d.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,104 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Detections:
+    """
+    ผล detect ของ 1 เฟรมในรูป numpy array (ไม่มี object ต่อกล่อง)
+
+    boxes:     (N, 4) float32 xyxy หน่วยพิกเซลของเฟรมต้นฉบับ
+    scores:    (N,)   float32
+    class_ids: (N,)   int32
+    track_ids: (N,)   int32  (-1 = ไม่มี track id)
+    """
+    boxes: np.ndarray
+    scores: np.ndarray
+    class_ids: np.ndarray
+    track_ids: np.ndarray
+    names: dict = field(default_factory=dict, compare=False, repr=False)
+
+    def __post_init__(self):
+        # แชร์ข้าม thread (hub / websocket) ได้โดยไม่ต้อง copy
+        for a in (self.boxes, self.scores, self.class_ids, self.track_ids):
+            a.flags.writeable = False
+
+    @classmethod
+    def empty(cls, names: Optional[dict] = None) -> "Detections":
+        return cls(
+            np.zeros((0, 4), np.float32),
+            np.zeros(0, np.float32),
+            np.zeros(0, np.int32),
+            np.zeros(0, np.int32),
+            names or {},
+        )
+
+    @classmethod
+    def from_result(cls, result, names: dict) -> "Detections":
+        """
+        แปลงผลของ ultralytics (1 เฟรม) ด้วยการย้าย tensor มา CPU ครั้งเดียว
+        คอลัมน์ของ boxes.data: x1 y1 x2 y2 [track_id] conf cls
+        """
+        boxes = getattr(result, "boxes", None)
+        if boxes is None or len(boxes) == 0:
+            return cls.empty(names)
+        data = boxes.data.cpu().numpy()
+        tracked = data.shape[1] == 7
+        return cls(
+            np.ascontiguousarray(data[:, :4], dtype=np.float32),
+            data[:, -2].astype(np.float32),
+            data[:, -1].astype(np.int32),
+            data[:, 4].astype(np.int32) if tracked else np.full(len(data), -1, np.int32),
+            names,
+        )
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    @property
+    def has_tracks(self) -> bool:
+        return bool((self.track_ids >= 0).any())
+
+    def label(self, i: int) -> str:
+        cls_id = int(self.class_ids[i])
+        return self.names.get(cls_id, str(cls_id))
+
+    def scaled(self, factor: float) -> "Detections":
+        """กล่องในพิกัดของภาพที่ถูกย่อ/ขยาย factor เท่า (ใช้วาดบนภาพย่อ)"""
+        if factor == 1.0:
+            return self
+        return Detections(self.boxes * np.float32(factor), self.scores, self.class_ids, self.track_ids, self.names)
+
+    def select(self, mask: np.ndarray) -> "Detections":
+        return Detections(self.boxes[mask], self.scores[mask], self.class_ids[mask], self.track_ids[mask], self.names)
+
+    def to_tuples(self) -> List[tuple]:
+        """
+        รูปแบบเดิม [(cls_id, name, conf, (x1, y1, x2, y2), track_id | None), ...]
+        """
+        boxes = self.boxes.astype(int).tolist()
+        return [
+            (c, self.names.get(c, str(c)), s, tuple(b), t if t >= 0 else None)
+            for c, s, b, t in zip(self.class_ids.tolist(), self.scores.tolist(), boxes, self.track_ids.tolist())
+        ]
+
+    def to_dicts(self) -> List[dict]:
+        """สำหรับส่งเป็น JSON"""
+        return [
+            {"cls": c, "name": name, "conf": round(s, 4), "box": list(b), "track_id": t}
+            for c, name, s, b, t in self.to_tuples()
+        ]
+
+    def to_columns(self) -> dict:
+        """
+        รูปแบบกะทัดรัดสำหรับ /ws/detections: แยกเป็นคอลัมน์ ไม่มี key ซ้ำต่อกล่อง
+        track = -1 คือไม่มี track id
+        """
+        return {
+            "boxes": self.boxes.round().astype(np.int32).tolist(),
+            "cls": self.class_ids.tolist(),
+            "labels": [self.names.get(c, str(c)) for c in self.class_ids.tolist()],
+            "conf": np.round(self.scores.astype(np.float64), 3).tolist(),
+            "track": self.track_ids.tolist(),
+        }
@@ -1,6 +1,6 @@
 
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import List, Optional, Literal, Union
 
 Protocol = Literal["usb", "rtsp", "rtmp", "http", "hls"]
 
@@ -10,6 +10,15 @@ class CameraIn(BaseModel):
     protocol: Protocol
     source: str = Field(..., description="ลิ้ง/พาธวิดีโอ เช่น rtsp://..., /dev/video0 หรือ 0")
     detect_classes: Optional[str] = Field(None, description="คอมม่าคั่น หรือ 'all' (ว่าง=ใช้ค่ากลางจาก .env)")
+    motion_enabled: Optional[bool] = Field(None, description="detect เฉพาะเมื่อภาพเคลื่อนไหว (ว่าง=ใช้ MOTION_GATE)")
+    motion_sensitivity: Optional[float] = Field(None, ge=0, le=1, description="0..1 มาก=ไวขึ้น (ว่าง=ใช้ MOTION_SENSITIVITY)")
+    motion_mask: Optional[List[List[List[float]]]] = Field(None, description="polygon ที่ไม่ต้องสนใจ [[[x, y], ...], ...] พิกัด 0..1")
+    priority: Optional[float] = Field(None, gt=0, description="น้ำหนักส่วนแบ่ง detect (DETECT_RATE_MODE=adaptive, ว่าง=1)")
+    min_fps: Optional[float] = Field(None, ge=0, description="detect/วินาที ขั้นต่ำ (ว่าง=ใช้ DETECT_MIN_FPS)")
+    roi: Optional[List[Union[List[float], List[List[float]]]]] = Field(
+        None, description="พื้นที่ที่สนใจ: สี่เหลี่ยม [x1, y1, x2, y2] หรือ polygon [[x, y], ...] พิกัด 0..1 (ว่าง=ทั้งภาพ)"
+    )
+    imgsz: Optional[int] = Field(None, ge=32, le=1920, description="ขนาดภาพเข้าโมเดลของกล้องนี้ (ว่าง=ค่าของโมเดล)")
 
 class CameraOut(CameraIn):
     id: str
@@ -0,0 +1,102 @@
+import copy
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from ..core.logger import get_logger
+
+log = get_logger("roi")
+
+
+@dataclass(frozen=True)
+class Roi:
+    """
+    พื้นที่ที่สนใจของกล้อง: สี่เหลี่ยม/polygon หลายอัน พิกัด 0..1 ของภาพ
+
+    - crop_box(): สี่เหลี่ยมเล็กสุดที่ครอบทุกอัน (หน่วยพิกเซล) ใช้ตัดภาพก่อนส่งเข้าโมเดล
+    - contains(): จุดไหนอยู่ในอันใดอันหนึ่ง ใช้คัดกล่องที่จุดกึ่งกลางอยู่นอก polygon ออก
+    """
+    polygons: Tuple[np.ndarray, ...]   # แต่ละอัน (K, 2) float32 พิกัด 0..1
+    pad: float = 0.02                  # ขยายกรอบ crop เผื่อวัตถุคร่อมขอบ (สัดส่วนของภาพ)
+
+    def crop_box(self, width: int, height: int) -> Tuple[int, int, int, int]:
+        pts = np.concatenate(self.polygons)
+        x1, y1 = np.clip(pts.min(axis=0) - self.pad, 0.0, 1.0)
+        x2, y2 = np.clip(pts.max(axis=0) + self.pad, 0.0, 1.0)
+        box = (int(x1 * width), int(y1 * height), int(np.ceil(x2 * width)), int(np.ceil(y2 * height)))
+        if box[2] - box[0] < 2 or box[3] - box[1] < 2:
+            return 0, 0, width, height
+        return box
+
+    def contains(self, points: np.ndarray, width: int, height: int) -> np.ndarray:
+        """
+        points: (N, 2) พิกัดพิกเซลของภาพเต็ม คืน bool mask (N,)
+        """
+        if len(points) == 0:
+            return np.zeros(0, bool)
+        norm = points / np.array([width, height], np.float32)
+        inside = np.zeros(len(points), bool)
+        for poly in self.polygons:
+            inside |= _points_in_polygon(norm, poly)
+        return inside
+
+
+def _points_in_polygon(points: np.ndarray, poly: np.ndarray) -> np.ndarray:
+    # ray casting แบบ vectorized: นับจำนวนขอบที่เส้นแนวนอนจากจุดไปทางขวาตัดผ่าน
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = poly[:, 0], poly[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_at = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return ((crosses & (x < x_at)).sum(axis=1) % 2) == 1
+
+
+def parse_roi(value) -> Optional[Roi]:
+    """
+    แปลงค่า "roi" ใน cameras.json เป็น Roi (None = ใช้ทั้งภาพ)
+    แต่ละอันเป็นสี่เหลี่ยม [x1, y1, x2, y2] หรือ polygon [[x, y], ...] พิกัด 0..1
+    """
+    if not value:
+        return None
+    polygons: List[np.ndarray] = []
+    for item in value:
+        try:
+            if len(item) == 4 and all(isinstance(v, (int, float)) for v in item):
+                x1, y1, x2, y2 = item
+                poly = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+            else:
+                poly = [[float(x), float(y)] for x, y in item]
+        except (TypeError, ValueError):
+            log.warning(f"Invalid ROI entry ignored: {item}")
+            continue
+        if len(poly) >= 3:
+            polygons.append(np.clip(np.array(poly, np.float32), 0.0, 1.0))
+    return Roi(tuple(polygons)) if polygons else None
+
+
+class RoiCache:
+    """
+    เก็บ Roi ที่ parse แล้วต่อกล้อง parse ใหม่เฉพาะเมื่อค่า "roi" ใน config เปลี่ยน
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cache: Dict[str, tuple] = {}   # cam_id -> (ค่า roi ดิบ, Roi | None)
+
+    def for_camera(self, cam: dict) -> Optional[Roi]:
+        raw = cam.get("roi")
+        with self.lock:
+            hit = self.cache.get(cam["id"])
+            if hit is not None and hit[0] == raw:
+                return hit[1]
+        roi = parse_roi(raw)
+        with self.lock:
+            self.cache[cam["id"]] = (copy.deepcopy(raw), roi)
+        if roi is not None:
+            log.info(f"ROI for {cam['id']}: {len(roi.polygons)} region(s)")
+        return roi
+
+    def invalidate(self, cam_id: str):
+        with self.lock:
+            self.cache.pop(cam_id, None)
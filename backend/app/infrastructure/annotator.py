@@ -0,0 +1,41 @@
+import cv2
+import numpy as np
+from ..domain.detections import Detections
+
+TRACKED_COLOR = (0, 255, 0)
+UNTRACKED_COLOR = (255, 0, 0)
+
+
+def annotate(frame_bgr: np.ndarray, dets: Detections) -> np.ndarray:
+    """
+    วาดกรอบ + ป้าย (ชื่อ track_id conf) ลงบนสำเนาของเฟรม
+    ไม่มีวัตถุ → คืนเฟรมเดิม (ไม่ copy) เรียกเฉพาะตอนมีคนต้องใช้ภาพจริง (ผู้ชม / เซฟรูป)
+    """
+    if len(dets) == 0:
+        return frame_bgr
+
+    annotated = frame_bgr.copy()
+    h, w = annotated.shape[:2]
+    thickness = max(1, int(min(h, w) / 1000))   # เส้นบาง
+    font_scale = min(h, w) / 500               # ตัวอักษรเล็กลงเล็กน้อย
+
+    boxes = dets.boxes.astype(np.int32).tolist()
+    for (x1, y1, x2, y2), cls_id, conf, track_id in zip(
+        boxes, dets.class_ids.tolist(), dets.scores.tolist(), dets.track_ids.tolist()
+    ):
+        color = TRACKED_COLOR if track_id >= 0 else UNTRACKED_COLOR
+        name = dets.names.get(cls_id, str(cls_id))
+        label = f"{name} {track_id if track_id >= 0 else '-'} {conf:.2f}"
+
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), color, thickness)
+        cv2.putText(
+            annotated,
+            label,
+            (x1 + 2, max(20, y1 - 8)),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            font_scale,
+            color,
+            thickness,
+            lineType=cv2.LINE_AA,
+        )
+    return annotated
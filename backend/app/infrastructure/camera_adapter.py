@@ -1,46 +1,303 @@
 import cv2
 import time
+import shutil
 import threading
-from queue import Queue
-from typing import Optional
+import subprocess
+import numpy as np
+from collections import deque
+from typing import Optional, Tuple
+from ..core.config import (
+    CAPTURE_BUFFER_MB, CAPTURE_POLICY, CAPTURE_GRAB_SKIP, CAPTURE_BACKEND,
+    CAPTURE_WIDTH, CAPTURE_HEIGHT, FFMPEG_BIN, DETECT_EVERY_N,
+)
 from ..core.logger import get_logger
 
 log = get_logger("camera_adapter")
 
+CAPTURE_POLICIES = ("smooth", "latest")
+
+
+class GrabSkippingCapture:
+    """
+    ห่อ cv2.VideoCapture: read() จะ grab() ทิ้ง n-1 เฟรมก่อน แล้วค่อย read() เฟรมที่ n
+    grab() แค่ดึง packet ถัดไป ไม่ต้องแปลงสีเป็น BGR และไม่ต้อง copy ภาพออกมา
+    """
+
+    def __init__(self, cap, every_n: int):
+        self.cap = cap
+        self.every_n = max(1, every_n)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, image=None):
+        for _ in range(self.every_n - 1):
+            if not self.cap.grab():
+                return False, None
+        return self.cap.read(image) if image is not None else self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class FFmpegPipeCapture:
+    """
+    อ่านภาพผ่าน ffmpeg subprocess: decode + ย่อเป็นขนาดที่ใช้ inference แล้วส่ง BGR ดิบผ่าน pipe
+    ใช้แทน cv2.VideoCapture ได้ (isOpened / read / release)
+
+    - width/height = 0 ใช้ขนาดต้นทาง (ต้องมี ffprobe)
+    - every_n > 1 ให้ ffmpeg เลือกเฉพาะทุกๆ n เฟรม (select filter) เฟรมที่เหลือไม่ถูก scale/แปลงสี/ส่งออกมา
+    - ffmpeg จบเอง (RTSP หลุด ฯลฯ) → log exit code + stderr แล้วเปิดใหม่แบบ backoff
+      (restart_min → เพิ่มเท่าตัวจนถึง restart_max, กลับเป็น restart_min เมื่ออ่านเฟรมได้อีกครั้ง)
+    """
+
+    def __init__(
+        self,
+        source: str,
+        width: int = 0,
+        height: int = 0,
+        every_n: int = 1,
+        restart_min: float = 1.0,
+        restart_max: float = 30.0,
+    ):
+        self.source = source
+        self.every_n = max(1, every_n)
+        self.width, self.height = self._resolve_size(source, width, height)
+        self.frame_bytes = self.width * self.height * 3
+        self.restart_min = restart_min
+        self.restart_max = max(restart_min, restart_max)
+        self.backoff = restart_min
+        self.restart_at = 0.0
+        self.restarts = 0
+        self.stderr_tail: deque = deque(maxlen=20)
+        self.closed = False
+        self.proc: Optional[subprocess.Popen] = None
+        self._spawn()
+        log.info(f"FFmpeg pipe opened: {source} → {self.width}x{self.height} (every {self.every_n} frame)")
+
+    def _spawn(self):
+        self.proc = subprocess.Popen(
+            self._command(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=self.frame_bytes,
+        )
+        threading.Thread(target=self._drain_stderr, args=(self.proc,), name="ffmpeg-stderr", daemon=True).start()
+
+    def _drain_stderr(self, proc: subprocess.Popen):
+        # อ่าน stderr ตลอด (กัน pipe เต็มจน ffmpeg ค้าง) เก็บบรรทัดท้ายๆ ไว้ log ตอน ffmpeg จบ
+        for raw in iter(proc.stderr.readline, b""):
+            line = raw.decode("utf-8", "replace").rstrip()
+            if line:
+                self.stderr_tail.append(line)
+                log.warning(f"ffmpeg [{self.source}]: {line}")
+        proc.stderr.close()
+
+    def _on_exit(self):
+        """ffmpeg จบแล้ว: log exit code แล้วตั้งเวลาเปิดใหม่"""
+        proc, self.proc = self.proc, None
+        try:
+            code = proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            code = proc.wait()
+        proc.stdout.close()
+        tail = " | ".join(list(self.stderr_tail)[-3:])
+        log.warning(
+            f"FFmpeg for {self.source} exited with code {code}"
+            f"{f' ({tail})' if tail else ''}; restarting in {self.backoff:.0f}s"
+        )
+        self.restart_at = time.time() + self.backoff
+        self.backoff = min(self.backoff * 2, self.restart_max)
+
+    def _resolve_size(self, source: str, width: int, height: int) -> Tuple[int, int]:
+        if width > 0 and height > 0:
+            return width, height
+        src_w, src_h = self._probe_size(source)
+        if width > 0:
+            height = int(round(src_h * width / src_w / 2)) * 2
+        elif height > 0:
+            width = int(round(src_w * height / src_h / 2)) * 2
+        else:
+            width, height = src_w, src_h
+        return width, height
+
+    def _probe_size(self, source: str) -> Tuple[int, int]:
+        ffprobe = shutil.which("ffprobe")
+        if not ffprobe:
+            raise RuntimeError("ffprobe not found; set CAPTURE_WIDTH and CAPTURE_HEIGHT for the ffmpeg backend")
+        out = subprocess.run(
+            [ffprobe, "-v", "error", "-select_streams", "v:0",
+             "-show_entries", "stream=width,height", "-of", "csv=p=0:s=x", source],
+            capture_output=True, text=True, timeout=20,
+        )
+        try:
+            w, h = out.stdout.strip().splitlines()[0].split("x")[:2]
+            return int(w), int(h)
+        except Exception:
+            raise RuntimeError(f"ffprobe cannot read video size of {source}")
+
+    def _command(self) -> list:
+        cmd = [FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-nostdin"]
+        if self.source.startswith("rtsp://"):
+            cmd += ["-rtsp_transport", "tcp"]
+        filters = []
+        if self.every_n > 1:
+            filters.append(f"select=not(mod(n\\,{self.every_n}))")
+        filters.append(f"scale={self.width}:{self.height}")
+        cmd += [
+            "-i", self.source, "-an", "-sn",
+            "-vf", ",".join(filters), "-vsync", "0",
+            "-pix_fmt", "bgr24", "-f", "rawvideo", "pipe:1",
+        ]
+        return cmd
+
+    def isOpened(self) -> bool:
+        # ระหว่างรอเปิดใหม่ยังนับว่าเปิดอยู่ (read() จะคืน False จนกว่า ffmpeg ตัวใหม่ส่งภาพ)
+        return not self.closed and (self.proc is None or self.proc.poll() is None)
+
+    def read(self, image: Optional[np.ndarray] = None):
+        if self.closed:
+            return False, None
+        if self.proc is None:
+            if time.time() < self.restart_at:
+                return False, None
+            self.restarts += 1
+            log.info(f"Restarting ffmpeg for {self.source} (restart #{self.restarts})")
+            self._spawn()
+        shape = (self.height, self.width, 3)
+        if image is None or image.shape != shape or image.dtype != np.uint8:
+            image = np.empty(shape, dtype=np.uint8)
+        # อ่าน bytes ลง buffer ปลายทางโดยตรง (ไม่ copy ซ้ำ)
+        view = memoryview(image.reshape(-1))
+        got = 0
+        while got < self.frame_bytes:
+            n = self.proc.stdout.readinto(view[got:])
+            if not n:
+                # stdout ปิด = ffmpeg จบแล้ว (หรือกำลังจบ)
+                if not self.closed:
+                    self._on_exit()
+                return False, None
+            got += n
+        self.backoff = self.restart_min
+        self.restart_at = 0.0
+        return True, image
+
+    def release(self):
+        self.closed = True
+        proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        try:
+            proc.terminate()
+            proc.wait(timeout=3)
+        except Exception:
+            proc.kill()
+
+
 class SmoothBufferedCamera:
-    def __init__(self, source: str, buffer_seconds: int = 5, target_fps: int = 25):
+    """
+    อ่านภาพจาก stream ด้วย thread แยก แล้วเก็บลง ring buffer (numpy) ที่จองไว้ล่วงหน้า
+
+    - ขนาด buffer = min(buffer_seconds * target_fps, buffer_mb / ขนาดเฟรม) ไม่เกินงบหน่วยความจำต่อกล้อง
+    - policy "smooth": คืนเฟรมตามลำดับ และคุมจังหวะตาม target_fps (เล่นลื่น เหมาะกับ HLS)
+    - policy "latest": คืนเฟรมล่าสุดทันทีที่มีเฟรมใหม่ (หน่วงต่ำ เหมาะกับ RTSP)
+    - ไม่มีการหน่วงรอ pre-buffer ตอนเปิดกล้อง
+    - decode_every_n > 1: decode แค่ทุกๆ n เฟรม (opencv ใช้ grab(), ffmpeg ใช้ select filter)
+    """
+
+    def __init__(
+        self,
+        source: str,
+        buffer_seconds: int = 5,
+        target_fps: int = 25,
+        policy: str = "smooth",
+        buffer_mb: float = CAPTURE_BUFFER_MB,
+        decode_every_n: int = 1,
+        backend: str = CAPTURE_BACKEND,
+    ):
+        if policy not in CAPTURE_POLICIES:
+            log.warning(f"Unknown capture policy '{policy}', using smooth")
+            policy = "smooth"
+
         self.source = source
-        self.cap = self._open_capture(source)
-        self.buffer = Queue(maxsize=buffer_seconds * target_fps)
+        self.decode_every_n = max(1, decode_every_n)
+        self.cap = self._open_capture(source, backend)
+        self.policy = policy
+        self.fps = target_fps / self.decode_every_n
+        self.max_frames = max(2, buffer_seconds * target_fps)
+        self.budget_bytes = int(buffer_mb * 1024 * 1024)
+
+        self._ring: Optional[np.ndarray] = None
+        self._written = 0        # จำนวนเฟรมที่เขียนลง ring แล้วทั้งหมด
+        self._read_pos = 0       # ตำแหน่งอ่านถัดไป (smooth)
+        self._last_seen = 0      # เฟรมล่าสุดที่คืนไปแล้ว (latest)
+        self._next_due = 0.0
+        self._cond = threading.Condition()
+
         self.running = True
-        self.fps = target_fps
         self.thread = threading.Thread(target=self._reader, daemon=True)
         self.thread.start()
-        log.info(f"🎥 Buffered camera initialized (delay ~{buffer_seconds}s, {target_fps} FPS)")
+        log.info(f"🎥 Buffered camera initialized (policy {policy}, {target_fps} FPS, budget {buffer_mb:.0f} MB)")
 
-    def _open_capture(self, source: str):
+    def _open_capture(self, source: str, backend: str):
         """พยายามเปิดกล้องด้วย backend ปกติ ถ้าไม่ได้ fallback ไป CAP_FFMPEG"""
+        if backend == "ffmpeg":
+            cap = FFmpegPipeCapture(source, CAPTURE_WIDTH, CAPTURE_HEIGHT, self.decode_every_n)
+            if not cap.isOpened():
+                raise RuntimeError(f"Cannot open source with ffmpeg: {source}")
+            return cap
+
         cap = cv2.VideoCapture(source)
         if not cap.isOpened():
             log.warning(f"Default backend failed for {source}, retrying with FFMPEG...")
             cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG)
         if not cap.isOpened():
             raise RuntimeError(f"Cannot open source: {source}")
+        if self.decode_every_n > 1:
+            cap = GrabSkippingCapture(cap, self.decode_every_n)
         return cap
 
+    def _allocate(self, frame: np.ndarray):
+        """จอง ring ตามขนาดเฟรมจริง (เรียกขณะถือ self._cond)"""
+        slots = max(2, min(self.max_frames, self.budget_bytes // max(1, frame.nbytes)))
+        self._ring = np.empty((slots,) + frame.shape, dtype=frame.dtype)
+        self._written = 0
+        self._read_pos = 0
+        self._last_seen = 0
+        log.info(
+            f"Ring buffer allocated: {slots} frames {frame.shape[1]}x{frame.shape[0]} "
+            f"({self._ring.nbytes / (1024 * 1024):.1f} MB)"
+        )
+
     def _reader(self):
         while self.running:
             try:
-                ret, frame = self.cap.read()
+                with self._cond:
+                    ring = self._ring
+                    if ring is not None:
+                        slots = len(ring)
+                        # smooth: ถ้าคนอ่านตามไม่ทัน ทิ้งเฟรมเก่าสุดที่กำลังจะถูกเขียนทับ
+                        if self._read_pos <= self._written - slots:
+                            self._read_pos = self._written - slots + 1
+                        target = ring[self._written % slots]
+                    else:
+                        target = None
+
+                # decode ลงช่องใน ring โดยตรง (ช่องนี้ไม่มีคนอ่านอยู่แน่นอน)
+                ret, frame = self.cap.read(target) if target is not None else self.cap.read()
                 if not ret:
                     time.sleep(0.05)
                     continue
-                if self.buffer.full():
-                    try:
-                        self.buffer.get_nowait()
-                    except:
-                        pass
-                self.buffer.put(frame)
+
+                with self._cond:
+                    if self._ring is None or frame is not target:
+                        # เฟรมแรก หรือความละเอียดเปลี่ยน → จอง ring ใหม่
+                        if self._ring is None or frame.shape != self._ring.shape[1:]:
+                            self._allocate(frame)
+                        self._ring[self._written % len(self._ring)] = frame
+                    self._written += 1
+                    self._cond.notify_all()
             except Exception as e:
                 log.warning(f"Camera reader error: {e}")
                 break
@@ -49,43 +306,91 @@ class SmoothBufferedCamera:
     def read(self):
         if not self.running:
             return False, None
-        try:
-            frame = self.buffer.get(timeout=1)
-            time.sleep(1 / self.fps)
-            return True, frame
-        except:
-            return False, None
+        if self.policy == "latest":
+            return self._read_latest()
+        return self._read_smooth()
+
+    def _read_latest(self):
+        deadline = time.time() + 1
+        with self._cond:
+            while self.running and self._written <= self._last_seen:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False, None
+                self._cond.wait(remaining)
+            if not self.running or self._ring is None:
+                return False, None
+            idx = self._written - 1
+            self._last_seen = self._written
+            return True, self._ring[idx % len(self._ring)].copy()
+
+    def _read_smooth(self):
+        deadline = time.time() + 1
+        with self._cond:
+            while self.running and self._read_pos >= self._written:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False, None
+                self._cond.wait(remaining)
+            if not self.running or self._ring is None:
+                return False, None
+            frame = self._ring[self._read_pos % len(self._ring)].copy()
+            self._read_pos += 1
+
+        # คุมจังหวะให้ได้ target_fps (ไม่หน่วงเพิ่มถ้าช้ากว่าอยู่แล้ว)
+        now = time.time()
+        self._next_due = max(now, self._next_due + 1 / self.fps)
+        delay = self._next_due - now
+        if delay > 0:
+            time.sleep(delay)
+        return True, frame
 
     def release(self):
         self.running = False
+        with self._cond:
+            self._cond.notify_all()
         try:
             if self.cap:
                 self.cap.release()
         except Exception as e:
             log.warning(f"Error releasing cap: {e}")
-        with self.buffer.mutex:
-            self.buffer.queue.clear()
+        if self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
+        with self._cond:
+            self._ring = None
         log.info("Buffered capture released")
 
+
+def _policy_for(protocol: str) -> str:
+    if CAPTURE_POLICY != "auto":
+        return CAPTURE_POLICY
+    # HLS มาเป็นก้อนๆ ตาม segment ต้องเล่นตามจังหวะ ส่วน RTSP/RTMP/HTTP เอาเฟรมล่าสุด
+    return "smooth" if protocol == "hls" else "latest"
+
+
 def open_capture(protocol: str, source: str) -> Optional[SmoothBufferedCamera]:
     """
-    เปิดกล้องหรือ stream พร้อม buffer ล่วงหน้า (เฉพาะ URL)
+    เปิดกล้องหรือ stream พร้อม ring buffer (เฉพาะ URL) คืนทันทีไม่ต้องรอ pre-buffer
+    ถ้า CAPTURE_GRAB_SKIP=1 จะ decode เฉพาะเฟรมที่ถึงรอบ DETECT_EVERY_N
     """
+    decode_every_n = DETECT_EVERY_N if CAPTURE_GRAB_SKIP else 1
     try:
         if protocol in ["rtsp", "http", "https", "rtmp", "hls"]:
-            cam = SmoothBufferedCamera(source, buffer_seconds=8, target_fps=25)
-            log.info("Pre-buffering network stream (wait ~8s)...")
-            time.sleep(8)
-            log.info("Stream ready and smooth playback enabled")
-            return cam
+            return SmoothBufferedCamera(
+                source, buffer_seconds=8, target_fps=25,
+                policy=_policy_for(protocol), decode_every_n=decode_every_n
+            )
         elif protocol == "usb":
             idx = int(source) if source.isdigit() else source
             cap = cv2.VideoCapture(idx)
             cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
             cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 360)
-            return cap
+            return GrabSkippingCapture(cap, decode_every_n) if decode_every_n > 1 else cap
         else:
-            return SmoothBufferedCamera(source, buffer_seconds=5, target_fps=25)
+            return SmoothBufferedCamera(
+                source, buffer_seconds=5, target_fps=25,
+                policy=_policy_for(protocol), decode_every_n=decode_every_n
+            )
     except Exception as e:
         log.error(f"Error opening camera: {e}")
         return None
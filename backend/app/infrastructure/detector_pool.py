@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from queue import Queue, Empty
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+import torch
+from ..core.config import DETECTOR_REPLICAS, TORCH_THREADS_PER_REPLICA, DETECT_BATCH_SIZE
+from ..core.logger import get_logger
+from ..domain.detections import Detections
+from ..domain.roi import Roi
+from .yolo_model import YoloDetector
+
+log = get_logger("detector_pool")
+
+
+class DetectorPool:
+    """
+    YoloDetector หลายชุด (replica) ให้หลาย thread เรียก inference พร้อมกันได้โดยไม่แย่งโมเดลตัวเดียวกัน
+
+    - checkout() ยืม replica ที่ว่าง (รอถ้าไม่ว่าง) / checkin() คืน หรือใช้ lease() แบบ with
+    - thread ที่ยืม replica จะถูกตั้ง torch.set_num_threads(threads_per_replica)
+      รวมทุก replica แล้วไม่เกินจำนวน core ไม่ให้ intra-op thread แย่งกันเอง
+    - ทุก replica ใช้ tracker ชุดเดียวกัน กล้องเดียวกันจะได้ track id ต่อเนื่องไม่ว่าจะไปลง replica ไหน
+    - infer_batch() / names / drop_tracker() ใช้แทน YoloDetector ตัวเดียวได้ (InferenceScheduler ใช้แบบนี้)
+    """
+
+    def __init__(self, size: int = DETECTOR_REPLICAS, threads_per_replica: int = TORCH_THREADS_PER_REPLICA):
+        self.size = max(1, size)
+        if threads_per_replica <= 0:
+            threads_per_replica = max(1, (os.cpu_count() or 1) // self.size)
+        self.threads_per_replica = threads_per_replica
+
+        first = YoloDetector()
+        self.replicas: List[YoloDetector] = [first]
+        for _ in range(self.size - 1):
+            self.replicas.append(YoloDetector(first.model_name, first.imgsz, trackers=first.trackers))
+        if first.backend != "torch":
+            log.info(f"{first.backend} backend: torch thread pinning does not apply to its runtime")
+
+        self.names = first.names
+        self.model_name = first.model_name
+        self.imgsz = first.imgsz
+        self.backend = first.backend
+        self.model_source = first.model_source
+        self.trackers = first.trackers
+
+        self.idle: Queue = Queue()
+        for i in range(self.size):
+            self.idle.put(i)
+        self._local = threading.local()
+
+        self.stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.waited_checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_ms = 0.0
+        self.busy_seconds = [0.0] * self.size
+        self.created = time.time()
+
+        log.info(f"Detector pool: {self.size} replicas x {self.threads_per_replica} torch threads")
+
+    # ---------- checkout / checkin ----------
+
+    def checkout(self, timeout: Optional[float] = None) -> Tuple[int, YoloDetector]:
+        """
+        ยืม replica ที่ว่าง คืน (index, detector) ถ้าหมดเวลาจะ raise TimeoutError
+        """
+        t0 = time.time()
+        with self.stats_lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            idx = self.idle.get(timeout=timeout)
+        except Empty:
+            raise TimeoutError("No idle detector replica")
+        finally:
+            with self.stats_lock:
+                self.waiting -= 1
+
+        waited = time.time() - t0
+        with self.stats_lock:
+            self.checkouts += 1
+            self.wait_seconds += waited
+            if waited > 0.001:
+                self.waited_checkouts += 1
+            self.max_wait_ms = max(self.max_wait_ms, waited * 1000)
+        self._pin_thread()
+        self._local.leased_at = time.time()
+        return idx, self.replicas[idx]
+
+    def checkin(self, idx: int):
+        leased_at = getattr(self._local, "leased_at", None)
+        if leased_at is not None:
+            with self.stats_lock:
+                self.busy_seconds[idx] += time.time() - leased_at
+            self._local.leased_at = None
+        self.idle.put(idx)
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None):
+        idx, det = self.checkout(timeout)
+        try:
+            yield det
+        finally:
+            self.checkin(idx)
+
+    def _pin_thread(self):
+        # set_num_threads มีผลกับ thread ที่เรียก (OpenMP) ตั้งครั้งเดียวต่อ thread พอ
+        if getattr(self._local, "pinned", None) != self.threads_per_replica:
+            torch.set_num_threads(self.threads_per_replica)
+            self._local.pinned = self.threads_per_replica
+
+    # ---------- ใช้แทน YoloDetector ----------
+
+    def infer_batch(
+        self,
+        frames_bgr: Sequence[np.ndarray],
+        classes_filters: Sequence[List[int] | None],
+        batch_size: int = DETECT_BATCH_SIZE,
+        cam_ids: Optional[Sequence[str]] = None,
+        rois: Optional[Sequence[Optional[Roi]]] = None,
+        imgsizes: Optional[Sequence[Optional[int]]] = None,
+    ) -> List[Detections]:
+        with self.lease() as det:
+            return det.infer_batch(
+                frames_bgr, classes_filters, batch_size=batch_size, cam_ids=cam_ids, rois=rois, imgsizes=imgsizes
+            )
+
+    def drop_tracker(self, cam_id: str):
+        if self.trackers is not None:
+            self.trackers.drop(cam_id)
+
+    def warmup(self, width: int = 1280, height: int = 720, batch: int = 1) -> float:
+        """warm-up ทุก replica พร้อมกัน คืนเวลาที่ใช้ทั้งหมด"""
+        t0 = time.time()
+
+        def run():
+            with self.lease() as det:
+                det.warmup(width, height, batch)
+
+        threads = [threading.Thread(target=run, daemon=True) for _ in range(self.size)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.time() - t0
+
+    def stats(self) -> dict:
+        with self.stats_lock:
+            elapsed = max(1e-6, time.time() - self.created)
+            return {
+                "replicas": self.size,
+                "threads_per_replica": self.threads_per_replica,
+                "idle": self.idle.qsize(),
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "checkouts": self.checkouts,
+                "waited_checkouts": self.waited_checkouts,
+                "avg_wait_ms": round(self.wait_seconds / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 2),
+                "utilization": [round(b / elapsed, 3) for b in self.busy_seconds],
+            }
+
+
+_pool: DetectorPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_detector_pool() -> DetectorPool:
+    """
+    สร้าง DetectorPool ครั้งแรกที่ถูกเรียก (thread-safe) แล้วใช้ตัวเดิมตลอด
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DetectorPool()
+        return _pool
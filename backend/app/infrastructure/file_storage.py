@@ -1,11 +1,53 @@
+import atexit
+import threading
 from pathlib import Path
 from typing import List
 from datetime import datetime
-from ..core.config import SAVED_DIR, MAX_SAVED, MAX_SAVED_PER_FOLDER
+from ..core.config import SAVED_DIR
 from ..core.logger import get_logger
+from .storage_writer import StorageWriter
+from .retention import RetentionEngine
 import pytz
 log = get_logger("file_storage")
 
+_writer: StorageWriter | None = None
+_retention: RetentionEngine | None = None
+_lock = threading.Lock()
+
+
+def get_retention() -> RetentionEngine:
+    """
+    index ของไฟล์ที่เซฟไว้ + janitor ลบไฟล์เก่า
+    สร้างตอนมีการเซฟครั้งแรก (หรือ AppLifecycle.start) สแกนดิสก์ใน janitor thread ไม่ใช่ thread ที่เรียก
+    """
+    global _retention
+    with _lock:
+        if _retention is None:
+            _retention = RetentionEngine()
+            _retention.start()
+        return _retention
+
+
+def _on_written(path: Path, size: int, group):
+    # group = ชื่อโฟลเดอร์ หรือ (ชื่อโฟลเดอร์, False) = ไม่ตัดตาม policy ตอนเซฟไฟล์นี้ (file_storage_unlimited)
+    location, enforce = group if isinstance(group, tuple) else (group, True)
+    get_retention().add(location, path, size, enforce=enforce)
+
+
+def get_writer() -> StorageWriter:
+    """
+    writer กลางสำหรับเขียนภาพใน background
+    งานที่มี group แจ้ง retention หลังเขียนเสร็จ (ใน thread ของ writer) งานที่ไม่มี group (headless) ไม่แตะ retention
+    """
+    global _writer
+    with _lock:
+        if _writer is None:
+            _writer = StorageWriter(on_written=_on_written)
+            _writer.start()
+            atexit.register(_writer.close)
+        return _writer
+
+
 def sanitize_filename(name: str) -> str:
     """
     ลบหรือแทนที่อักขระต้องห้ามในชื่อไฟล์ เช่น :, /, \ เป็นต้น
@@ -29,7 +71,8 @@ def ensure_camera_dir(location: str) -> Path:
 
 def save_frame(location: str, filename: str, jpg_bytes: bytes) -> Path:
     """
-    บันทึกภาพ และตรวจลบภาพเก่าถ้าเกิน limit
+    ส่งภาพให้ writer เขียนใน background แล้วคืน path ปลายทางทันที
+    (retention จะตรวจลบภาพเก่าที่เกิน policy หลังเขียนเสร็จ)
     """
     d = ensure_camera_dir(location)
 
@@ -41,40 +84,21 @@ def save_frame(location: str, filename: str, jpg_bytes: bytes) -> Path:
     fname = sanitize_filename(f"{base}_{timestamp}.jpg")
     
     out = d / fname
-    with open(out, "wb") as f:
-        f.write(jpg_bytes)
-
-    log.info(f"Saved frame {out}")
-    prune_overflow(location)
+    get_writer().submit(out, jpg_bytes, group=d.name)
     return out
 
 
 def list_saved(location: str) -> List[Path]:
     """
-    คืนลิสต์ไฟล์เรียงตามเวลาสร้าง (เก่าก่อน)
+    คืนลิสต์ไฟล์เรียงตามเวลาสร้าง (เก่าก่อน) จาก index ในหน่วยความจำ
     """
     d = ensure_camera_dir(location)
-    return sorted(d.glob("*.jpg"), key=lambda x: x.stat().st_mtime)
+    return get_retention().list(d.name)
 
 
 def prune_overflow(location: str):
     """
-    ลบไฟล์เก่าถ้าเกินจำนวนสูงสุดที่กำหนดใน .env
+    ลบไฟล์เก่าที่เกิน retention policy (จำนวน/ขนาด/อายุ) ของโฟลเดอร์นี้
     """
-    # เลือกใช้ MAX_SAVED_PER_FOLDER ก่อน ถ้าไม่มีใช้ MAX_SAVED เดิม
-    try:
-        max_files = int(MAX_SAVED_PER_FOLDER)
-    except Exception:
-        max_files = int(MAX_SAVED)
-
-    files = list_saved(location)
-    overflow = len(files) - max_files
-
-    if overflow > 0:
-        log.info(f"Folder '{location}' has {len(files)} files, pruning {overflow} oldest...")
-        for p in files[:overflow]:
-            try:
-                p.unlink(missing_ok=True)
-                log.info(f"Deleted old file: {p.name}")
-            except Exception as e:
-                log.warning(f"Failed to delete {p}: {e}")
+    d = ensure_camera_dir(location)
+    get_retention().enforce(d.name)
@@ -4,6 +4,7 @@ from pathlib import Path
 from datetime import datetime
 from ..core.config import SAVED_DIR
 from ..core.logger import get_logger
+from .file_storage import get_writer, get_retention
 
 log = get_logger("file_storage_unlimited")
 
@@ -29,17 +30,16 @@ def ensure_camera_dir(location: str) -> Path:
 
 def save_frame(location: str, filename: str, jpg_bytes: bytes) -> Path:
     """
-     บันทึกภาพโดยไม่จำกัดจำนวน (ไม่ลบอัตโนมัติ)
+     บันทึกภาพโดยไม่จำกัดจำนวน (การเซฟนี้ไม่ลบไฟล์เก่า) เขียนใน background
+     ไม่เปลี่ยน policy ของโฟลเดอร์: save_frame ของ file_storage ในโฟลเดอร์เดียวกันยังตัดตาม policy ตามเดิม
     """
     d = ensure_camera_dir(location)
     timestamp = datetime.now().strftime("%Y%m%d_%H-%M-%S")
     fname = sanitize_filename(f"{filename}_{timestamp}.jpg")
 
     out = d / fname
-    with open(out, "wb") as f:
-        f.write(jpg_bytes)
-
-    log.info(f"[UNLIMITED] Saved frame: {out}")
+    get_writer().submit(out, jpg_bytes, group=(d.name, False))
+    log.info(f"[UNLIMITED] Queued frame: {out}")
     return out
 
 
@@ -48,4 +48,4 @@ def list_saved(location: str):
     คืนลิสต์ไฟล์ทั้งหมดในโฟลเดอร์ (ไม่ลบใดๆ)
     """
     d = ensure_camera_dir(location)
-    return sorted(d.glob("*.jpg"), key=lambda x: x.stat().st_mtime)
+    return get_retention().list(d.name)
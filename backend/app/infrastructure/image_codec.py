@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+from ..core.config import JPEG_ENCODER, JPEG_QUALITY
+from ..core.logger import get_logger
+
+log = get_logger("image_codec")
+
+
+def _load_turbojpeg():
+    """
+    PyTurboJPEG (SIMD) ถ้าติดตั้งไว้และ JPEG_ENCODER ไม่ใช่ opencv
+    ไม่มี → ใช้ cv2.imencode ตามเดิม
+    """
+    if JPEG_ENCODER == "opencv":
+        return None
+    try:
+        from turbojpeg import TurboJPEG
+        jpeg = TurboJPEG()
+    except Exception as e:
+        if JPEG_ENCODER == "turbojpeg":
+            log.warning(f"JPEG_ENCODER=turbojpeg but PyTurboJPEG is unavailable ({e}); using OpenCV")
+        return None
+    log.info("JPEG encoder: turbojpeg")
+    return jpeg
+
+
+_turbo = _load_turbojpeg()
+ENCODER = "turbojpeg" if _turbo is not None else "opencv"
+
+
+def encode_jpeg(frame_bgr: np.ndarray, quality: int = JPEG_QUALITY) -> bytes:
+    """
+    encode เฟรม BGR เป็น JPEG คืน b"" ถ้า encode ไม่ได้
+    """
+    if _turbo is not None:
+        try:
+            return _turbo.encode(np.ascontiguousarray(frame_bgr), quality=quality)
+        except Exception as e:
+            log.warning(f"turbojpeg encode failed ({e}); falling back to OpenCV")
+    ok, jpg = cv2.imencode(".jpg", frame_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return jpg.tobytes() if ok else b""
+
+
+def resize_to_width(frame_bgr: np.ndarray, width: int) -> np.ndarray:
+    """
+    ย่อภาพให้กว้าง width (คงสัดส่วน) ถ้า width <= 0 หรือไม่เล็กกว่าภาพเดิม คืนภาพเดิม
+    """
+    h, w = frame_bgr.shape[:2]
+    if width <= 0 or width >= w:
+        return frame_bgr
+    height = max(1, round(h * width / w))
+    return cv2.resize(frame_bgr, (width, height), interpolation=cv2.INTER_AREA)
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple
+import torch
+import ultralytics
+from ultralytics import YOLO
+from ultralytics.utils.downloads import attempt_download_asset
+from ..core.config import (
+    INFER_BACKEND, INFER_IMGSZ, INFER_INT8, INFER_INT8_DATA, MODEL_CACHE_DIR, MODEL_NAME, CPU_MODEL_NAME, DEVICE,
+    AUTOTUNE_PATH, AUTOTUNE_APPLY,
+)
+from ..core.logger import get_logger
+
+log = get_logger("model_backends")
+
+BACKENDS = ("torch", "onnx", "openvino")
+
+
+def _weights_digest(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:10]
+
+
+def _resolve_weights(model_name: str) -> Path:
+    """
+    หาไฟล์ .pt จริง (ชื่อโมเดลมาตรฐานที่ยังไม่มีในเครื่องจะดาวน์โหลดจาก assets ของ ultralytics)
+    ไม่สร้าง YOLO เต็มตัวแค่เพื่ออ่าน path
+    """
+    p = Path(model_name)
+    if p.exists():
+        return p.resolve()
+    return Path(attempt_download_asset(model_name)).resolve()
+
+
+def artifact_key(model_name: str, weights: Path, backend: str, imgsz: int, int8: bool) -> str:
+    """
+    ชื่อ cache = โมเดล + hash ของ weights + imgsz + backend (+int8) + เวอร์ชัน ultralytics
+    เปลี่ยนอย่างใดอย่างหนึ่งจะ export ใหม่เอง
+    """
+    stem = Path(model_name).stem
+    suffix = "_int8" if int8 else ""
+    return f"{stem}-{_weights_digest(weights)}-{imgsz}-{backend}{suffix}-ul{ultralytics.__version__}"
+
+
+def export_name(stem: str, backend: str, int8: bool) -> str:
+    """
+    ชื่อไฟล์/โฟลเดอร์ของผล export ตามที่ ultralytics ตั้ง (OpenVINO int8 มี _int8 ต่อท้าย stem)
+    """
+    if backend == "onnx":
+        return f"{stem}.onnx"
+    return f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+
+
+def export_model(
+    model_name: str,
+    backend: str,
+    imgsz: int = INFER_IMGSZ,
+    int8: bool = INFER_INT8,
+    cache_dir: Path = MODEL_CACHE_DIR,
+) -> Path:
+    """
+    export โมเดลเป็น ONNX / OpenVINO IR ครั้งเดียวแล้วเก็บไว้ใน cache_dir
+    คืน path ที่ส่งให้ YOLO() โหลดได้ทันที (ไฟล์ .onnx หรือโฟลเดอร์ *_openvino_model)
+
+    export ลงโฟลเดอร์ชั่วคราวก่อนแล้วค่อย rename ถ้าหลาย process export พร้อมกัน
+    ตัวที่เสร็จก่อนจะได้ใช้ ตัวที่เหลือทิ้งผลของตัวเอง
+    """
+    if backend not in ("onnx", "openvino"):
+        raise ValueError(f"Backend '{backend}' cannot be exported")
+
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    weights = _resolve_weights(model_name)
+    int8 = int8 and backend == "openvino"
+    key = artifact_key(model_name, weights, backend, imgsz, int8)
+    target = cache_dir / key / export_name(weights.stem, backend, int8)
+    if target.exists():
+        return target
+
+    log.info(f"Exporting {weights.name} -> {backend} (imgsz {imgsz}{', int8' if int8 else ''}) ...")
+    tmp = Path(tempfile.mkdtemp(prefix=f".{key}.", dir=cache_dir))
+    try:
+        # export เขียนไฟล์ไว้ข้าง weights จึง copy weights มาไว้ในโฟลเดอร์ชั่วคราวก่อน
+        local = tmp / weights.name
+        shutil.copy2(weights, local)
+        kwargs = dict(format=backend, imgsz=imgsz, dynamic=True, half=False)
+        if backend == "openvino" and int8:
+            kwargs.update(int8=True, data=INFER_INT8_DATA)
+        out = Path(YOLO(str(local)).export(**kwargs))
+        local.unlink(missing_ok=True)
+        # ย้ายผลไปไว้ในชื่อที่ target คาดไว้ (ชื่อที่ ultralytics ตั้งเปลี่ยนตาม int8 / เวอร์ชัน)
+        if out != tmp / target.name:
+            shutil.move(str(out), str(tmp / target.name))
+        final = cache_dir / key
+        if final.exists() and not target.exists():
+            # โฟลเดอร์ค้างจาก export ที่ไม่สมบูรณ์ (ไม่มีไฟล์ที่ต้องใช้) → ลบแล้วใช้ของใหม่
+            log.warning(f"Removing incomplete export cache {final}")
+            shutil.rmtree(final, ignore_errors=True)
+        try:
+            tmp.rename(final)
+        except OSError:
+            if not target.exists():
+                raise
+            log.info(f"{key} was exported by another process; using that copy")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    log.info(f"Exported model cached at {target}")
+    return target
+
+
+def load_model(model_name: str, backend: str = INFER_BACKEND, imgsz: int = INFER_IMGSZ, int8: bool = INFER_INT8):
+    """
+    โหลดโมเดลตาม backend ที่เลือก คืน (YOLO, backend ที่ใช้จริง)
+    export ไม่สำเร็จ (เช่นไม่ได้ติดตั้ง onnxruntime/openvino) → ใช้ PyTorch ตามเดิม
+    """
+    if backend not in BACKENDS:
+        log.warning(f"Unknown INFER_BACKEND '{backend}', using torch")
+        backend = "torch"
+    if backend == "torch":
+        return YOLO(model_name), "torch"
+
+    try:
+        path = export_model(model_name, backend, imgsz=imgsz, int8=int8)
+        return YOLO(str(path), task="detect"), backend
+    except Exception as e:
+        log.warning(f"{backend} backend unavailable ({e}); falling back to torch")
+        return YOLO(model_name), "torch"
+
+
+# ---------- ผล autotune ----------
+
+def host_fingerprint(backend: str = INFER_BACKEND) -> dict:
+    """
+    สิ่งที่ทำให้ผล autotune ใช้ไม่ได้ถ้าเปลี่ยน (ย้ายเครื่อง / เปลี่ยน device / backend)
+    ใช้จำนวน core ไม่ใช่ torch.get_num_threads() ที่ DetectorPool ปรับต่อ replica
+    """
+    return {
+        "device": DEVICE,
+        "backend": backend,
+        "cpu_count": os.cpu_count(),
+        "cuda": torch.cuda.get_device_name(0) if torch.cuda.is_available() else None,
+    }
+
+
+def load_autotune(path: Path = AUTOTUNE_PATH) -> Optional[dict]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        log.warning(f"Invalid autotune file {path}: {e}")
+        return None
+
+
+def save_autotune(result: dict, path: Path = AUTOTUNE_PATH):
+    path = Path(path)
+    tmp = path.with_name(path.name + ".part")
+    tmp.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def autotune_matches_host(result: Optional[dict]) -> bool:
+    return bool(result) and result.get("host") == host_fingerprint()
+
+
+def select_model() -> Tuple[str, int, str]:
+    """
+    เลือกโมเดลที่จะโหลด คืน (model_name, imgsz, ที่มา)
+    1) ผล autotune ที่วัดบนเครื่องนี้ (AUTOTUNE_APPLY=1)
+    2) DEVICE=cpu: CPU_MODEL_NAME (โมเดลเล็ก) ถ้าตั้งไว้
+    3) MODEL_NAME / INFER_IMGSZ จาก .env
+    """
+    if AUTOTUNE_APPLY:
+        result = load_autotune()
+        if result and result.get("model"):
+            if autotune_matches_host(result):
+                return result["model"], int(result["imgsz"]), "autotune"
+            log.warning("autotune.json was measured on a different host/device/backend; ignoring it")
+    if DEVICE == "cpu" and CPU_MODEL_NAME:
+        log.info(f"No autotune result; using CPU_MODEL_NAME={CPU_MODEL_NAME}. Run `python -m app.services.autotune` to pick a model this host can sustain")
+        return CPU_MODEL_NAME, INFER_IMGSZ, "cpu-default"
+    return MODEL_NAME, INFER_IMGSZ, "env"
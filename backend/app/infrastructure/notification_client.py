@@ -1,12 +1,179 @@
 
+import atexit
+import gzip
+import json
+import random
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timezone
 import pytz
-from ..core.config import NOTIFY_URL, TZ
+from ..core.config import (
+    NOTIFY_URL, TZ, NOTIFY_WORKERS, NOTIFY_BACKOFF, NOTIFY_BACKOFF_MAX, NOTIFY_TIMEOUT,
+    NOTIFY_BATCH_MAX, NOTIFY_BATCH_LATENCY,
+)
 from ..core.logger import get_logger
+from .notification_outbox import NotificationOutbox
 
 log = get_logger("notify")
 
+
+class NotificationDispatcher:
+    """
+    ส่ง webhook แบบไม่ block: submit() เขียนงานลง outbox บนดิสก์แล้วคืนทันที
+    worker thread ดึงงานจาก outbox เป็นชุด (ไม่เกิน max_batch งาน หรือรอไม่เกิน max_latency วินาที)
+    แล้วส่งผ่าน requests.Session ที่ใช้ connection keep-alive ร่วมกัน
+
+    - ส่งไม่ผ่าน (network/5xx/429) → retry แบบ backoff ไปเรื่อยๆ งานไม่หาย แม้ process รีสตาร์ท
+    - max_batch = 1 ส่ง JSON object ทีละงานเหมือนเดิม
+    - max_batch > 1 ส่ง JSON array บีบอัด gzip (Content-Encoding: gzip)
+    """
+
+    def __init__(
+        self,
+        outbox: NotificationOutbox | None = None,
+        workers: int = NOTIFY_WORKERS,
+        max_batch: int = NOTIFY_BATCH_MAX,
+        max_latency: float = NOTIFY_BATCH_LATENCY,
+        backoff: float = NOTIFY_BACKOFF,
+        backoff_max: float = NOTIFY_BACKOFF_MAX,
+        timeout: float = NOTIFY_TIMEOUT,
+    ):
+        self.outbox = outbox or NotificationOutbox()
+        self.workers = max(1, workers)
+        self.max_batch = max(1, max_batch)
+        self.max_latency = max_latency
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.sent = 0
+        self.failed = 0
+        self.dead = 0
+        self.running = False
+        self.threads: list[threading.Thread] = []
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"notify-{i}", daemon=True)
+                t.start()
+                self.threads.append(t)
+        log.info(
+            f"Notification dispatcher started ({self.workers} workers, batch {self.max_batch}, "
+            f"latency {self.max_latency}s)"
+        )
+
+    def submit(self, url: str, payload: dict) -> bool:
+        """
+        บันทึกงานลง outbox แล้วคืนทันที คืน False ถ้าเขียน outbox ไม่ได้
+        """
+        if not self.running:
+            self.start()
+        try:
+            self.outbox.append(url, payload)   # outbox ถูก lock นาน → พักในหน่วยความจำ ไม่ block
+        except Exception as e:
+            log.warning(f"Outbox write failed: {e} ({payload})")
+            return False
+        self.wake.set()
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.outbox.pending_count(),
+            "dead": self.outbox.dead_count(),
+            "spilled": self.outbox.spilled,
+            "sent": self.sent,
+            "failed_attempts": self.failed,
+        }
+
+    def close(self, timeout: float = 2.0):
+        """
+        หยุด worker (งานที่ยังไม่ส่งอยู่ใน outbox จะถูกส่งต่อตอนเริ่มใหม่)
+        """
+        self.running = False
+        self.wake.set()
+        deadline = time.time() + timeout
+        for t in self.threads:
+            t.join(timeout=max(0.0, deadline - time.time()))
+        self.session.close()
+
+    def _worker(self):
+        while self.running:
+            try:
+                self.outbox.drain_spill()
+                batch = self.outbox.claim(self.max_batch, self.max_latency)
+            except Exception as e:
+                log.warning(f"Outbox claim failed: {e}")
+                batch = None
+            if batch is None:
+                # ไม่มีงานพร้อมส่ง: รอจนมีงานใหม่ หรือครบรอบ latency
+                self.wake.wait(min(0.5, self.max_latency) if self.max_latency > 0 else 0.5)
+                self.wake.clear()
+                continue
+            url, items, attempts = batch
+            self._deliver(url, items, attempts)
+
+    def _deliver(self, url: str, items: list, attempts: int):
+        ids = [i for i, _ in items]
+        payloads = [p for _, p in items]
+        try:
+            if self.max_batch == 1:
+                r = self.session.post(url, json=payloads[0], timeout=self.timeout)
+            else:
+                body = gzip.compress(json.dumps(payloads, ensure_ascii=False).encode("utf-8"))
+                r = self.session.post(
+                    url,
+                    data=body,
+                    headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+                    timeout=self.timeout,
+                )
+            if r.status_code < 300:
+                self.outbox.ack(ids)
+                self.sent += len(ids)
+                log.info(f"Notify -> {r.status_code}: {len(ids)} event(s)")
+                return
+            if r.status_code < 500 and r.status_code != 429:
+                # 4xx ส่งซ้ำก็ไม่ผ่าน เก็บไว้ใน outbox (dead) ให้ตรวจสอบ
+                self.outbox.bury(ids)
+                self.dead += len(ids)
+                log.warning(f"Notify rejected with HTTP {r.status_code}; {len(ids)} event(s) kept as dead")
+                return
+            reason = f"HTTP {r.status_code}"
+        except Exception as e:
+            reason = str(e)
+
+        self.failed += 1
+        delay = min(self.backoff_max, self.backoff * (2 ** attempts)) * (0.5 + random.random())
+        self.outbox.nack(ids, delay)
+        log.warning(f"Notify failed ({reason}), {len(ids)} event(s) retry in {delay:.1f}s")
+
+
+_dispatcher: NotificationDispatcher | None = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher()
+            _dispatcher.start()
+            atexit.register(_dispatcher.close)
+        return _dispatcher
+
+
 def notify_saved(frame_name: str, dt_utc: datetime):
     if not NOTIFY_URL:
         log.info("NOTIFY_URL not set; skip notify.")
@@ -17,8 +184,4 @@ def notify_saved(frame_name: str, dt_utc: datetime):
         "time_utc": dt_utc.replace(tzinfo=timezone.utc).isoformat(),
         "time_th": dt_utc.astimezone(tz).isoformat()
     }
-    try:
-        r = requests.post(NOTIFY_URL, json=payload, timeout=5)
-        log.info(f"Notify -> {r.status_code}: {payload}")
-    except Exception as e:
-        log.warning(f"Notify failed: {e}")
+    get_dispatcher().submit(NOTIFY_URL, payload)
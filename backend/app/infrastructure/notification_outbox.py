@@ -0,0 +1,208 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import List, Optional, Tuple
+from ..core.config import (
+    NOTIFY_OUTBOX_PATH, NOTIFY_OUTBOX_MAX, NOTIFY_SUBMIT_TIMEOUT, NOTIFY_DEAD_MAX, NOTIFY_DEAD_HOURS,
+)
+from ..core.logger import get_logger
+
+log = get_logger("notify_outbox")
+
+# งานที่ถูก claim แล้วแต่ไม่ถูก ack/nack ภายในเวลานี้ (เช่น process ตายกลางทาง) จะถูกส่งใหม่
+CLAIM_LEASE_SECONDS = 120
+
+# งานที่เขียนลง SQLite ไม่ทันตอน submit (ไฟล์ถูก process อื่น lock) พักไว้ในหน่วยความจำได้สูงสุดเท่านี้
+SPILL_MAX = 10000
+
+
+class NotificationOutbox:
+    """
+    outbox บนดิสก์ (SQLite) สำหรับ webhook: เขียนก่อนส่ง ลบเมื่อปลายทางตอบรับแล้ว
+    ถ้า NOTIFY_URL ล่มหรือ process รีสตาร์ท งานที่ค้างจะถูกส่งต่อจากไฟล์นี้
+
+    ใช้ได้หลาย process พร้อมกัน (API + headless) เพราะการ claim ทำใน transaction เดียว
+
+    - append() ถูกเรียกจาก thread ของ event จึงมี connection แยกที่รอ lock ได้ไม่เกิน submit_timeout
+      ถ้าไฟล์ถูก lock นานกว่านั้น งานพักไว้ในหน่วยความจำ แล้ว worker เขียนลงไฟล์ให้ทีหลัง (drain_spill)
+    - งานที่ปลายทางปฏิเสธถาวร (dead) เก็บไว้ไม่เกิน dead_max งาน และไม่เกิน dead_hours ชั่วโมง
+    """
+
+    def __init__(
+        self,
+        path: Path = NOTIFY_OUTBOX_PATH,
+        max_rows: int = NOTIFY_OUTBOX_MAX,
+        submit_timeout: float = NOTIFY_SUBMIT_TIMEOUT,
+        dead_max: int = NOTIFY_DEAD_MAX,
+        dead_hours: float = NOTIFY_DEAD_HOURS,
+    ):
+        self.path = Path(path)
+        self.max_rows = max_rows
+        self.dead_max = dead_max
+        self.dead_hours = dead_hours
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.submit_lock = threading.Lock()
+        self.submit_conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None, timeout=max(0.0, submit_timeout),
+        )
+        self.submit_conn.execute("PRAGMA synchronous=NORMAL")
+        self.spill: deque = deque(maxlen=SPILL_MAX)
+        self.spilled = 0
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_try REAL NOT NULL DEFAULT 0,
+                claimed_at REAL NOT NULL DEFAULT 0,
+                dead INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS outbox_ready ON outbox (dead, next_try, id)")
+        pending = self.pending_count()
+        if pending:
+            log.info(f"Outbox {self.path.name}: {pending} pending events will be replayed")
+
+    def append(self, url: str, payload: dict) -> bool:
+        """
+        เขียนงานลง outbox คืน False ถ้าไฟล์ถูก lock เกิน submit_timeout (งานพักไว้ในหน่วยความจำแทน)
+        """
+        row = (url, json.dumps(payload, ensure_ascii=False), time.time())
+        try:
+            with self.submit_lock:
+                self._insert(self.submit_conn, [row])
+            return True
+        except sqlite3.OperationalError as e:
+            if len(self.spill) == self.spill.maxlen:
+                log.warning(f"Outbox spill full ({SPILL_MAX}); dropping oldest pending event")
+            self.spill.append(row)
+            self.spilled += 1
+            log.warning(f"Outbox busy ({e}); event kept in memory until the outbox is writable")
+            return False
+
+    def drain_spill(self):
+        """เขียนงานที่พักไว้ลงไฟล์ (เรียกจาก worker รอ lock ได้นานกว่า append)"""
+        rows = []
+        while self.spill:
+            rows.append(self.spill.popleft())
+        if not rows:
+            return
+        try:
+            with self.lock:
+                self._insert(self.conn, rows)
+        except Exception:
+            self.spill.extendleft(reversed(rows))
+            raise
+
+    def _insert(self, conn: sqlite3.Connection, rows: list):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT INTO outbox (url, payload, created) VALUES (?, ?, ?)", rows)
+            dropped = 0
+            if self.max_rows > 0:
+                # กันดิสก์เต็มตอนปลายทางล่มนานๆ: เก็บไว้แค่ max_rows งานล่าสุด
+                dropped = conn.execute(
+                    "DELETE FROM outbox WHERE dead = 0 AND id <= "
+                    "(SELECT id FROM outbox WHERE dead = 0 ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (self.max_rows,),
+                ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if dropped:
+            log.warning(f"Outbox over {self.max_rows} events; dropped {dropped} oldest")
+
+    def claim(self, max_batch: int, max_latency: float) -> Optional[Tuple[str, List[Tuple[int, dict]], int]]:
+        """
+        จองงานชุดถัดไปที่ส่งไป url เดียวกัน คืน (url, [(id, payload), ...], จำนวนครั้งที่เคยส่งไม่ผ่าน) หรือ None
+        ชุดจะพร้อมส่งเมื่อครบ max_batch งาน หรืองานเก่าสุดรอมานานเกิน max_latency วินาที
+        """
+        now = time.time()
+        stale = now - CLAIM_LEASE_SECONDS
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                head = self.conn.execute(
+                    "SELECT url FROM outbox WHERE dead = 0 AND next_try <= ? AND claimed_at < ? "
+                    "ORDER BY id LIMIT 1",
+                    (now, stale),
+                ).fetchone()
+                if head is None:
+                    self.conn.execute("COMMIT")
+                    return None
+                url = head[0]
+                rows = self.conn.execute(
+                    "SELECT id, payload, created, attempts FROM outbox "
+                    "WHERE dead = 0 AND url = ? AND next_try <= ? AND claimed_at < ? ORDER BY id LIMIT ?",
+                    (url, now, stale, max_batch),
+                ).fetchall()
+                oldest_created, retried = rows[0][2], rows[0][3] > 0
+                if len(rows) < max_batch and not retried and now - oldest_created < max_latency:
+                    self.conn.execute("COMMIT")
+                    return None
+                ids = [r[0] for r in rows]
+                self.conn.executemany("UPDATE outbox SET claimed_at = ? WHERE id = ?", [(now, i) for i in ids])
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return url, [(r[0], json.loads(r[1])) for r in rows], max(r[3] for r in rows)
+
+    def ack(self, ids: List[int]):
+        with self.lock:
+            self.conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def nack(self, ids: List[int], delay: float):
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, next_try = ?, claimed_at = 0 WHERE id = ?",
+                [(time.time() + delay, i) for i in ids],
+            )
+
+    def bury(self, ids: List[int]):
+        """ปลายทางปฏิเสธถาวร (4xx) เก็บไว้ตรวจสอบ ไม่ส่งซ้ำ"""
+        with self.lock:
+            self.conn.executemany("UPDATE outbox SET dead = 1, claimed_at = 0 WHERE id = ?", [(i,) for i in ids])
+            self._prune_dead()
+
+    def _prune_dead(self):
+        # เรียกขณะถือ self.lock: เก็บ dead ไว้แค่ dead_max งานล่าสุด และไม่เก่ากว่า dead_hours
+        removed = 0
+        if self.dead_hours > 0:
+            removed += self.conn.execute(
+                "DELETE FROM outbox WHERE dead = 1 AND created < ?", (time.time() - self.dead_hours * 3600,),
+            ).rowcount
+        if self.dead_max > 0:
+            removed += self.conn.execute(
+                "DELETE FROM outbox WHERE dead = 1 AND id <= "
+                "(SELECT id FROM outbox WHERE dead = 1 ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (self.dead_max,),
+            ).rowcount
+        if removed:
+            log.info(f"Outbox: pruned {removed} dead event(s)")
+
+    def pending_count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM outbox WHERE dead = 0").fetchone()[0] + len(self.spill)
+
+    def dead_count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM outbox WHERE dead = 1").fetchone()[0]
+
+    def close(self):
+        with self.submit_lock:
+            self.submit_conn.close()
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,230 @@
+import heapq
+import json
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from queue import Queue, Empty
+from typing import Dict, List, Optional, Set, Tuple
+from ..core.config import (
+    SAVED_DIR, MAX_SAVED, MAX_SAVED_PER_FOLDER, MAX_SAVED_MB_PER_FOLDER, MAX_SAVED_AGE_HOURS,
+    RETENTION_POLICIES, RETENTION_SWEEP_SECONDS,
+)
+from ..core.logger import get_logger
+
+log = get_logger("retention")
+
+
+@dataclass
+class RetentionPolicy:
+    max_files: int = 0        # 0 = ไม่จำกัด
+    max_bytes: int = 0
+    max_age_s: float = 0
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "RetentionPolicy":
+        return cls(
+            max_files=int(d.get("max_files", 0)),
+            max_bytes=int(float(d.get("max_mb", 0)) * 1024 * 1024),
+            max_age_s=float(d.get("max_age_hours", 0)) * 3600,
+        )
+
+
+def default_policy() -> RetentionPolicy:
+    # ใช้ MAX_SAVED_PER_FOLDER ก่อน ถ้าไม่ได้ตั้ง (0) ใช้ MAX_SAVED เดิม
+    max_files = MAX_SAVED_PER_FOLDER if MAX_SAVED_PER_FOLDER > 0 else MAX_SAVED
+    return RetentionPolicy(
+        max_files=max(0, max_files),
+        max_bytes=int(MAX_SAVED_MB_PER_FOLDER * 1024 * 1024),
+        max_age_s=MAX_SAVED_AGE_HOURS * 3600,
+    )
+
+
+def load_overrides(raw: str) -> Dict[str, RetentionPolicy]:
+    """
+    RETENTION_POLICIES เป็น JSON เช่น {"NakhonPathom": {"max_files": 500, "max_mb": 1024, "max_age_hours": 72}}
+    key คือชื่อโฟลเดอร์ใน data/saved
+    """
+    if not raw.strip():
+        return {}
+    try:
+        return {k: RetentionPolicy.from_dict(v) for k, v in json.loads(raw).items()}
+    except Exception as e:
+        log.warning(f"Invalid RETENTION_POLICIES: {e}")
+        return {}
+
+
+class LocationIndex:
+    """ไฟล์ในโฟลเดอร์เดียว เรียงด้วย heap ตามเวลา (เก่าสุดอยู่บนสุด)"""
+
+    def __init__(self):
+        self.heap: List[Tuple[float, str, int]] = []   # (mtime, name, size)
+        self.names: Set[str] = set()
+        self.total_bytes = 0
+
+    def push(self, mtime: float, name: str, size: int):
+        # ไฟล์ที่สแกนเจอแล้ว (เช่นเพิ่งเขียนเสร็จก่อนโหลดโฟลเดอร์) ไม่นับซ้ำ
+        if name in self.names:
+            return
+        heapq.heappush(self.heap, (mtime, name, size))
+        self.names.add(name)
+        self.total_bytes += size
+
+    def pop_oldest(self) -> Tuple[float, str, int]:
+        item = heapq.heappop(self.heap)
+        self.names.discard(item[1])
+        self.total_bytes -= item[2]
+        return item
+
+    @classmethod
+    def scan(cls, d: Path) -> "LocationIndex":
+        idx = cls()
+        for p in d.glob("*.jpg"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            idx.push(st.st_mtime, p.name, st.st_size)
+        return idx
+
+
+class RetentionEngine:
+    """
+    คุมจำนวน/ขนาด/อายุไฟล์ภาพต่อโฟลเดอร์ โดยใช้ index ในหน่วยความจำแทนการ glob + stat ทุกครั้งที่เซฟ
+
+    - สแกนดิสก์ทีละโฟลเดอร์เมื่อใช้ครั้งแรก (index()) ไม่สแกนทั้ง SAVED_DIR ใน thread ที่เรียก
+      janitor สแกนโฟลเดอร์ที่เหลือให้ใน background ตอน start() (build())
+    - add() เรียกหลังเขียนไฟล์เสร็จ (ใน thread ของ writer): O(log n) แล้วตัดไฟล์เก่าสุดที่เกิน policy ออกจาก index
+      enforce=False = เพิ่มเข้า index อย่างเดียว (ภาพแบบไม่จำกัดจำนวน) การเซฟปกติครั้งถัดไปยังตัดตาม policy
+    - การลบไฟล์จริงทำใน janitor thread (รวมถึงกวาดไฟล์หมดอายุเป็นระยะ)
+    """
+
+    def __init__(
+        self,
+        root: Path = SAVED_DIR,
+        policy: Optional[RetentionPolicy] = None,
+        overrides: Optional[Dict[str, RetentionPolicy]] = None,
+        sweep_seconds: float = RETENTION_SWEEP_SECONDS,
+    ):
+        self.root = Path(root)
+        self.policy = policy or default_policy()
+        self.overrides = overrides if overrides is not None else load_overrides(RETENTION_POLICIES)
+        self.sweep_seconds = sweep_seconds
+        self.indexes: Dict[str, LocationIndex] = {}
+        self.lock = threading.Lock()
+        self.deletions: Queue = Queue()
+        self.deleted = 0
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+    # ---------- setup ----------
+
+    def index(self, location: str) -> LocationIndex:
+        """index ของโฟลเดอร์ สแกนจากดิสก์ครั้งแรกที่ใช้"""
+        with self.lock:
+            idx = self.indexes.get(location)
+        if idx is not None:
+            return idx
+        scanned = LocationIndex.scan(self.root / location)
+        with self.lock:
+            # อีก thread อาจสแกนเสร็จก่อน ใช้ของที่มีอยู่แล้ว
+            return self.indexes.setdefault(location, scanned)
+
+    def build(self):
+        """สแกนทุกโฟลเดอร์ที่ยังไม่ได้โหลด แล้วตัดตาม policy (janitor เรียกตอนเริ่ม)"""
+        t0 = time.time()
+        locations = [d.name for d in self.root.iterdir() if d.is_dir()] if self.root.exists() else []
+        for location in locations:
+            self.index(location)
+            self.enforce(location)
+        with self.lock:
+            total = sum(len(v.heap) for v in self.indexes.values())
+        log.info(f"Retention index built: {total} files in {len(self.indexes)} folders ({time.time() - t0:.2f}s)")
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._janitor, name="retention-janitor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2)
+
+    def policy_for(self, location: str) -> RetentionPolicy:
+        return self.overrides.get(location, self.policy)
+
+    # ---------- hot path ----------
+
+    def add(self, location: str, path: Path, size: int, mtime: Optional[float] = None, enforce: bool = True):
+        idx = self.index(location)
+        with self.lock:
+            idx.push(mtime if mtime is not None else time.time(), Path(path).name, size)
+        if enforce:
+            self.enforce(location)
+
+    def enforce(self, location: str, now: Optional[float] = None):
+        """ตัดไฟล์เก่าสุดที่เกิน policy ออกจาก index แล้วส่งให้ janitor ลบ"""
+        policy = self.policy_for(location)
+        now = now or time.time()
+        doomed = []
+        with self.lock:
+            idx = self.indexes.get(location)
+            if idx is None:
+                return
+            while idx.heap:
+                mtime, name, size = idx.heap[0]
+                over_count = policy.max_files > 0 and len(idx.heap) > policy.max_files
+                over_bytes = policy.max_bytes > 0 and idx.total_bytes > policy.max_bytes
+                expired = policy.max_age_s > 0 and now - mtime > policy.max_age_s
+                if not (over_count or over_bytes or expired):
+                    break
+                idx.pop_oldest()
+                doomed.append(name)
+        if doomed:
+            log.info(f"Folder '{location}' over retention policy, pruning {len(doomed)} oldest...")
+            d = self.root / location
+            for name in doomed:
+                self.deletions.put(d / name)
+
+    def list(self, location: str) -> List[Path]:
+        """ไฟล์ในโฟลเดอร์เรียงตามเวลา (เก่าก่อน) จาก index (แตะดิสก์เฉพาะครั้งแรกของโฟลเดอร์)"""
+        idx = self.index(location)
+        with self.lock:
+            items = sorted(idx.heap)
+        d = self.root / location
+        return [d / name for _mtime, name, _size in items]
+
+    def stats(self) -> dict:
+        with self.lock:
+            folders = {k: {"files": len(v.heap), "bytes": v.total_bytes} for k, v in self.indexes.items()}
+        return {"folders": folders, "pending_deletes": self.deletions.qsize(), "deleted": self.deleted}
+
+    # ---------- janitor ----------
+
+    def _janitor(self):
+        try:
+            self.build()
+        except Exception as e:
+            log.warning(f"Retention scan failed: {e}")
+        next_sweep = time.time() + self.sweep_seconds
+        while self.running:
+            try:
+                p = self.deletions.get(timeout=0.5)
+                try:
+                    p.unlink(missing_ok=True)
+                    self.deleted += 1
+                    log.info(f"Deleted old file: {p.name}")
+                except Exception as e:
+                    log.warning(f"Failed to delete {p}: {e}")
+            except Empty:
+                pass
+            if time.time() >= next_sweep:
+                # กวาดไฟล์หมดอายุของโฟลเดอร์ที่ไม่มีการเซฟใหม่
+                with self.lock:
+                    locations = list(self.indexes)
+                for location in locations:
+                    self.enforce(location)
+                next_sweep = time.time() + self.sweep_seconds
@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+from pathlib import Path
+from queue import Queue, Empty, Full
+from typing import Callable, List, Optional
+from ..core.config import STORAGE_WRITERS, STORAGE_QUEUE_SIZE, STORAGE_FSYNC, STORAGE_BLOCK_TIMEOUT
+from ..core.logger import get_logger
+
+log = get_logger("storage_writer")
+
+FSYNC_POLICIES = ("none", "file", "dir")
+
+# จำนวนงานสูงสุดที่ writer 1 ตัวหยิบมาเขียนรวดเดียว (fsync โฟลเดอร์ครั้งเดียวต่อชุด)
+MAX_COALESCE = 32
+
+
+class StorageWriter:
+    """
+    เขียนไฟล์ภาพใน background thread แทนการเขียนใน thread ของ stream
+
+    - submit() ใส่ (path, bytes) เข้าคิวจำกัดขนาดแล้วคืนทันที
+    - คิวเต็ม: รอได้ไม่เกิน block_timeout วินาที แล้วทิ้งงาน (นับใน stats)
+    - writer หยิบงานที่ค้างมาเขียนเป็นชุด แล้วเรียก on_written(path, size, group) ต่อไฟล์ที่มี group
+    - fsync: none = ปล่อยให้ OS flush เอง, file = fsync ทุกไฟล์, dir = fsync ไฟล์ + โฟลเดอร์ (ครั้งเดียวต่อชุด)
+    - เขียนลง .part แล้ว rename คนอ่านโฟลเดอร์จะไม่เห็นไฟล์ที่เขียนไม่ครบ
+    """
+
+    def __init__(
+        self,
+        workers: int = STORAGE_WRITERS,
+        max_queue: int = STORAGE_QUEUE_SIZE,
+        fsync: str = STORAGE_FSYNC,
+        block_timeout: float = STORAGE_BLOCK_TIMEOUT,
+        on_written: Optional[Callable[[Path, int, object], None]] = None,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            log.warning(f"Unknown STORAGE_FSYNC '{fsync}', using none")
+            fsync = "none"
+
+        self.queue: Queue = Queue(maxsize=max(1, max_queue))
+        self.workers = max(1, workers)
+        self.fsync = fsync
+        self.block_timeout = block_timeout
+        self.on_written = on_written
+
+        self.stats_lock = threading.Lock()
+        self.written = 0
+        self.bytes_written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_queued = 0
+        self.blocked_seconds = 0.0
+        self.last_write_ms = 0.0
+        self.max_write_ms = 0.0
+
+        self.running = False
+        self.threads: List[threading.Thread] = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"storage-writer-{i}", daemon=True)
+                t.start()
+                self.threads.append(t)
+        log.info(f"Storage writer started ({self.workers} writers, queue {self.queue.maxsize}, fsync {self.fsync})")
+
+    def submit(self, path: Path, data: bytes, group=None) -> bool:
+        """
+        ส่งงานเขียนไฟล์เข้าคิว คืน False ถ้าคิวเต็มเกิน block_timeout (งานถูกทิ้ง)
+        group ส่งต่อให้ on_written ตามเดิม (writer ไม่ได้ตีความ)
+        """
+        if not self.running:
+            self.start()
+        t0 = time.time()
+        try:
+            if self.block_timeout > 0:
+                self.queue.put((Path(path), data, group), timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait((Path(path), data, group))
+        except Full:
+            with self.stats_lock:
+                self.dropped += 1
+                self.blocked_seconds += time.time() - t0
+            log.warning(f"Storage queue full ({self.queue.maxsize}); dropped {path}")
+            return False
+
+        waited = time.time() - t0
+        depth = self.queue.qsize()
+        with self.stats_lock:
+            self.blocked_seconds += waited
+            if depth > self.max_queued:
+                self.max_queued = depth
+        return True
+
+    def stats(self) -> dict:
+        with self.stats_lock:
+            return {
+                "queued": self.queue.qsize(),
+                "max_queued": self.max_queued,
+                "written": self.written,
+                "bytes_written": self.bytes_written,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "blocked_seconds": round(self.blocked_seconds, 3),
+                "last_write_ms": round(self.last_write_ms, 2),
+                "max_write_ms": round(self.max_write_ms, 2),
+            }
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """รอจนคิวว่าง (ไม่เกิน timeout) คืน True ถ้าเขียนครบ"""
+        deadline = time.time() + timeout
+        while self.queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.02)
+        return not self.queue.unfinished_tasks
+
+    def close(self, timeout: float = 5.0):
+        self.flush(timeout)
+        self.running = False
+        for t in self.threads:
+            t.join(timeout=1)
+
+    def _worker(self):
+        while self.running:
+            try:
+                first = self.queue.get(timeout=0.5)
+            except Empty:
+                continue
+            batch = [first]
+            while len(batch) < MAX_COALESCE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _write_batch(self, batch: list):
+        dirs = set()
+        done = []
+        for path, data, group in batch:
+            t0 = time.time()
+            try:
+                self._write_file(path, data)
+            except Exception as e:
+                with self.stats_lock:
+                    self.errors += 1
+                log.warning(f"Failed to write {path}: {e}")
+                continue
+            ms = (time.time() - t0) * 1000
+            with self.stats_lock:
+                self.written += 1
+                self.bytes_written += len(data)
+                self.last_write_ms = ms
+                self.max_write_ms = max(self.max_write_ms, ms)
+            dirs.add(path.parent)
+            if group is not None:
+                done.append((path, len(data), group))
+            log.info(f"Saved frame {path}")
+
+        if self.fsync == "dir":
+            for d in dirs:
+                self._fsync_dir(d)
+
+        if self.on_written:
+            for path, size, group in done:
+                try:
+                    self.on_written(path, size, group)
+                except Exception as e:
+                    log.warning(f"Post-write hook failed for {path}: {e}")
+
+    def _write_file(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".part")
+        with open(tmp, "wb") as f:
+            f.write(data)
+            if self.fsync != "none":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _fsync_dir(self, d: Path):
+        try:
+            fd = os.open(str(d), os.O_RDONLY)
+        except OSError:
+            return   # Windows เปิดโฟลเดอร์ไม่ได้ ข้าม
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
@@ -0,0 +1,73 @@
+import threading
+from typing import Dict, Optional
+import numpy as np
+import torch
+from ultralytics.trackers.track import TRACKER_MAP
+from ultralytics.utils import IterableSimpleNamespace, yaml_load
+from ultralytics.utils.checks import check_yaml
+from ..core.config import TRACKER, TRACKER_FRAME_RATE
+from ..core.logger import get_logger
+
+log = get_logger("tracking")
+
+
+class CameraTrackers:
+    """
+    tracker (ByteTrack/BoT-SORT ของ ultralytics) แยกหนึ่งตัวต่อกล้อง และจำ state ข้ามเฟรม
+    ทำให้ track_id ของวัตถุเดิมคงที่ตลอดเวลาที่ยังอยู่ในภาพ
+
+    - update() ใช้ผลจาก predict() ของกล้องนั้น แล้วคืนผลที่มี track id (เฉพาะกล่องที่ติดตามได้)
+    - drop() ทิ้ง tracker เมื่อกล้องหยุด (กล้องที่เริ่มใหม่จะได้ tracker ใหม่)
+    """
+
+    def __init__(self, tracker: str = TRACKER, frame_rate: int = TRACKER_FRAME_RATE):
+        cfg = IterableSimpleNamespace(**yaml_load(check_yaml(tracker)))
+        if cfg.tracker_type not in TRACKER_MAP:
+            raise ValueError(f"Unsupported tracker type '{cfg.tracker_type}'")
+        self.cfg = cfg
+        self.frame_rate = frame_rate
+        self.lock = threading.Lock()
+        self.trackers: Dict[str, tuple] = {}   # cam_id -> (tracker, lock)
+        log.info(f"Per-camera tracking: {tracker} ({cfg.tracker_type})")
+
+    def _get(self, cam_id: str) -> tuple:
+        with self.lock:
+            entry = self.trackers.get(cam_id)
+            if entry is None:
+                entry = (TRACKER_MAP[self.cfg.tracker_type](args=self.cfg, frame_rate=self.frame_rate), threading.Lock())
+                self.trackers[cam_id] = entry
+            return entry
+
+    def update(self, cam_id: str, result, frame_bgr: np.ndarray):
+        """
+        ส่งผล detection ของเฟรมนี้เข้า tracker ของกล้อง (เรียกแม้ไม่มีวัตถุ เพื่อให้ track ที่หายไปหมดอายุ)
+        """
+        tracker, lock = self._get(cam_id)
+        det = result.boxes.cpu().numpy()
+        with lock:
+            tracks = tracker.update(det, frame_bgr)
+        if len(tracks) == 0:
+            return result[[]]
+        idx = tracks[:, -1].astype(int)
+        result = result[idx]
+        result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+        return result
+
+    def drop(self, cam_id: str):
+        with self.lock:
+            removed = self.trackers.pop(cam_id, None)
+        if removed is not None:
+            log.info(f"Tracker dropped: {cam_id}")
+
+    def count(self) -> int:
+        with self.lock:
+            return len(self.trackers)
+
+
+def create_trackers() -> Optional[CameraTrackers]:
+    """สร้าง CameraTrackers ถ้าทำไม่ได้ (config ผิด) คืน None แล้วใช้ predict อย่างเดียว"""
+    try:
+        return CameraTrackers()
+    except Exception as e:
+        log.warning(f"Tracking disabled: {e}")
+        return None
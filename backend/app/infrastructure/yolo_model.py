@@ -1,22 +1,96 @@
-from typing import List, Tuple
-import cv2
+from typing import List, Optional, Sequence, Tuple
 import numpy as np
-from ultralytics import YOLO
-from ..core.config import MODEL_NAME, CONF_THRES, IOU_THRES, DEVICE
+from ..core.config import CONF_THRES, IOU_THRES, DEVICE, DETECT_BATCH_SIZE, INFER_IMGSZ
 from ..core.logger import get_logger
+from ..domain.detections import Detections
+from ..domain.roi import Roi
+from .annotator import annotate
+from .model_backends import load_model, select_model
+from .tracking import create_trackers
+import threading
 import time
 import torch
 
 log = get_logger("yolo_model")
 
+
+def union_classes(filters: Sequence[List[int] | None]) -> List[int] | None:
+    """
+    class ที่ต้องส่งเข้าโมเดลสำหรับทั้ง batch (None = ทุก class ถ้ามีกล้องไหนต้องการทั้งหมด)
+    """
+    if any(f is None for f in filters):
+        return None
+    return sorted(set().union(*filters))
+
+
+def filter_classes(result, classes_filter: List[int] | None):
+    """
+    ตัดกล่องที่ไม่อยู่ใน classes_filter ของกล้องนี้ (batch ที่รวมหลายกล้องจะได้ class ของทุกกล้องมา)
+    """
+    if classes_filter is None or result.boxes is None or len(result.boxes) == 0:
+        return result
+    cls = result.boxes.cls
+    mask = torch.isin(cls, torch.as_tensor(classes_filter, dtype=cls.dtype, device=cls.device))
+    if bool(mask.all()):
+        return result
+    return result[mask]
+
+def crop_to_roi(frame_bgr: np.ndarray, roi: Optional[Roi]) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    ตัดภาพเหลือกรอบที่ครอบ ROI คืน (ภาพที่ตัด, (x, y) ของมุมซ้ายบนในภาพเต็ม)
+    """
+    if roi is None:
+        return frame_bgr, (0, 0)
+    h, w = frame_bgr.shape[:2]
+    x1, y1, x2, y2 = roi.crop_box(w, h)
+    if (x1, y1, x2, y2) == (0, 0, w, h):
+        return frame_bgr, (0, 0)
+    return np.ascontiguousarray(frame_bgr[y1:y2, x1:x2]), (x1, y1)
+
+
+def map_to_frame(result, frame_bgr: np.ndarray, offset: Tuple[int, int], roi: Optional[Roi]):
+    """
+    ย้ายกล่องจากพิกัดภาพที่ตัด กลับเป็นพิกัดภาพเต็ม แล้วตัดกล่องที่จุดกึ่งกลางอยู่นอก ROI ออก
+    """
+    if roi is None:
+        return result
+    h, w = frame_bgr.shape[:2]
+    result.orig_img = frame_bgr
+    result.orig_shape = (h, w)
+    if result.boxes is None or len(result.boxes) == 0:
+        result.update(boxes=torch.zeros((0, 6)))
+        return result
+
+    data = result.boxes.data.clone()
+    data[:, [0, 2]] += offset[0]
+    data[:, [1, 3]] += offset[1]
+    result.update(boxes=data)
+
+    centers = ((data[:, :2] + data[:, 2:4]) / 2).cpu().numpy()
+    keep = roi.contains(centers, w, h)
+    if keep.all():
+        return result
+    return result[torch.as_tensor(keep, device=data.device)]
+
+
 class YoloDetector:
-    def __init__(self):
-        # ถ้าไม่มี GPU → ใช้โมเดลเล็ก
-        model_to_load = "yolov8n.pt" if DEVICE == "cpu" else MODEL_NAME
-        log.info(f"Loading YOLO model: {model_to_load} on {DEVICE}")
-        self.model = YOLO(model_to_load)
+    def __init__(self, model_name: Optional[str] = None, imgsz: Optional[int] = None, trackers=None):
+        # ไม่ระบุ → ใช้ผล autotune ของเครื่องนี้ ถ้าไม่มีใช้ MODEL_NAME / INFER_IMGSZ
+        if model_name is None:
+            model_name, auto_imgsz, self.model_source = select_model()
+            imgsz = imgsz or auto_imgsz
+        else:
+            self.model_source = "explicit"
+        self.model_name = model_name
+        self.imgsz = imgsz or INFER_IMGSZ
+        log.info(f"Loading YOLO model: {model_name} on {DEVICE} (from {self.model_source})")
+        self.model, self.backend = load_model(model_name, imgsz=self.imgsz)
+        log.info(f"Inference backend: {self.backend} (imgsz {self.imgsz})")
         self.names = self.model.names
         self.frame_count = 0
+        # tracker แยกต่อกล้อง จำ state ข้ามเฟรม (None = ใช้ predict อย่างเดียว)
+        # DetectorPool ส่ง trackers ชุดเดียวกันให้ทุก replica
+        self.trackers = trackers if trackers is not None else create_trackers()
 
         # ตรวจว่าใช้ GPU หรือ CPU
         if torch.cuda.is_available():
@@ -25,14 +99,42 @@ class YoloDetector:
         else:
             log.info("Using CPU only (no CUDA detected)")
 
-    def detect(self, frame_bgr: np.ndarray, classes_filter: List[int] | None) -> Tuple[np.ndarray, list]:
+    def detect(
+        self,
+        frame_bgr: np.ndarray,
+        classes_filter: List[int] | None,
+        cam_id: Optional[str] = None,
+    ) -> Tuple[np.ndarray, list]:
         """
-        ตรวจจับพร้อมติดตาม (YOLOv8 Tracking mode)
+        ตรวจจับ + วาดกรอบ คืน (ภาพที่วาดแล้ว, [(cls_id, name, conf, box, track_id), ...]) แบบเดิม
+        ถ้าระบุ cam_id จะใช้ tracker ของกล้องนั้น (track_id คงที่ข้ามเฟรม)
         """
-        t0 = time.time()
-        annotated = frame_bgr.copy()
-        det_list = []
+        dets = self.infer(frame_bgr, classes_filter, cam_id)
+        return annotate(frame_bgr, dets), dets.to_tuples()
 
+    def detect_batch(
+        self,
+        frames_bgr: Sequence[np.ndarray],
+        classes_filters: Sequence[List[int] | None],
+        batch_size: int = DETECT_BATCH_SIZE,
+        cam_ids: Optional[Sequence[str]] = None,
+    ) -> List[Tuple[np.ndarray, list]]:
+        """
+        เหมือน infer_batch แต่คืน (ภาพที่วาดแล้ว, list ของ tuple) แบบเดิม
+        """
+        results = self.infer_batch(frames_bgr, classes_filters, batch_size=batch_size, cam_ids=cam_ids)
+        return [(annotate(f, d), d.to_tuples()) for f, d in zip(frames_bgr, results)]
+
+    def infer(self, frame_bgr: np.ndarray, classes_filter: List[int] | None, cam_id: Optional[str] = None) -> Detections:
+        """
+        ตรวจจับเฟรมเดียว คืน Detections (ไม่วาดภาพ)
+        """
+        if cam_id is not None and self.trackers is not None:
+            return self.infer_batch([frame_bgr], [classes_filter], batch_size=1, cam_ids=[cam_id])[0]
+        if classes_filter == []:
+            return Detections.empty(self.names)
+
+        t0 = time.time()
         try:
             # ใช้ tracker แต่ไม่จำ state เดิม (กัน crash ตอนปิด stream)
             results = self.model.track(
@@ -40,6 +142,8 @@ class YoloDetector:
                 conf=CONF_THRES,
                 iou=IOU_THRES,
                 device=DEVICE,
+                imgsz=self.imgsz,
+                classes=classes_filter,
                 persist=False,     # ป้องกัน crash เวลา stream ปิด
                 verbose=False
             )
@@ -50,49 +154,132 @@ class YoloDetector:
                 conf=CONF_THRES,
                 iou=IOU_THRES,
                 device=DEVICE,
+                imgsz=self.imgsz,
+                classes=classes_filter,
                 verbose=False
             )
 
-        # วาดผลลัพธ์
-        for r in results:
-            if not hasattr(r, "boxes") or r.boxes is None:
-                continue
-
-            for b in r.boxes:
-                cls_id = int(b.cls)
-                if classes_filter and cls_id not in classes_filter:
-                    continue
-
-                conf = float(b.conf)
-                x1, y1, x2, y2 = map(int, b.xyxy[0].tolist())
-                name = self.names.get(cls_id, str(cls_id))
-                track_id = getattr(b, "id", None)
-
-                # สีและขนาด
-                color = (0, 255, 0) if track_id else (255, 0, 0)
-                h, w, _ = annotated.shape
-                thickness = max(1, int(min(h, w) / 1000))   # เส้นบางลง
-                font_scale = min(h, w) / 500               # ตัวอักษรเล็กลงเล็กน้อย
-
-                # วาดกรอบ
-                cv2.rectangle(annotated, (x1, y1), (x2, y2), color, thickness)
-
-                # ข้อความ
-                label = f"{name} {int(track_id) if track_id else '-'} {conf:.2f}"
-
-                cv2.putText(
-                    annotated,
-                    label,
-                    (x1 + 2, max(20, y1 - 8)),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    font_scale,
-                    color,
-                    thickness,       # ลดจาก thickness + 1 → thickness
-                    lineType=cv2.LINE_AA
-                )
-
-                det_list.append((cls_id, name, conf, (x1, y1, x2, y2), track_id))
-
+        dets = Detections.from_result(results[0], self.names)
         fps = 1.0 / (time.time() - t0)
-        log.info(f"Detection + Tracking: {len(det_list)} objects ({fps:.1f} FPS)")
-        return annotated, det_list
+        log.info(f"Detection + Tracking: {len(dets)} objects ({fps:.1f} FPS)")
+        return dets
+
+    def infer_batch(
+        self,
+        frames_bgr: Sequence[np.ndarray],
+        classes_filters: Sequence[List[int] | None],
+        batch_size: int = DETECT_BATCH_SIZE,
+        cam_ids: Optional[Sequence[str]] = None,
+        rois: Optional[Sequence[Optional[Roi]]] = None,
+        imgsizes: Optional[Sequence[Optional[int]]] = None,
+    ) -> List[Detections]:
+        """
+        ตรวจจับหลายเฟรม (จากหลายกล้อง) ในการเรียก model ครั้งเดียว
+        แบ่งเป็นก้อนละ batch_size เฟรม แล้วคืน Detections เรียงตามลำดับเฟรมที่ส่งเข้ามา
+        ไม่วาดภาพ (ใช้ annotate() เมื่อต้องการภาพ)
+
+        rois: ROI ต่อเฟรม → ส่งเข้าโมเดลเฉพาะส่วนที่ตัด แล้วย้ายกล่องกลับเป็นพิกัดภาพเต็ม
+        imgsizes: imgsz ต่อเฟรม (None = self.imgsz) เฟรมที่ imgsz เดียวกันถูกรวม batch กัน
+
+        หมายเหตุ: ใช้ predict() ไม่ใช่ track() เพราะ tracker ของ ultralytics ใช้ state เดียวกันทั้ง batch
+        ถ้าส่ง cam_ids มา ผลของแต่ละเฟรมจะถูกส่งเข้า tracker ของกล้องนั้นตามลำดับ
+        """
+        if len(frames_bgr) != len(classes_filters):
+            raise ValueError("frames_bgr and classes_filters must have the same length")
+        if cam_ids is not None and len(cam_ids) != len(frames_bgr):
+            raise ValueError("cam_ids must have the same length as frames_bgr")
+        track = cam_ids is not None and self.trackers is not None
+
+        # filter = [] คือไม่ต้อง detect class ไหนเลย ไม่ต้องส่งเข้าโมเดล
+        out: List[Detections] = [Detections.empty(self.names)] * len(frames_bgr)
+        step = max(1, int(batch_size))
+        rois = rois or [None] * len(frames_bgr)
+        imgsizes = imgsizes or [None] * len(frames_bgr)
+
+        # predict() รับ imgsz ได้ค่าเดียวต่อครั้ง: แยกกลุ่มตาม imgsz (ลำดับเฟรมในกลุ่มคงเดิม)
+        groups: dict = {}
+        for i, f in enumerate(classes_filters):
+            if f != []:
+                # ปัดขึ้นเป็นพหุคูณของ 32 (stride ของ YOLO) ไม่ให้ ultralytics เตือนทุกเฟรม
+                imgsz = -(-(imgsizes[i] or self.imgsz) // 32) * 32
+                groups.setdefault(imgsz, []).append(i)
+
+        for imgsz, todo in groups.items():
+            for start in range(0, len(todo), step):
+                idxs = todo[start:start + step]
+                self._infer_chunk(idxs, frames_bgr, classes_filters, cam_ids if track else None, rois, imgsz, out)
+
+        return out
+
+    def _infer_chunk(self, idxs, frames_bgr, classes_filters, cam_ids, rois, imgsz: int, out: List[Detections]):
+        frames = [frames_bgr[i] for i in idxs]
+        filters = [classes_filters[i] for i in idxs]
+        crops = [crop_to_roi(frames_bgr[i], rois[i]) for i in idxs]
+        t0 = time.time()
+
+        # ส่ง class ที่ต้องการ (รวมทุกเฟรมใน batch) เข้าโมเดล ให้ class อื่นถูกตัดก่อน NMS
+        results = self.model.predict(
+            source=[crop for crop, _ in crops],
+            conf=CONF_THRES,
+            iou=IOU_THRES,
+            device=DEVICE,
+            imgsz=imgsz,
+            classes=union_classes(filters),
+            verbose=False
+        )
+
+        total = 0
+        for i, frame, (_, offset), r, classes_filter in zip(idxs, frames, crops, results, filters):
+            r = filter_classes(r, classes_filter)
+            r = map_to_frame(r, frame, offset, rois[i])
+            cam_id = cam_ids[i] if cam_ids is not None else None
+            if cam_id is not None:
+                try:
+                    r = self.trackers.update(cam_id, r, frame)
+                except Exception as e:
+                    log.warning(f"Tracker update failed for {cam_id}: {e}")
+            out[i] = Detections.from_result(r, self.names)
+            total += len(out[i])
+
+        fps = len(frames) / (time.time() - t0)
+        log.info(f"Batch detection: {len(frames)} frames @ {imgsz}, {total} objects ({fps:.1f} FPS)")
+
+        return out
+
+    def warmup(self, width: int = 1280, height: int = 720, batch: int = 1) -> float:
+        """
+        รัน inference บนภาพเปล่าขนาดเท่ากล้อง (batch เต็ม + เฟรมเดียว) ให้ JIT/allocator พร้อมก่อนรับงานจริง
+        ไม่ผ่าน tracker จึงไม่กระทบ state ของกล้อง คืนเวลาที่ใช้ (วินาที)
+        """
+        t0 = time.time()
+        frame = np.zeros((height, width, 3), np.uint8)
+        for n in sorted({max(1, batch), 1}, reverse=True):
+            self.infer_batch([frame] * n, [None] * n, batch_size=n)
+        took = time.time() - t0
+        log.info(f"Warm-up done: {width}x{height}, batch {batch} ({took:.2f}s)")
+        return took
+
+    def drop_tracker(self, cam_id: str):
+        """ทิ้ง state ของ tracker เมื่อกล้องหยุด"""
+        if self.trackers is not None:
+            self.trackers.drop(cam_id)
+
+
+_detector: YoloDetector | None = None
+_detector_lock = threading.Lock()
+
+
+def get_detector() -> YoloDetector:
+    """
+    สร้าง YoloDetector ครั้งแรกที่ถูกเรียก (thread-safe) แล้วใช้ตัวเดิมตลอด
+    """
+    global _detector
+    with _detector_lock:
+        if _detector is None:
+            _detector = YoloDetector()
+        return _detector
+
+
+def peek_detector() -> YoloDetector | None:
+    """detector ที่โหลดแล้ว หรือ None ถ้ายังไม่ได้โหลด (ไม่ทำให้เกิดการโหลด)"""
+    return _detector
@@ -0,0 +1,201 @@
+"""
+วัดความเร็วโมเดล/ขนาดภาพบนเครื่องนี้ แล้วเลือกตัวที่แม่นที่สุดที่ยังทันงบเวลา
+
+    python -m app.services.autotune                      # ใช้ค่าจาก .env
+    python -m app.services.autotune --cameras 12 --target-ms 400
+    python -m app.services.autotune --dry-run            # วัดอย่างเดียว ไม่เขียน data/autotune.json
+
+ผลถูกเก็บใน data/autotune.json และ YoloDetector จะโหลดตามนั้นตอนเริ่ม (AUTOTUNE_APPLY=1)
+"""
+import argparse
+import json
+import math
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+import cv2
+import numpy as np
+import ultralytics
+from ultralytics.utils import ASSETS
+from ..core.config import (
+    AUTOTUNE_MODELS, AUTOTUNE_IMGSZ, AUTOTUNE_TARGET_MS, AUTOTUNE_CAMERAS, AUTOTUNE_RUNS,
+    INFER_BACKEND, INFER_MAX_BATCH, CONF_THRES, IOU_THRES, DEVICE, CAMERAS_JSON,
+)
+from ..core.logger import get_logger
+from ..infrastructure.model_backends import (
+    load_model, load_autotune, save_autotune, autotune_matches_host, host_fingerprint,
+)
+
+log = get_logger("autotune")
+
+
+def _split(raw: str) -> List[str]:
+    return [x.strip() for x in raw.split(",") if x.strip()]
+
+
+def count_cameras() -> int:
+    if not CAMERAS_JSON.exists():
+        return 1
+    try:
+        cams = json.loads(CAMERAS_JSON.read_text(encoding="utf-8"))
+    except Exception:
+        return 1
+    # "_global_classes" ไม่ใช่กล้อง
+    return max(1, sum(1 for k, v in cams.items() if not k.startswith("_") and isinstance(v, dict)))
+
+
+def sample_frame(width: int = 1280, height: int = 720) -> np.ndarray:
+    """ภาพตัวอย่างที่มีคน/รถจริง (มากับ ultralytics) ขนาดเท่ากล้อง HD"""
+    img = cv2.imread(str(ASSETS / "bus.jpg"))
+    if img is None:
+        return np.full((height, width, 3), 114, np.uint8)
+    return cv2.resize(img, (width, height))
+
+
+def benchmark(model_name: str, imgsz: int, batch: int, runs: int = AUTOTUNE_RUNS, backend: str = INFER_BACKEND) -> dict:
+    """
+    วัดเวลา predict ของ batch ขนาด batch (ค่ากลางจาก runs ครั้ง หลัง warm-up)
+    """
+    model, used = load_model(model_name, backend=backend, imgsz=imgsz)
+    frames = [sample_frame()] * batch
+    kwargs = dict(conf=CONF_THRES, iou=IOU_THRES, device=DEVICE, imgsz=imgsz, verbose=False)
+
+    for _ in range(2):
+        model.predict(source=frames, **kwargs)
+
+    times = []
+    for _ in range(max(1, runs)):
+        t0 = time.perf_counter()
+        model.predict(source=frames, **kwargs)
+        times.append((time.perf_counter() - t0) * 1000)
+
+    batch_ms = float(np.median(times))
+    return {
+        "model": model_name,
+        "imgsz": imgsz,
+        "backend": used,
+        "batch": batch,
+        "batch_ms": round(batch_ms, 1),
+        "per_frame_ms": round(batch_ms / batch, 1),
+    }
+
+
+def autotune(
+    models: Optional[List[str]] = None,
+    sizes: Optional[List[int]] = None,
+    cameras: int = AUTOTUNE_CAMERAS,
+    target_ms: float = AUTOTUNE_TARGET_MS,
+    runs: int = AUTOTUNE_RUNS,
+    save: bool = True,
+) -> dict:
+    """
+    ลองทุกคู่ (โมเดล, imgsz) เรียงจากเบาไปหนัก
+    ผ่านงบ = detect ครบทุกกล้อง 1 รอบ (ceil(cameras / batch) batch) ใช้เวลาไม่เกิน target_ms
+
+    เลือกโมเดลท้ายสุดในรายการ (แม่นสุด) ที่ผ่าน แล้วเลือก imgsz ใหญ่สุดของโมเดลนั้น
+    ถ้าไม่มีตัวไหนผ่าน เลือกตัวที่เร็วที่สุดแล้วบันทึกว่า feasible = false
+    """
+    models = models or _split(AUTOTUNE_MODELS)
+    sizes = sorted(sizes or [int(x) for x in _split(AUTOTUNE_IMGSZ)])
+    cameras = cameras if cameras > 0 else count_cameras()
+    batch = max(1, min(cameras, INFER_MAX_BATCH))
+    rounds = math.ceil(cameras / batch)
+
+    log.info(
+        f"Autotune: {len(models)} models x {len(sizes)} sizes, {cameras} cameras "
+        f"(batch {batch}), target {target_ms:.0f} ms per round"
+    )
+
+    measured = []
+    for model_name in models:
+        model_fits = failed = False
+        for imgsz in sizes:
+            try:
+                m = benchmark(model_name, imgsz, batch, runs)
+            except Exception as e:
+                log.warning(f"Benchmark failed for {model_name}@{imgsz}, skipping model: {e}")
+                failed = True
+                break
+            m["round_ms"] = round(m["batch_ms"] * rounds, 1)
+            m["fits"] = m["round_ms"] <= target_ms
+            measured.append(m)
+            log.info(
+                f"  {model_name}@{imgsz} [{m['backend']}]: {m['per_frame_ms']} ms/frame, "
+                f"{m['round_ms']} ms/round {'OK' if m['fits'] else 'too slow'}"
+            )
+            if not m["fits"]:
+                break   # imgsz ใหญ่กว่านี้ก็ช้ากว่า
+            model_fits = True
+        if failed:
+            continue    # ข้ามเฉพาะโมเดลที่ล้มเหลว โมเดลถัดไปยังลองต่อ
+        if not model_fits and measured:
+            break       # ขนาดเล็กสุดยังไม่ทัน โมเดลที่ใหญ่กว่าก็ไม่ทัน
+
+    if not measured:
+        raise RuntimeError("No model could be benchmarked")
+
+    fits = [m for m in measured if m["fits"]]
+    feasible = bool(fits)
+    best = fits[-1] if fits else min(measured, key=lambda m: m["round_ms"])
+
+    result = {
+        "model": best["model"],
+        "imgsz": best["imgsz"],
+        "backend": best["backend"],
+        "feasible": feasible,
+        "per_frame_ms": best["per_frame_ms"],
+        "round_ms": best["round_ms"],
+        "cameras": cameras,
+        "batch": batch,
+        "target_ms": target_ms,
+        "measured": measured,
+        "host": host_fingerprint(),
+        "ultralytics": ultralytics.__version__,
+        "created": datetime.now(timezone.utc).isoformat(),
+    }
+    if save:
+        save_autotune(result)
+    log.info(
+        f"Autotune picked {result['model']}@{result['imgsz']} ({result['round_ms']} ms/round)"
+        + ("" if feasible else " — nothing met the target, using the fastest")
+    )
+    return result
+
+
+def ensure_autotuned() -> Optional[dict]:
+    """
+    ใช้ตอนเริ่มระบบ (AUTOTUNE_ON_START=1): วัดใหม่เฉพาะเมื่อยังไม่มีผล หรือผลเดิมมาจากเครื่อง/device อื่น
+    """
+    result = load_autotune()
+    if autotune_matches_host(result):
+        return result
+    try:
+        return autotune()
+    except Exception as e:
+        log.warning(f"Autotune failed: {e}")
+        return None
+
+
+def main(argv: Optional[List[str]] = None):
+    p = argparse.ArgumentParser(description="Pick the most accurate YOLO model/imgsz this host can sustain")
+    p.add_argument("--models", default=AUTOTUNE_MODELS, help="comma separated, smallest → most accurate")
+    p.add_argument("--imgsz", default=AUTOTUNE_IMGSZ, help="comma separated input sizes")
+    p.add_argument("--cameras", type=int, default=AUTOTUNE_CAMERAS, help="0 = count cameras.json")
+    p.add_argument("--target-ms", type=float, default=AUTOTUNE_TARGET_MS)
+    p.add_argument("--runs", type=int, default=AUTOTUNE_RUNS)
+    p.add_argument("--dry-run", action="store_true", help="do not write data/autotune.json")
+    args = p.parse_args(argv)
+
+    result = autotune(
+        models=_split(args.models),
+        sizes=[int(x) for x in _split(args.imgsz)],
+        cameras=args.cameras,
+        target_ms=args.target_ms,
+        runs=args.runs,
+        save=not args.dry_run,
+    )
+    print(json.dumps({k: v for k, v in result.items() if k != "measured"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
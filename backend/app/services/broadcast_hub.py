@@ -0,0 +1,223 @@
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+import numpy as np
+from ..core.logger import get_logger
+from ..domain.detections import Detections
+from ..infrastructure.annotator import annotate
+from ..infrastructure.image_codec import encode_jpeg, resize_to_width
+from ..core.config import JPEG_QUALITY, STREAM_WIDTH_STEP, STREAM_QUALITY_STEP
+from .frame_slot import FrameSlot
+
+log = get_logger("broadcast_hub")
+
+
+@dataclass(frozen=True)
+class EncodedFrame:
+    """
+    ผลลัพธ์ของ 1 เฟรมต้นทางที่ detect + encode แล้ว (อ่านอย่างเดียว แชร์ให้ทุก subscriber)
+    """
+    cam_id: str
+    seq: int          # seq ของเฟรมต้นทางจาก StreamWorker
+    ts: float
+    jpg: bytes        # b"" ถ้าไม่มีใครต้องใช้ภาพของเฟรมนี้ (ไม่มีผู้ชม / ไม่ได้เซฟ)
+    dets: Detections
+    inferred: bool = False
+    raw_jpg: bytes = b""   # เฟรมที่ไม่วาดกรอบ (มีเฉพาะเมื่อมีผู้ชมแบบ raw)
+    width: int = 0         # ขนาดเฟรมต้นทาง ให้ client scale กรอบเอง
+    height: int = 0
+    frame: Optional[np.ndarray] = field(default=None, compare=False, repr=False)  # เฟรมดิบ (read-only) ไว้ทำภาพย่อ
+
+
+class CameraChannel:
+    def __init__(self, cam_id: str):
+        self.cam_id = cam_id
+        self.slot = FrameSlot()
+        self.viewers = 0        # ผู้ชมภาพที่วาดกรอบแล้ว
+        self.raw_viewers = 0    # ผู้ชมภาพดิบ (วาดกรอบเองจาก /ws/detections)
+        self.last_inferred: Optional[EncodedFrame] = None   # เฟรมล่าสุดที่ detect จริง (ผล detect ล่าสุด)
+        self.source_seq = -1    # seq ต้นทางล่าสุดที่ publish แล้ว
+        self.stale = 0          # เฟรมที่มาช้ากว่าเฟรมที่ publish ไปแล้ว (ถูกทิ้ง)
+        self.publish_lock = threading.Lock()
+        # ภาพ encode แล้วของเฟรมล่าสุดตาม (raw, width, quality) ใช้ร่วมกันทุก client ที่ขอแบบเดียวกัน
+        self.variant_lock = threading.Lock()
+        self.variant_seq = -1
+        self.variants: Dict[tuple, bytes] = {}
+
+    @property
+    def latest(self) -> Optional[EncodedFrame]:
+        return self.slot.get()[1]
+
+    def publish(self, frame: EncodedFrame) -> int:
+        """
+        ส่งเฟรมให้ผู้ชม เฟรมที่ seq ต้นทางเก่ากว่าเฟรมที่ publish ไปแล้วจะถูกทิ้ง (ภาพไม่ย้อนเวลา)
+        แต่ผล detect ที่ใหม่กว่า last_inferred ยังถูกเก็บไว้ คืน seq ของช่อง
+        """
+        with self.publish_lock:
+            if frame.inferred and (self.last_inferred is None or frame.seq > self.last_inferred.seq):
+                self.last_inferred = frame
+            if frame.seq <= self.source_seq:
+                self.stale += 1
+                return self.slot.seq
+            self.source_seq = frame.seq
+            return self.slot.put(frame)
+
+    def wait_newer(self, after_seq: int, timeout: float) -> Optional[Tuple[int, EncodedFrame]]:
+        return self.slot.wait_newer(after_seq, timeout)
+
+    async def wait_newer_async(self, after_seq: int, timeout: float) -> Optional[Tuple[int, EncodedFrame]]:
+        return await self.slot.wait_newer_async(after_seq, timeout)
+
+    def cached_variant(self, item: EncodedFrame, raw: bool, width: int, quality: int = JPEG_QUALITY) -> Optional[bytes]:
+        """
+        ภาพที่ encode ไว้แล้ว (ไม่ encode เพิ่ม ไม่รอ lock) ให้ event loop เรียกได้โดยไม่ block
+        คืน None ถ้ายังไม่มี ต้องเรียก variant() ใน thread
+        """
+        width = 0 if width >= item.width else width
+        if width <= 0 and quality == JPEG_QUALITY:
+            full = item.raw_jpg if raw else item.jpg
+            if full:
+                return full
+        if item.seq != self.variant_seq:
+            return None
+        return self.variants.get((raw, width, quality))
+
+    def variant(self, item: EncodedFrame, raw: bool, width: int, quality: int = JPEG_QUALITY) -> bytes:
+        """
+        JPEG ของ item แบบ raw/วาดกรอบ ย่อเหลือกว้าง width (0 = เต็ม) ที่ quality ที่ขอ
+        encode ครั้งเดียวต่อเฟรมต่อแบบ client คนอื่นที่ขอแบบเดียวกันได้ bytes ชุดเดิม
+        (ใช้ normalize_variant() ก่อน เพื่อให้ขนาด/quality ใกล้ๆ กันรวมเป็นแบบเดียว)
+        """
+        cached = self.cached_variant(item, raw, width, quality)
+        if cached is not None:
+            return cached
+        width = 0 if width >= item.width else width
+        if item.frame is None:
+            return b""
+
+        with self.variant_lock:
+            if item.seq > self.variant_seq:
+                self.variant_seq = item.seq
+                self.variants = {}
+            cache = self.variants if item.seq == self.variant_seq else {}   # เฟรมเก่า: encode แต่ไม่เก็บ
+            key = (raw, width, quality)
+            data = cache.get(key)
+            if data is None:
+                # ย่อภาพดิบก่อนแล้วค่อยวาดกรอบบนภาพเล็ก (ถูกกว่าวาดบนภาพเต็มแล้วย่อ)
+                img = resize_to_width(item.frame, width)
+                if not raw and len(item.dets):
+                    img = annotate(img, item.dets.scaled(img.shape[1] / item.frame.shape[1]))
+                data = encode_jpeg(img, quality)
+                cache[key] = data
+            return data
+
+
+def detection_record(item: EncodedFrame) -> dict:
+    """
+    ผล detect ของ 1 เฟรมแบบกะทัดรัด (ไม่มีภาพ)
+    seq ตรงกับ seq ของเฟรมต้นทาง, w/h คือขนาดเฟรมที่พิกัด boxes อ้างอิง
+    """
+    return {
+        "seq": item.seq,
+        "ts": round(item.ts, 3),
+        "w": item.width,
+        "h": item.height,
+        **item.dets.to_columns(),
+    }
+
+
+def normalize_variant(width: int, quality: int) -> Tuple[int, int]:
+    """
+    ปัด width / quality ที่ client ขอเป็นขั้น (STREAM_WIDTH_STEP / STREAM_QUALITY_STEP)
+    width <= 0 = เต็ม, quality <= 0 = JPEG_QUALITY
+    """
+    if width > 0:
+        width = max(STREAM_WIDTH_STEP, width // STREAM_WIDTH_STEP * STREAM_WIDTH_STEP)
+    else:
+        width = 0
+    if quality > 0:
+        quality = min(95, max(10, round(quality / STREAM_QUALITY_STEP) * STREAM_QUALITY_STEP))
+    else:
+        quality = JPEG_QUALITY
+    return width, quality
+
+
+class BroadcastHub:
+    """
+    ช่องกระจายผลต่อกล้อง: detect + encode ครั้งเดียวต่อเฟรมต้นทาง
+    ไม่ว่าจะมีคนดู MJPEG กี่คน ทุกคนอ่าน bytes ชุดเดียวกัน
+    """
+
+    def __init__(self):
+        self.channels: Dict[str, CameraChannel] = {}
+        self.lock = threading.Lock()
+
+    def channel(self, cam_id: str) -> CameraChannel:
+        with self.lock:
+            ch = self.channels.get(cam_id)
+            if ch is None:
+                ch = CameraChannel(cam_id)
+                self.channels[cam_id] = ch
+            return ch
+
+    def publish(self, frame: EncodedFrame):
+        self.channel(frame.cam_id).publish(frame)
+
+    def latest(self, cam_id: str) -> Optional[EncodedFrame]:
+        ch = self.channels.get(cam_id)
+        return ch.latest if ch else None
+
+    def last_inferred(self, cam_id: str) -> Optional[EncodedFrame]:
+        ch = self.channels.get(cam_id)
+        return ch.last_inferred if ch else None
+
+    def wait(self, cam_id: str, after_seq: int, timeout: float = 1.0) -> Optional[Tuple[int, EncodedFrame]]:
+        """
+        รอเฟรมที่ publish หลัง after_seq (seq ของช่อง ไม่ใช่ seq ของเฟรมต้นทาง)
+        คืน (seq, frame) หรือ None ถ้าหมดเวลา
+        """
+        return self.channel(cam_id).wait_newer(after_seq, timeout)
+
+    async def wait_async(self, cam_id: str, after_seq: int, timeout: float = 1.0) -> Optional[Tuple[int, EncodedFrame]]:
+        """
+        เหมือน wait() สำหรับ coroutine: ผู้ชมหลายร้อยคนรอได้โดยไม่ใช้ thread ของ threadpool
+        """
+        return await self.channel(cam_id).wait_newer_async(after_seq, timeout)
+
+    @contextmanager
+    def viewer(self, cam_id: str, raw: bool = False):
+        """
+        นับผู้ชมที่ต้องการภาพของกล้องนี้ ตลอดช่วง with (DetectionService ใช้ตัดสินว่าต้อง encode แบบไหน)
+        raw=True = ต้องการภาพที่ไม่วาดกรอบ
+        """
+        attr = "raw_viewers" if raw else "viewers"
+        ch = self.channel(cam_id)
+        with self.lock:
+            setattr(ch, attr, getattr(ch, attr) + 1)
+        try:
+            yield ch
+        finally:
+            with self.lock:
+                setattr(ch, attr, getattr(ch, attr) - 1)
+
+    def variant(self, item: EncodedFrame, raw: bool = False, width: int = 0, quality: int = JPEG_QUALITY) -> bytes:
+        return self.channel(item.cam_id).variant(item, raw, width, quality)
+
+    def cached_variant(
+        self, item: EncodedFrame, raw: bool = False, width: int = 0, quality: int = JPEG_QUALITY,
+    ) -> Optional[bytes]:
+        return self.channel(item.cam_id).cached_variant(item, raw, width, quality)
+
+    def viewers(self, cam_id: str, raw: bool = False) -> int:
+        ch = self.channels.get(cam_id)
+        if ch is None:
+            return 0
+        return ch.raw_viewers if raw else ch.viewers
+
+    def remove(self, cam_id: str):
+        with self.lock:
+            ch = self.channels.pop(cam_id, None)
+        if ch:
+            ch.slot.wake_all()
+            log.info(f"Removed broadcast channel {cam_id}")
@@ -6,9 +6,12 @@ from ..core.logger import get_logger
 
 log = get_logger("camera_service")
 
+GLOBAL_CLASSES_KEY = "_global_classes"   # ค่า detect_classes รวม เก็บใน cameras.json คู่กับกล้อง
+
 class CameraService:
     def __init__(self, base_stream_path: str = "/api/stream/"):
         self.base_stream_path = base_stream_path
+        self.version = 0   # เพิ่มทุกครั้งที่ config เปลี่ยน (ให้ cache ที่อ้าง config รู้ว่าต้องล้าง)
         self._load()
 
     def _load(self):
@@ -19,12 +22,20 @@ class CameraService:
             self._save()
 
     def _save(self):
+        self.version += 1
         CAMERAS_JSON.write_text(json.dumps(self.cameras, ensure_ascii=False, indent=2), encoding="utf-8")
 
     def list(self) -> List[dict]:
-        return list(self.cameras.values())
+        """กล้องทั้งหมด (ไม่รวม entry ตั้งค่าอย่าง _global_classes ที่เก็บอยู่ในไฟล์เดียวกัน)"""
+        return [c for cam_id, c in self.cameras.items() if cam_id != GLOBAL_CLASSES_KEY and "id" in c]
 
-    def add(self, name: str, location: str | None, protocol: str, source: str, detect_classes: str | None) -> dict:
+    def add(
+        self, name: str, location: str | None, protocol: str, source: str, detect_classes: str | None,
+        **options,
+    ) -> dict:
+        """
+        options: ค่าตั้งต่อกล้องเพิ่มเติม (เช่น motion_*) เก็บเฉพาะที่ตั้งค่า ไม่ตั้ง = ใช้ค่าจาก .env
+        """
         cam_id = uuid.uuid4().hex[:8]
         item = {
             "id": cam_id,
@@ -33,7 +44,8 @@ class CameraService:
             "protocol": protocol,
             "source": source,
             "detect_classes": detect_classes,
-            "stream_url": f"{self.base_stream_path}{cam_id}"
+            "stream_url": f"{self.base_stream_path}{cam_id}",
+            **{k: v for k, v in options.items() if v is not None},
         }
         self.cameras[cam_id] = item
         self._save()
@@ -41,18 +53,20 @@ class CameraService:
         return item
 
     def delete(self, cam_id: str) -> bool:
-        if cam_id in self.cameras:
+        if cam_id in self.cameras and cam_id != GLOBAL_CLASSES_KEY:
             del self.cameras[cam_id]
             self._save()
             return True
         return False
 
     def get(self, cam_id: str) -> dict | None:
+        if cam_id == GLOBAL_CLASSES_KEY:
+            return None
         return self.cameras.get(cam_id)
 
     def set_global_classes(self, detect_classes: str):
-        self.cameras["_global_classes"] = {"detect_classes": detect_classes}
+        self.cameras[GLOBAL_CLASSES_KEY] = {"detect_classes": detect_classes}
         self._save()
 
     def get_global_classes(self) -> str | None:
-        return self.cameras.get("_global_classes", {}).get("detect_classes")
+        return self.cameras.get(GLOBAL_CLASSES_KEY, {}).get("detect_classes")
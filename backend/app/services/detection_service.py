@@ -1,12 +1,13 @@
-import cv2, time
-import numpy as np
+import threading
 from datetime import datetime, timezone
-from typing import List, Optional
-from ..infrastructure.yolo_model import YoloDetector
-from ..infrastructure.file_storage import save_frame
-from ..infrastructure.notification_client import notify_saved
+from typing import Dict, List, Optional
+from ..infrastructure.image_codec import encode_jpeg
 from ..core.logger import get_logger
-from ..core.config import DETECT_CLASSES, DETECT_EVERY_N
+from ..core.config import DETECT_CLASSES
+from ..domain.detections import Detections
+from .broadcast_hub import BroadcastHub, EncodedFrame
+from .event_policy import EventPolicy
+from .event_writer import EventJob, EventWriter
 
 log = get_logger("detection_service")
 
@@ -25,61 +26,108 @@ def parse_classes(names_map: dict, classes_str: str | None) -> Optional[List[int
             idxs.append(int(w))
         elif w in inv:
             idxs.append(inv[w])
+        else:
+            log.warning(f"Unknown class '{w}' in detect_classes")
     return idxs
 
 
-class DetectionService:
-    def __init__(self, model: YoloDetector, stream_service):
-        self.model = model
-        self.stream_service = stream_service  # ✅ ใช้ตัวเดียวกับระบบหลัก
-        self.last_saved_ts = {}
-        self.frame_count = {}
+def classes_for_camera(names_map: dict, cam: dict, global_classes: str | None = None) -> Optional[List[int]]:
+    # ลำดับ: ของกล้อง → global (/api/classes) → DETECT_CLASSES ใน .env
+    classes_str = cam.get("detect_classes") or global_classes or DETECT_CLASSES
+    return parse_classes(names_map, classes_str)
 
-    def process(self, cam: dict, frame_bgr: np.ndarray) -> tuple[bytes, list]:
-        cam_id = cam["id"]
 
-        # ถ้า worker หยุดแล้ว ไม่ต้อง detect
-        worker = self.stream_service.workers.get(cam_id)
-        if not worker or not worker.running:
-            log.info(f"🧹 Skip detection: {cam_id} stream stopped")
-            return b"", []
+class ClassFilterCache:
+    """
+    เก็บผล classes_for_camera ต่อกล้อง ไม่ต้อง parse ใหม่ทุกเฟรม
+    ล้างทั้งหมดเมื่อ config กล้องหรือ global classes เปลี่ยน (ดูจาก CameraService.version)
+    """
 
-        self.frame_count[cam_id] = self.frame_count.get(cam_id, 0) + 1
+    def __init__(self, camera_service=None):
+        self.camera_service = camera_service
+        self.lock = threading.Lock()
+        self.cache: Dict[str, Optional[List[int]]] = {}
+        self.version = None
 
-        # fallback detect_classes
-        classes_str = cam.get("detect_classes") or DETECT_CLASSES
-        classes_filter = parse_classes(self.model.names, classes_str)
+    def for_camera(self, names_map: dict, cam: dict) -> Optional[List[int]]:
+        version = self.camera_service.version if self.camera_service is not None else 0
+        cam_id = cam["id"]
+        with self.lock:
+            if version != self.version:
+                self.cache.clear()
+                self.version = version
+            if cam_id in self.cache:
+                return self.cache[cam_id]
+
+        global_classes = self.camera_service.get_global_classes() if self.camera_service is not None else None
+        # ใช้ config ล่าสุดของกล้อง (cam ที่ส่งมาอาจเป็น dict ตอนเปิด stream)
+        current = self.camera_service.get(cam_id) if self.camera_service is not None else None
+        classes = classes_for_camera(names_map, current or cam, global_classes)
+        with self.lock:
+            if self.version == version:
+                self.cache[cam_id] = classes
+        log.info(f"Class filter for {cam_id}: {'all' if classes is None else classes}")
+        return classes
+
+    def invalidate(self, cam_id: str | None = None):
+        with self.lock:
+            if cam_id is None:
+                self.cache.clear()
+            else:
+                self.cache.pop(cam_id, None)
 
-        # ตรวจเฉพาะทุกๆ DETECT_EVERY_N เฟรม
-        if self.frame_count[cam_id] % DETECT_EVERY_N != 0:
-            ok, jpg = cv2.imencode(".jpg", frame_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-            return (jpg.tobytes() if ok else b""), []
 
-        try:
-            annotated, dets = self.model.detect(frame_bgr, classes_filter)
-        except Exception as e:
-            log.warning(f"YOLO detect error on {cam_id}: {e}")
-            return b"", []
+class DetectionService:
+    def __init__(self, stream_service, hub: BroadcastHub, writer: Optional[EventWriter] = None):
+        self.stream_service = stream_service  # ✅ ใช้ตัวเดียวกับระบบหลัก
+        self.hub = hub
+        self.events = EventPolicy()
+        # เซฟ/แจ้งเตือนใน thread แยก (process ถูกเรียกจาก thread ของ inference / กล้อง)
+        self.writer = writer or EventWriter()
+
+    def process(self, cam: dict, result) -> tuple[bytes, Detections]:
+        """
+        ตัดสินการเซฟ/แจ้งเตือนจาก Detections แล้ว publish เข้า BroadcastHub
+        วาดกรอบ + encode JPEG เฉพาะเมื่อมีผู้ชม ภาพของ event encode + เซฟ + แจ้งเตือนใน EventWriter
+        """
+        cam_id = cam["id"]
+        dets = result.dets
 
-        ok, jpg = cv2.imencode(".jpg", annotated, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-        if not ok:
+        # ถ้า worker หยุดแล้ว ไม่ต้องทำต่อ
+        worker = self.stream_service.workers.get(cam_id)
+        if not worker or not worker.running:
+            log.info(f"🧹 Skip detection: {cam_id} stream stopped")
             return b"", dets
 
-        jpg_bytes = jpg.tobytes()
-
-        # เซฟรูปทุก 5 วิ
-        if dets:
-            now = time.time()
-            last = self.last_saved_ts.get(cam_id, 0)
-            if now - last >= 5.0:
-                self.last_saved_ts[cam_id] = now
-
-                cls_name = dets[0][1]
-                dt_utc = datetime.now(timezone.utc)
-                timestamp = dt_utc.strftime("%Y%m%d_%H-%M-%S")
-                fname = f"{cls_name}_{cam['name']}_{timestamp}"
-
-                save_frame(cam.get("location") or cam_id, fname, jpg_bytes)
-                notify_saved(fname, dt_utc)
-
+        # เซฟ/แจ้งเตือนเมื่อมี track ใหม่ (หรือตาม EVENT_POLICY)
+        hit = self.events.check(cam_id, dets)
+
+        jpg_bytes = b""
+        if self.hub.viewers(cam_id) > 0:
+            jpg_bytes = encode_jpeg(result.annotated())
+
+        # ผู้ชมแบบ raw วาดกรอบเองที่ browser; ไม่มีวัตถุ = ภาพเดียวกับ jpg ใช้ซ้ำได้
+        raw_bytes = b""
+        if self.hub.viewers(cam_id, raw=True) > 0:
+            raw_bytes = jpg_bytes if jpg_bytes and len(dets) == 0 else encode_jpeg(result.frame)
+
+        if hit:
+            reason, i = hit
+            cls_name = dets.label(i)
+            track_id = int(dets.track_ids[i])
+            dt_utc = datetime.now(timezone.utc)
+            timestamp = dt_utc.strftime("%Y%m%d_%H-%M-%S")
+            fname = f"{cls_name}_{cam['name']}_{timestamp}"
+            log.info(f"Event on {cam_id}: {reason} ({cls_name}, track {track_id if track_id >= 0 else None})")
+
+            self.writer.submit(EventJob(cam.get("location") or cam_id, fname, dt_utc, result, jpg_bytes))
+
+        h, w = result.frame.shape[:2]
+        self.hub.publish(EncodedFrame(
+            cam_id, result.seq, result.ts, jpg_bytes, dets, result.inferred,
+            raw_jpg=raw_bytes, width=w, height=h, frame=result.frame,
+        ))
         return jpg_bytes, dets
+
+    def forget_camera(self, cam_id: str):
+        self.events.forget(cam_id)
@@ -0,0 +1,104 @@
+import threading, time
+from typing import Dict, Optional, Tuple
+from ..core.config import EVENT_POLICY, EVENT_INTERVAL, EVENT_BEST_CONF_DELTA, TRACK_FORGET_SECONDS
+from ..core.logger import get_logger
+from ..domain.detections import Detections
+
+log = get_logger("event_policy")
+
+EVENT_POLICIES = ("track", "interval")
+
+
+class EventPolicy:
+    """
+    ตัดสินว่าเฟรมไหนควรเซฟ/แจ้งเตือน
+
+    - track: เซฟเมื่อมี track ใหม่ปรากฏ (ครั้งเดียวต่อ track)
+      ถ้าตั้ง best_conf_delta > 0 จะเซฟซ้ำเมื่อ conf ของ track เดิมสูงกว่าครั้งที่เซฟไว้เกิน delta
+    - interval: เซฟไม่เกิน 1 ครั้งต่อ interval วินาทีต่อกล้อง (แบบเดิม)
+    - เฟรมที่ไม่มี track id (tracker ใช้ไม่ได้) จะใช้ interval แทน
+    """
+
+    def __init__(
+        self,
+        mode: str = EVENT_POLICY,
+        interval: float = EVENT_INTERVAL,
+        best_conf_delta: float = EVENT_BEST_CONF_DELTA,
+        forget_seconds: float = TRACK_FORGET_SECONDS,
+        min_gap: float = 1.0,
+    ):
+        if mode not in EVENT_POLICIES:
+            log.warning(f"Unknown EVENT_POLICY '{mode}', using track")
+            mode = "track"
+        self.mode = mode
+        self.interval = interval
+        self.best_conf_delta = best_conf_delta
+        self.forget_seconds = forget_seconds
+        self.min_gap = min_gap
+
+        self.lock = threading.Lock()
+        self.last_saved: Dict[str, float] = {}
+        # cam_id -> {track_id: [conf ที่เซฟไว้, เวลาที่เห็นล่าสุด]}
+        self.tracks: Dict[str, Dict[int, list]] = {}
+        self.last_gc: Dict[str, float] = {}
+
+    def check(self, cam_id: str, dets: Detections, now: Optional[float] = None) -> Optional[Tuple[str, int]]:
+        """
+        คืน (เหตุผล, index ของวัตถุใน dets ที่ทำให้ต้องเซฟ) หรือ None ถ้าไม่ต้องเซฟ
+        เหตุผล: "new_track" | "better" | "interval"
+        """
+        if len(dets) == 0:
+            return None
+        now = now or time.time()
+
+        if self.mode == "interval" or not dets.has_tracks:
+            return self._check_interval(cam_id, now)
+
+        with self.lock:
+            seen = self.tracks.setdefault(cam_id, {})
+            # ชื่อไฟล์ละเอียดแค่วินาที: เว้นอย่างน้อย min_gap ต่อกล้อง
+            # track ใหม่ที่มาระหว่างนี้ยังไม่ถูกจำ จะได้เซฟในเฟรมถัดไปที่พ้นช่วง
+            can_save = now - self.last_saved.get(cam_id, 0) >= self.min_gap
+            hit = None
+            for i, (track_id, conf) in enumerate(zip(dets.track_ids.tolist(), dets.scores.tolist())):
+                if track_id < 0:
+                    continue
+                entry = seen.get(track_id)
+                if entry is None:
+                    if can_save:
+                        seen[track_id] = [conf, now]
+                        if hit is None or hit[0] != "new_track":
+                            hit = ("new_track", i)
+                    continue
+                entry[1] = now
+                if can_save and self.best_conf_delta > 0 and conf >= entry[0] + self.best_conf_delta:
+                    entry[0] = conf
+                    if hit is None:
+                        hit = ("better", i)
+
+            if now - self.last_gc.get(cam_id, 0) >= self.forget_seconds:
+                self.last_gc[cam_id] = now
+                for tid in [t for t, (_c, ts) in seen.items() if now - ts > self.forget_seconds]:
+                    del seen[tid]
+
+            if hit:
+                self.last_saved[cam_id] = now
+            return hit
+
+    def _check_interval(self, cam_id: str, now: float) -> Optional[Tuple[str, int]]:
+        with self.lock:
+            if now - self.last_saved.get(cam_id, 0) < self.interval:
+                return None
+            self.last_saved[cam_id] = now
+        return "interval", 0
+
+    def forget(self, cam_id: str):
+        """ล้าง state ของกล้อง (เรียกเมื่อกล้องหยุด)"""
+        with self.lock:
+            self.tracks.pop(cam_id, None)
+            self.last_saved.pop(cam_id, None)
+            self.last_gc.pop(cam_id, None)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"mode": self.mode, "tracks": {k: len(v) for k, v in self.tracks.items()}}
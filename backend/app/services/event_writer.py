@@ -0,0 +1,91 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from queue import Queue, Empty, Full
+from typing import Optional
+from ..core.config import EVENT_QUEUE_SIZE
+from ..core.logger import get_logger
+from ..infrastructure.file_storage import save_frame
+from ..infrastructure.image_codec import encode_jpeg
+from ..infrastructure.notification_client import notify_saved
+
+log = get_logger("event_writer")
+
+
+@dataclass
+class EventJob:
+    location: str
+    fname: str
+    dt_utc: datetime
+    result: object        # InferenceResult (ใช้วาดกรอบ + encode ถ้ายังไม่มี jpg)
+    jpg: bytes = b""      # JPEG ที่ encode ไว้แล้วให้ผู้ชม (ถ้ามี) ใช้ซ้ำได้
+
+
+class EventWriter:
+    """
+    เซฟภาพ + แจ้งเตือนของ event ใน thread แยก
+    thread ของ inference / กล้อง แค่ใส่งานเข้าคิวแล้วไปต่อ ดิสก์หรือ webhook ที่ช้าไม่หน่วงกล้องอื่น
+
+    - encode JPEG ของ event ใน thread นี้ถ้ายังไม่มีใคร encode ไว้
+    - คิวเต็ม (ดิสก์/outbox ค้างนาน) → ทิ้ง event ใหม่ นับใน dropped
+    """
+
+    def __init__(self, max_queue: int = EVENT_QUEUE_SIZE):
+        self.queue: Queue = Queue(maxsize=max(1, max_queue))
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.saved = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+            self.thread.start()
+
+    def submit(self, job: EventJob) -> bool:
+        self.start()
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except Full:
+            with self.lock:
+                self.dropped += 1
+            log.warning(f"Event queue full ({self.queue.maxsize}); dropped {job.fname}")
+            return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """รอจนคิวว่าง (ไม่เกิน timeout) คืน True ถ้าทำครบ"""
+        done = threading.Event()
+        threading.Thread(target=lambda: (self.queue.join(), done.set()), daemon=True).start()
+        return done.wait(timeout)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"queued": self.queue.qsize(), "saved": self.saved, "dropped": self.dropped, "errors": self.errors}
+
+    def _run(self):
+        while True:
+            try:
+                job = self.queue.get(timeout=1.0)
+            except Empty:
+                continue
+            try:
+                self._handle(job)
+            except Exception as e:
+                with self.lock:
+                    self.errors += 1
+                log.warning(f"Event {job.fname} failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _handle(self, job: EventJob):
+        jpg = job.jpg or encode_jpeg(job.result.annotated())
+        if not jpg:
+            raise RuntimeError("encode failed")
+        save_frame(job.location, job.fname, jpg)
+        notify_saved(job.fname, job.dt_utc)
+        with self.lock:
+            self.saved += 1
@@ -0,0 +1,105 @@
+import asyncio, threading, time
+import numpy as np
+from typing import Any, List, Optional, Tuple
+
+
+class FrameSlot:
+    """
+    ช่องเก็บ "ค่าล่าสุด" พร้อมเลขลำดับ (seq) ที่เพิ่มขึ้นเรื่อยๆ
+
+    - ผู้เขียนเรียก put() ทุกครั้งที่มีค่าใหม่ (ไม่ copy)
+    - ผู้อ่านเรียก wait_newer(seq ล่าสุดที่เคยเห็น) เพื่อ block จนกว่าจะมีค่าใหม่กว่า
+    - ถ้าเป็น numpy array จะถูกตั้งเป็น read-only ทำให้แชร์ให้ทุกคนอ่านได้โดยไม่ต้อง copy
+    - coroutine ใช้ wait_newer_async() แทนได้ ไม่กิน thread ระหว่างรอ
+      (put() จาก thread อื่นปลุกผ่าน loop.call_soon_threadsafe)
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._value: Any = None
+        self._seq = 0
+        self._ts = 0.0
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def put(self, value: Any) -> int:
+        """
+        เก็บค่าใหม่แล้วปลุกผู้รอทั้งหมด คืน seq ของค่านี้
+        """
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+        with self._cond:
+            self._seq += 1
+            self._value = value
+            self._ts = time.time()
+            self._cond.notify_all()
+            self._wake_async()
+            return self._seq
+
+    def get(self) -> Tuple[int, Any]:
+        with self._cond:
+            return self._seq, self._value
+
+    def age(self) -> Optional[float]:
+        """วินาทีตั้งแต่ put() ครั้งล่าสุด (None ถ้ายังไม่เคยมีค่า)"""
+        with self._cond:
+            return None if self._value is None else time.time() - self._ts
+
+    def wait_newer(self, after_seq: int, timeout: float) -> Optional[Tuple[int, Any]]:
+        """
+        รอจนมีค่าที่ seq > after_seq คืน (seq, value) หรือ None ถ้าหมดเวลา
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._value is None or self._seq <= after_seq:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self._seq, self._value
+
+    async def wait_newer_async(self, after_seq: int, timeout: float) -> Optional[Tuple[int, Any]]:
+        """
+        เหมือน wait_newer() แต่ await ใน event loop ไม่ block thread
+        """
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self._value is not None and self._seq > after_seq:
+                return self._seq, self._value
+            fut = loop.create_future()
+            waiter = (loop, fut)
+            self._async_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                if waiter in self._async_waiters:
+                    self._async_waiters.remove(waiter)
+        with self._cond:
+            if self._value is not None and self._seq > after_seq:
+                return self._seq, self._value
+            return None
+
+    def wake_all(self):
+        with self._cond:
+            self._cond.notify_all()
+            self._wake_async()
+
+    def _wake_async(self):
+        # เรียกขณะถือ self._cond
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, fut in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, fut)
+            except RuntimeError:
+                pass    # loop ปิดไปแล้ว
+
+
+def _resolve(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
@@ -0,0 +1,369 @@
+import threading, time
+import numpy as np
+from collections import deque
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Set
+from ..core.logger import get_logger
+from ..domain.detections import Detections
+from ..domain.roi import RoiCache
+from ..infrastructure.annotator import annotate
+from ..core.config import (
+    DETECT_EVERY_N, CAPTURE_GRAB_SKIP, INFER_MAX_BATCH, INFER_QUEUE_DEPTH, INFER_FAIRNESS, INFER_CAMERA_QUOTA,
+    INFER_THREADS,
+)
+from .detection_service import ClassFilterCache
+from .motion_gate import MotionGate
+from .rate_controller import RateController
+
+log = get_logger("inference_scheduler")
+
+FAIRNESS_POLICIES = ("round_robin", "oldest_first")
+
+
+@dataclass
+class InferenceResult:
+    cam_id: str
+    seq: int
+    ts: float
+    frame: np.ndarray
+    dets: Detections
+    inferred: bool = False
+    _annotated: Optional[np.ndarray] = field(default=None, init=False, repr=False)
+
+    def annotated(self) -> np.ndarray:
+        """ภาพที่วาดกรอบแล้ว (วาดครั้งแรกที่เรียก แล้วใช้ซ้ำ) ไม่มีวัตถุ = เฟรมเดิม"""
+        if self._annotated is None:
+            self._annotated = annotate(self.frame, self.dets)
+        return self._annotated
+
+
+class InferenceScheduler:
+    """
+    คิวกลางสำหรับ inference ของทุกกล้อง
+
+    - StreamWorker ส่งเฟรมเข้ามาด้วย submit() (ไม่ block)
+    - inference thread (workers ตัว) ดึงเฟรมจากหลายกล้องมารวมเป็น batch แล้วเรียก infer_batch()
+      กล้องที่มี batch กำลัง inference อยู่จะไม่ถูกหยิบซ้ำจนกว่าจะเสร็จ (ลำดับเฟรม + tracker ไม่ปนกัน)
+    - ผลลัพธ์ของแต่ละกล้องส่งต่อให้ listener ที่ลงทะเบียนด้วย add_listener()
+    - คิวของแต่ละกล้องยาวได้ไม่เกิน queue_depth ถ้า inference ช้ากว่ากล้อง เฟรมเก่าสุดจะถูกทิ้ง
+    - remove_camera() ทิ้ง tracker ของกล้องและแจ้ง listener ที่ลงทะเบียนด้วย add_remove_listener()
+    - ระหว่างที่โมเดลยังโหลดไม่เสร็จ (ยังไม่ได้ start) เฟรมจะถูกส่งต่อแบบไม่ detect
+    - ถ้ามี motion_gate เฟรมที่ภาพนิ่งจะถูกส่งต่อแบบไม่ detect เช่นกัน (ไม่เข้าคิว)
+    - ผลของแต่ละกล้องออกตามลำดับ seq: เฟรมที่ไม่ detect ซึ่งมาระหว่างที่กล้องยังมีเฟรมรอ/กำลัง inference
+      จะถูกพักไว้ (เก็บแค่เฟรมล่าสุด) แล้ว publish ต่อจากผล inference ของเฟรมก่อนหน้า
+    - inference ล้มเหลว → เฟรมของ batch นั้นถูกส่งต่อแบบไม่ detect (ผู้ชมไม่ค้าง)
+    """
+
+    def __init__(
+        self,
+        model=None,   # YoloDetector หรือ DetectorPool
+        max_batch: int = INFER_MAX_BATCH,
+        queue_depth: int = INFER_QUEUE_DEPTH,
+        fairness: str = INFER_FAIRNESS,
+        camera_quota: int = INFER_CAMERA_QUOTA,
+        # ถ้า capture ข้ามการ decode ให้แล้ว ทุกเฟรมที่ส่งมาคือเฟรมที่ต้อง detect
+        detect_every_n: int = 1 if CAPTURE_GRAB_SKIP else DETECT_EVERY_N,
+        workers: int = INFER_THREADS,
+        class_filters: Optional[ClassFilterCache] = None,
+        motion_gate: Optional[MotionGate] = None,
+        rate_controller: Optional[RateController] = None,   # มี = ปรับอัตราต่อกล้องแทน detect_every_n
+    ):
+        if fairness not in FAIRNESS_POLICIES:
+            log.warning(f"Unknown INFER_FAIRNESS '{fairness}', using round_robin")
+            fairness = "round_robin"
+
+        self.model = model
+        self.max_batch = max(1, max_batch)
+        self.queue_depth = max(1, queue_depth)
+        self.fairness = fairness
+        self.camera_quota = max(1, camera_quota)
+        self.detect_every_n = max(1, detect_every_n)
+        self.workers = workers
+        self.class_filters = class_filters or ClassFilterCache()
+        self.motion_gate = motion_gate
+        self.rois = RoiCache()
+        self.rate = rate_controller
+
+        self._cond = threading.Condition()
+        self._pending: Dict[str, Deque[tuple]] = {}
+        self._order: Deque[str] = deque()   # ลำดับ round robin ของกล้อง
+        self._cams: Dict[str, dict] = {}
+        self._busy: Set[str] = set()        # กล้องที่กำลัง inference อยู่
+        self._outstanding: Dict[str, Deque[int]] = {}   # seq ที่ส่งเข้าคิวแล้วแต่ยังไม่ publish (เรียงตาม seq)
+        self._held: Dict[str, tuple] = {}               # เฟรมไม่ detect ล่าสุดที่รอผล inference ก่อนหน้า
+
+        self._listeners: List[Callable[[dict, InferenceResult], None]] = []
+        self._remove_listeners: List[Callable[[str], None]] = []
+
+        self.frame_count: Dict[str, int] = {}
+        self.dropped: Dict[str, int] = {}
+
+        self.running = False
+        self.threads: List[threading.Thread] = []
+
+    # ---------- lifecycle ----------
+
+    def start(self, model=None):
+        if self.running:
+            return
+        if model is not None:
+            self.model = model
+        if self.model is None:
+            raise RuntimeError("InferenceScheduler needs a model before start()")
+        # workers <= 0 → เท่าจำนวน replica ของ DetectorPool (โมเดลตัวเดียว = 1 thread)
+        n = self.workers if self.workers > 0 else getattr(self.model, "size", 1)
+        self.running = True
+        if self.rate is not None:
+            self.rate.set_threads(max(1, n))
+        for i in range(max(1, n)):
+            t = threading.Thread(target=self._loop, name=f"inference-{i}", daemon=True)
+            t.start()
+            self.threads.append(t)
+        log.info(
+            f"Inference scheduler started ({len(self.threads)} threads, batch {self.max_batch}, "
+            f"depth {self.queue_depth}, fairness {self.fairness})"
+        )
+
+    def stop(self):
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        for t in self.threads:
+            if t.is_alive():
+                t.join(timeout=3)
+        log.info("Inference scheduler stopped")
+
+    # ---------- producer side ----------
+
+    def submit(self, cam: dict, frame: np.ndarray, seq: int):
+        """
+        รับเฟรม (read-only) พร้อม seq จาก FrameSlot ของ StreamWorker
+        ถ้าไม่ถึงรอบ (DETECT_EVERY_N หรือ RateController) หรือ motion gate บอกว่าภาพนิ่ง
+        จะ publish เฟรมดิบทันทีโดยไม่ต้องรอคิว
+        """
+        cam_id = cam["id"]
+        self.frame_count[cam_id] = self.frame_count.get(cam_id, 0) + 1
+
+        if (
+            not self.running
+            or not self._due(cam, seq)
+            # เช็คการเคลื่อนไหวใน thread ของกล้องเอง (ถูกกว่า detect หลายร้อยเท่า)
+            or (self.motion_gate is not None and not self.motion_gate.should_infer(cam, frame))
+        ):
+            with self._cond:
+                if self._outstanding.get(cam_id):
+                    # ยังมีเฟรมก่อนหน้ารอผล inference อยู่ → publish ทีหลัง ไม่ให้ผู้ชมย้อนเวลา
+                    self._held[cam_id] = (cam, seq, frame)
+                    return
+            self._publish(cam, seq, frame, Detections.empty(), inferred=False)
+            return
+
+        with self._cond:
+            q = self._pending.get(cam_id)
+            if q is None:
+                q = deque(maxlen=self.queue_depth)
+                self._pending[cam_id] = q
+                self._order.append(cam_id)
+            outstanding = self._outstanding.setdefault(cam_id, deque())
+            if len(q) == q.maxlen:
+                self.dropped[cam_id] = self.dropped.get(cam_id, 0) + 1
+                self._discard(outstanding, q[0][1])
+            q.append((time.time(), seq, frame))   # deque(maxlen) ทิ้งเฟรมเก่าสุดให้เอง
+            outstanding.append(seq)
+            self._cams[cam_id] = cam
+            self._cond.notify()
+        if self.rate is not None:
+            self.rate.queued(cam_id)
+
+    def _due(self, cam: dict, seq: int) -> bool:
+        if self.rate is not None:
+            return self.rate.due(cam)
+        return seq % self.detect_every_n == 0
+
+    def remove_camera(self, cam_id: str):
+        with self._cond:
+            self._pending.pop(cam_id, None)
+            self._cams.pop(cam_id, None)
+            self._outstanding.pop(cam_id, None)
+            self._held.pop(cam_id, None)
+            try:
+                self._order.remove(cam_id)
+            except ValueError:
+                pass
+        self.class_filters.invalidate(cam_id)
+        self.rois.invalidate(cam_id)
+        if self.motion_gate is not None:
+            self.motion_gate.forget(cam_id)
+        if self.rate is not None:
+            self.rate.forget(cam_id)
+        self.frame_count.pop(cam_id, None)
+        self.dropped.pop(cam_id, None)
+        if self.model is not None:
+            self.model.drop_tracker(cam_id)
+        for cb in self._remove_listeners:
+            try:
+                cb(cam_id)
+            except Exception as e:
+                log.warning(f"Remove listener failed for {cam_id}: {e}")
+
+    # ---------- consumer side ----------
+
+    def add_listener(self, callback: Callable[[dict, "InferenceResult"], None]):
+        """
+        ลงทะเบียน callback(cam, result) ที่จะถูกเรียกทุกครั้งที่มีผลของกล้องใดกล้องหนึ่ง
+        """
+        self._listeners.append(callback)
+
+    def add_remove_listener(self, callback: Callable[[str], None]):
+        """
+        ลงทะเบียน callback(cam_id) ที่จะถูกเรียกเมื่อกล้องถูกถอดออกจาก scheduler
+        """
+        self._remove_listeners.append(callback)
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = {cid: len(q) for cid, q in self._pending.items()}
+            busy = sorted(self._busy)
+        return {
+            "pending": pending,
+            "busy": busy,
+            "threads": len(self.threads),
+            "dropped": dict(self.dropped),
+            "frames": dict(self.frame_count),
+            "motion": self.motion_gate.stats() if self.motion_gate is not None else {},
+            "rate": self.rate.stats() if self.rate is not None else {"mode": "fixed", "every_n": self.detect_every_n},
+        }
+
+    # ---------- internals ----------
+
+    def _publish(self, cam: dict, seq: int, frame, dets: Detections, inferred: bool):
+        cam_id = cam["id"]
+        result = InferenceResult(cam_id, seq, time.time(), frame, dets, inferred)
+        for cb in self._listeners:
+            try:
+                cb(cam, result)
+            except Exception as e:
+                log.warning(f"Result listener failed for {cam_id}: {e}")
+
+    def _next_batch(self) -> List[tuple]:
+        """
+        เลือกเฟรมสำหรับ batch ถัดไป (เรียกขณะถือ self._cond)
+        ข้ามกล้องที่ thread อื่นกำลัง inference อยู่ แล้ว mark กล้องที่หยิบไปว่า busy
+        คืนลิสต์ของ (cam, seq, frame)
+        """
+        batch: List[tuple] = []
+
+        if self.fairness == "oldest_first":
+            # ดึงเฟรมที่รอนานที่สุดก่อน ไม่สนว่าเป็นกล้องไหน
+            while len(batch) < self.max_batch:
+                oldest = None
+                for cam_id, q in self._pending.items():
+                    if cam_id in self._busy:
+                        continue
+                    if q and (oldest is None or q[0][0] < self._pending[oldest][0][0]):
+                        oldest = cam_id
+                if oldest is None:
+                    break
+                _ts, seq, frame = self._pending[oldest].popleft()
+                batch.append((self._cams[oldest], seq, frame))
+            self._busy.update(cam["id"] for cam, _, _ in batch)
+            return batch
+
+        # round_robin: วนทีละกล้อง กล้องละไม่เกิน camera_quota เฟรมต่อ batch
+        for _ in range(len(self._order)):
+            if len(batch) >= self.max_batch:
+                break
+            cam_id = self._order[0]
+            self._order.rotate(-1)
+            if cam_id in self._busy:
+                continue
+            q = self._pending.get(cam_id)
+            taken = 0
+            while q and taken < self.camera_quota and len(batch) < self.max_batch:
+                _ts, seq, frame = q.popleft()
+                batch.append((self._cams[cam_id], seq, frame))
+                taken += 1
+        self._busy.update(cam["id"] for cam, _, _ in batch)
+        return batch
+
+    def _has_pending(self) -> bool:
+        return any(q for cam_id, q in self._pending.items() if cam_id not in self._busy)
+
+    def _loop(self):
+        while self.running:
+            with self._cond:
+                while self.running and not self._has_pending():
+                    self._cond.wait(0.5)
+                if not self.running:
+                    break
+                batch = self._next_batch()
+
+            if not batch:
+                continue
+
+            try:
+                self._run_batch(batch)
+            finally:
+                with self._cond:
+                    self._busy.difference_update(cam["id"] for cam, _, _ in batch)
+                    self._cond.notify_all()   # กล้องที่เพิ่งว่างอาจมีเฟรมรออยู่
+
+        log.info("Inference scheduler loop exited")
+
+    def _run_batch(self, batch: List[tuple]):
+        cams = [cam for cam, _, _ in batch]
+        seqs = [seq for _, seq, _ in batch]
+        frames = [frame for _, _, frame in batch]
+        filters = [self.class_filters.for_camera(self.model.names, cam) for cam in cams]
+
+        # DetectorPool: ยืม replica เองเพื่อจับเวลาเฉพาะ inference (ไม่นับเวลารอ replica ว่าง)
+        lease = self.model.lease() if hasattr(self.model, "lease") else nullcontext(self.model)
+        try:
+            with lease as det:
+                t0 = time.perf_counter()
+                # ROI / imgsz ต่อกล้องจาก cameras.json (ไม่ตั้ง = ทั้งภาพ / imgsz ของโมเดล)
+                results = det.infer_batch(
+                    frames, filters, batch_size=self.max_batch, cam_ids=[cam["id"] for cam in cams],
+                    rois=[self.rois.for_camera(cam) for cam in cams],
+                    imgsizes=[cam.get("imgsz") for cam in cams],
+                )
+                elapsed = time.perf_counter() - t0
+            if self.rate is not None:
+                self.rate.observe(len(frames), elapsed)
+        except Exception as e:
+            log.warning(f"Batch inference failed ({len(batch)} frames): {e}")
+            # ส่งต่อแบบไม่ detect แทนการทิ้ง ไม่ให้ผู้ชมค้างรอเฟรม
+            results, inferred = [Detections.empty() for _ in frames], False
+        else:
+            inferred = True
+
+        for cam, seq, frame, dets in zip(cams, seqs, frames, results):
+            if cam["id"] not in self._cams:
+                # กล้องถูกหยุดระหว่าง inference: tracker อาจถูกสร้างใหม่ใน batch นี้ ทิ้งอีกรอบ
+                self.model.drop_tracker(cam["id"])
+                continue
+            self._publish(cam, seq, frame, dets, inferred=inferred)
+            self._finish(cam["id"], seq)
+
+    @staticmethod
+    def _discard(outstanding: Deque[int], seq: int):
+        try:
+            outstanding.remove(seq)
+        except ValueError:
+            pass
+
+    def _finish(self, cam_id: str, seq: int):
+        """
+        เฟรม seq ถูก publish แล้ว: ถ้าไม่มีเฟรมก่อนหน้าเฟรมที่พักไว้ค้างอยู่ publish เฟรมที่พักไว้ต่อ
+        """
+        with self._cond:
+            outstanding = self._outstanding.get(cam_id)
+            if outstanding is not None:
+                self._discard(outstanding, seq)
+            held = self._held.get(cam_id)
+            if held is None or (outstanding and outstanding[0] < held[1]):
+                return
+            del self._held[cam_id]
+        cam, held_seq, frame = held
+        self._publish(cam, held_seq, frame, Detections.empty(), inferred=False)
@@ -0,0 +1,112 @@
+import threading, time
+from typing import Optional
+from ..core.config import (
+    AUTOSTART_CAMERAS, AUTOTUNE_ON_START, CAMERA_START_WORKERS, INFER_MAX_BATCH, WARMUP_WIDTH, WARMUP_HEIGHT,
+)
+from ..core.logger import get_logger
+from ..infrastructure.file_storage import get_retention
+
+log = get_logger("lifecycle")
+
+
+class AppLifecycle:
+    """
+    ลำดับการเริ่มระบบ ทำใน background thread เพื่อให้ import / `/` / `/api/cameras` ตอบได้ทันที
+
+    starting → loading_model → warming_up → ready (ผิดพลาด → failed)
+
+    - torch / ultralytics ถูก import ตอนโหลดโมเดลใน thread นี้ ไม่ใช่ตอน import main
+    - warm-up ใช้ภาพเปล่าขนาดเท่ากล้อง batch เท่าจำนวนกล้อง (ไม่เกิน INFER_MAX_BATCH)
+    - AUTOSTART_CAMERAS=1 เปิดกล้องทั้งหมดพร้อมกันระหว่างโหลดโมเดล
+      (ก่อน ready ภาพจะถูกส่งต่อแบบไม่ detect)
+    """
+
+    def __init__(self, camera_service, stream_service, scheduler):
+        self.camera_service = camera_service
+        self.stream_service = stream_service
+        self.scheduler = scheduler
+        self.detector = None
+
+        self.lock = threading.Lock()
+        self.ready_event = threading.Event()
+        self.state = "starting"
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.timings: dict = {}
+        self.cameras: dict = {}
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._run, name="lifecycle", daemon=True)
+            self.thread.start()
+        # retention สแกน data/saved + ลบไฟล์หมดอายุใน janitor thread ของตัวเอง
+        get_retention()
+        if AUTOSTART_CAMERAS:
+            threading.Thread(target=self._start_cameras, name="camera-bringup", daemon=True).start()
+
+    def stop(self):
+        for cam_id in list(self.stream_service.workers):
+            self.stream_service.stop_worker(cam_id)
+        self.scheduler.stop()
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_event.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self.ready_event.wait(timeout)
+
+    def status(self) -> dict:
+        with self.lock:
+            return {
+                "ready": self.ready,
+                "state": self.state,
+                "error": self.error,
+                "uptime_s": round(time.time() - self.started_at, 2),
+                "timings": dict(self.timings),
+                "cameras": dict(self.cameras),
+            }
+
+    # ---------- internals ----------
+
+    def _set_state(self, state: str):
+        with self.lock:
+            self.state = state
+        log.info(f"Startup state: {state}")
+
+    def _camera_list(self) -> list:
+        return [c for c in self.camera_service.list() if "id" in c]
+
+    def _run(self):
+        try:
+            self._set_state("loading_model")
+            t0 = time.time()
+            if AUTOTUNE_ON_START:
+                from .autotune import ensure_autotuned
+                ensure_autotuned()
+            from ..infrastructure.detector_pool import get_detector_pool
+            self.detector = get_detector_pool()
+            self.timings["model_load_s"] = round(time.time() - t0, 2)
+
+            self._set_state("warming_up")
+            batch = max(1, min(len(self._camera_list()), INFER_MAX_BATCH))
+            self.timings["warmup_s"] = round(self.detector.warmup(WARMUP_WIDTH, WARMUP_HEIGHT, batch), 2)
+
+            self.scheduler.start(self.detector)
+            self.timings["ready_after_s"] = round(time.time() - self.started_at, 2)
+            self._set_state("ready")
+            self.ready_event.set()
+        except Exception as e:
+            with self.lock:
+                self.error = str(e)
+            self._set_state("failed")
+            log.error(f"Startup failed: {e}")
+
+    def _start_cameras(self):
+        cams = self._camera_list()
+        result = self.stream_service.start_many(cams, max_workers=CAMERA_START_WORKERS)
+        with self.lock:
+            self.cameras = {"total": len(cams), "started": len(result["started"]), "failed": result["failed"]}
@@ -0,0 +1,174 @@
+import threading, time
+import cv2
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from ..core.config import (
+    MOTION_GATE, MOTION_WIDTH, MOTION_SENSITIVITY, MOTION_PIXEL_DELTA, MOTION_BG_ALPHA,
+    MOTION_KEEPALIVE_SECONDS, MOTION_HOLD_SECONDS,
+)
+from ..core.logger import get_logger
+
+log = get_logger("motion_gate")
+
+# sensitivity 0..1 → สัดส่วนพื้นที่ (ของภาพย่อ) ที่ต้องเปลี่ยนถึงจะนับว่ามีการเคลื่อนไหว
+# 0 = ต้องเปลี่ยน ~2% ของภาพ, 0.5 = ~1%, 1 = 0.05%
+_MIN_AREA_FLOOR = 0.0005
+_MIN_AREA_SPAN = 0.02
+
+
+def min_area_for(sensitivity: float) -> float:
+    s = min(1.0, max(0.0, sensitivity))
+    return _MIN_AREA_FLOOR + _MIN_AREA_SPAN * (1.0 - s)
+
+
+@dataclass
+class _CameraMotion:
+    background: Optional[np.ndarray] = None      # ค่าเฉลี่ยสะสมของภาพย่อ (float32)
+    mask: Optional[np.ndarray] = None            # 255 = พื้นที่ที่ใช้ตรวจ, 0 = ไม่สนใจ
+    mask_key: Optional[str] = None
+    last_infer: float = 0.0
+    last_motion: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    checked: int = 0
+    motion: int = 0
+    keepalive: int = 0
+    skipped: int = 0
+    last_area: float = 0.0
+
+
+class MotionGate:
+    """
+    ตัวกรองก่อน detect: ย่อภาพ → ขาวดำ → เทียบกับ background เฉลี่ยสะสม
+    สั่ง detect เต็มเฉพาะเมื่อพื้นที่ที่เปลี่ยนเกินเกณฑ์ กล้องที่ภาพนิ่งแทบไม่กิน CPU
+
+    - ตั้งต่อกล้องใน cameras.json (ไม่ตั้ง = ใช้ค่าจาก .env):
+        motion_enabled      true/false
+        motion_sensitivity  0..1 (มาก = ไวขึ้น)
+        motion_mask         polygon ที่ไม่ต้องสนใจ เช่น ต้นไม้/นาฬิกา
+                            [[[x, y], ...], ...] พิกัด 0..1 ของภาพ
+    - มีการเคลื่อนไหวแล้วจะ detect ต่ออีก MOTION_HOLD_SECONDS (คนที่หยุดเดินยังถูก track ต่อ)
+    - ไม่มีการเคลื่อนไหวเลยจะ detect อย่างน้อย 1 ครั้งทุก MOTION_KEEPALIVE_SECONDS
+    """
+
+    def __init__(
+        self,
+        enabled: bool = MOTION_GATE,
+        width: int = MOTION_WIDTH,
+        sensitivity: float = MOTION_SENSITIVITY,
+        pixel_delta: int = MOTION_PIXEL_DELTA,
+        bg_alpha: float = MOTION_BG_ALPHA,
+        keepalive_seconds: float = MOTION_KEEPALIVE_SECONDS,
+        hold_seconds: float = MOTION_HOLD_SECONDS,
+    ):
+        self.enabled = enabled
+        self.width = max(32, width)
+        self.sensitivity = sensitivity
+        self.pixel_delta = pixel_delta
+        self.bg_alpha = bg_alpha
+        self.keepalive_seconds = keepalive_seconds
+        self.hold_seconds = hold_seconds
+
+        self.lock = threading.Lock()
+        self.cameras: Dict[str, _CameraMotion] = {}
+
+    def _state(self, cam_id: str) -> _CameraMotion:
+        with self.lock:
+            st = self.cameras.get(cam_id)
+            if st is None:
+                st = _CameraMotion()
+                self.cameras[cam_id] = st
+            return st
+
+    def enabled_for(self, cam: dict) -> bool:
+        v = cam.get("motion_enabled")
+        return self.enabled if v is None else bool(v)
+
+    def should_infer(self, cam: dict, frame_bgr: np.ndarray, now: Optional[float] = None) -> bool:
+        """
+        True = ควร detect เฟรมนี้ (มีการเคลื่อนไหว / อยู่ในช่วง hold / ถึงรอบ keep-alive / ปิด gate)
+        เรียกจาก thread ของกล้องนั้นเอง กล้องต่างกันไม่แย่ง lock กัน
+        """
+        if not self.enabled_for(cam):
+            return True
+        now = now or time.time()
+        st = self._state(cam["id"])
+
+        with st.lock:
+            st.checked += 1
+            small = self._prepare(frame_bgr)
+            self._ensure_mask(cam["id"], st, cam.get("motion_mask"), small.shape)
+
+            if st.background is None or st.background.shape != small.shape:
+                st.background = small.astype(np.float32)
+                st.last_infer = now
+                return True
+
+            diff = cv2.absdiff(small, cv2.convertScaleAbs(st.background))
+            _, changed = cv2.threshold(diff, self.pixel_delta, 255, cv2.THRESH_BINARY)
+            if st.mask is not None:
+                changed = cv2.bitwise_and(changed, st.mask)
+                total = max(1, cv2.countNonZero(st.mask))
+            else:
+                total = changed.size
+            area = cv2.countNonZero(changed) / total
+            st.last_area = area
+            # ค่อยๆ ปรับ background ตามแสงที่เปลี่ยนช้าๆ
+            cv2.accumulateWeighted(small, st.background, self.bg_alpha)
+
+            sensitivity = cam.get("motion_sensitivity")
+            if area >= min_area_for(self.sensitivity if sensitivity is None else float(sensitivity)):
+                st.last_motion = now
+                st.motion += 1
+            elif now - st.last_motion < self.hold_seconds:
+                pass
+            elif now - st.last_infer >= self.keepalive_seconds:
+                st.keepalive += 1
+            else:
+                st.skipped += 1
+                return False
+
+            st.last_infer = now
+            return True
+
+    def _prepare(self, frame_bgr: np.ndarray) -> np.ndarray:
+        h, w = frame_bgr.shape[:2]
+        height = max(1, round(h * self.width / w))
+        small = cv2.resize(frame_bgr, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def _ensure_mask(self, cam_id: str, st: _CameraMotion, polygons, shape):
+        key = repr((polygons, shape))
+        if key == st.mask_key:
+            return
+        st.mask_key = key
+        st.mask = None
+        if not polygons:
+            return
+        h, w = shape[:2]
+        mask = np.full((h, w), 255, np.uint8)
+        for poly in polygons:
+            pts = np.array([[x * w, y * h] for x, y in poly], np.int32)
+            if len(pts) >= 3:
+                cv2.fillPoly(mask, [pts], 0)
+        st.mask = mask
+        log.info(f"Motion mask for {cam_id}: {len(polygons)} polygon(s), {cv2.countNonZero(mask) / mask.size:.0%} of frame watched")
+
+    def forget(self, cam_id: str):
+        with self.lock:
+            self.cameras.pop(cam_id, None)
+
+    def stats(self) -> dict:
+        with self.lock:
+            cams = dict(self.cameras)
+        return {
+            cam_id: {
+                "checked": st.checked,
+                "motion": st.motion,
+                "keepalive": st.keepalive,
+                "skipped": st.skipped,
+                "last_area": round(st.last_area, 4),
+            }
+            for cam_id, st in cams.items()
+        }
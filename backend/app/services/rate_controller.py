@@ -0,0 +1,152 @@
+import threading, time
+from typing import Dict, List, Optional
+from ..core.config import (
+    DETECT_TARGET_UTIL, DETECT_MAX_FPS, DETECT_MIN_FPS, DETECT_RATE_UPDATE_SECONDS,
+)
+from ..core.logger import get_logger
+
+log = get_logger("rate_controller")
+
+
+class RateController:
+    """
+    ปรับอัตรา detect ต่อกล้องอัตโนมัติ (DETECT_RATE_MODE=adaptive) แทน DETECT_EVERY_N ค่าเดียว
+
+    - วัดเวลา inference จริงต่อเฟรม (observe) → ความจุ = จำนวน inference thread / เวลาต่อเฟรม
+    - งบรวม = ความจุ x DETECT_TARGET_UTIL แบ่งให้กล้องที่ active (มีเฟรมเข้าคิวใน active_seconds ล่าสุด)
+      ตามน้ำหนัก priority ทุกกล้องได้อย่างน้อย min_fps และไม่เกิน DETECT_MAX_FPS หรือ fps จริงของกล้อง
+      ส่วนที่เหลือจากกล้องที่ชนเพดานแบ่งต่อให้กล้องอื่น
+    - ตั้งต่อกล้องใน cameras.json: "priority" (น้ำหนัก ค่าเริ่มต้น 1), "min_fps"
+    - กล้องที่ยังไม่ได้ส่วนแบ่ง (เพิ่งเริ่ม / เพิ่งกลับมา active) ใช้ DETECT_MAX_FPS จนถึงรอบคำนวณถัดไป
+    """
+
+    def __init__(
+        self,
+        target_util: float = DETECT_TARGET_UTIL,
+        max_fps: float = DETECT_MAX_FPS,
+        min_fps: float = DETECT_MIN_FPS,
+        update_seconds: float = DETECT_RATE_UPDATE_SECONDS,
+        active_seconds: float = 5.0,
+        smoothing: float = 0.2,
+    ):
+        self.target_util = target_util
+        self.max_fps = max(0.01, max_fps)
+        self.min_fps = max(0.0, min_fps)
+        self.update_seconds = update_seconds
+        self.active_seconds = active_seconds
+        self.smoothing = smoothing
+
+        self.lock = threading.Lock()
+        self.threads = 1
+        self.frame_cost: Optional[float] = None     # วินาทีต่อเฟรมต่อ thread (ค่าเฉลี่ยเคลื่อนที่)
+        self.cams: Dict[str, dict] = {}
+        self.last_detect: Dict[str, float] = {}
+        self.last_frame: Dict[str, float] = {}
+        self.frame_interval: Dict[str, float] = {}  # ระยะห่างเฉลี่ยระหว่างเฟรมที่กล้องส่งมา
+        self.last_queued: Dict[str, float] = {}
+        self.rates: Dict[str, float] = {}
+        self.budget = 0.0
+        self.next_update = 0.0
+
+    def set_threads(self, threads: int):
+        with self.lock:
+            self.threads = max(1, threads)
+
+    def due(self, cam: dict, now: Optional[float] = None) -> bool:
+        """
+        True = ถึงเวลา detect เฟรมของกล้องนี้แล้ว (เรียกจาก thread ของกล้องทุกเฟรม)
+        ยังไม่นับว่า detect จนกว่าจะเรียก queued(): เฟรมที่ motion gate ตัดทิ้งไม่กินโควตาของกล้อง
+        """
+        now = now or time.time()
+        cam_id = cam["id"]
+        with self.lock:
+            self.cams[cam_id] = cam
+            last = self.last_frame.get(cam_id)
+            self.last_frame[cam_id] = now
+            if last is not None and now > last:
+                avg = self.frame_interval.get(cam_id)
+                gap = now - last
+                self.frame_interval[cam_id] = gap if avg is None else avg + self.smoothing * (gap - avg)
+            if now >= self.next_update:
+                self._rebalance(now)
+            rate = self.rates.get(cam_id, self.max_fps)
+            # เผื่อครึ่งช่วงเฟรม: เฟรมมาไม่ตรงเวลาเป๊ะ ไม่อย่างนั้น rate เท่า fps กล้องจะข้ามเฟรมเว้นเฟรม
+            slack = self.frame_interval.get(cam_id, 0.0) / 2
+            return now - self.last_detect.get(cam_id, 0.0) >= 1.0 / rate - slack
+
+    def queued(self, cam_id: str, now: Optional[float] = None):
+        """เฟรมของกล้องนี้ถูกส่งเข้าคิว inference จริง (ผ่าน motion gate แล้ว) → เริ่มนับรอบถัดไป"""
+        now = now or time.time()
+        with self.lock:
+            self.last_queued[cam_id] = now
+            self.last_detect[cam_id] = now
+
+    def observe(self, frames: int, seconds: float):
+        """เวลาที่ใช้ inference 1 batch จำนวน frames เฟรม"""
+        if frames <= 0 or seconds <= 0:
+            return
+        cost = seconds / frames
+        with self.lock:
+            if self.frame_cost is None:
+                self.frame_cost = cost
+            else:
+                self.frame_cost += self.smoothing * (cost - self.frame_cost)
+
+    def forget(self, cam_id: str):
+        with self.lock:
+            for d in (self.cams, self.last_detect, self.last_frame, self.frame_interval, self.last_queued, self.rates):
+                d.pop(cam_id, None)
+
+    def _camera_limits(self, cam_id: str) -> tuple:
+        """(priority, min_fps, max_fps) ของกล้อง max_fps ไม่เกิน fps ที่กล้องส่งมาจริง"""
+        cam = self.cams.get(cam_id) or {}
+        priority = float(cam.get("priority") or 1.0)
+        interval = self.frame_interval.get(cam_id)
+        max_fps = min(self.max_fps, 1.0 / interval) if interval else self.max_fps
+        min_fps = cam.get("min_fps")
+        min_fps = self.min_fps if min_fps is None else float(min_fps)
+        return max(priority, 1e-3), min(max(0.0, min_fps), max_fps), max_fps
+
+    def _rebalance(self, now: float):
+        # เรียกขณะถือ self.lock
+        self.next_update = now + self.update_seconds
+        if self.frame_cost is None:
+            return
+        active = [cid for cid, ts in self.last_queued.items() if now - ts <= self.active_seconds]
+        self.budget = self.threads / self.frame_cost * self.target_util
+        if not active:
+            self.rates = {}
+            return
+
+        limits = {cid: self._camera_limits(cid) for cid in active}
+        rates: Dict[str, float] = {}
+        open_cams: List[str] = list(active)
+
+        # แบ่งตาม priority; กล้องที่ได้ต่ำกว่า min_fps / เกินเพดาน ถูกตรึงไว้ที่ขอบ แล้วแบ่งงบที่เหลือใหม่
+        while open_cams:
+            remaining = max(0.0, self.budget - sum(rates.values()))
+            total_weight = sum(limits[cid][0] for cid in open_cams)
+            clamped = False
+            for cid in open_cams:
+                priority, low, high = limits[cid]
+                share = remaining * priority / total_weight
+                if share < low or share > high:
+                    rates[cid] = low if share < low else high
+                    clamped = True
+            if not clamped:
+                for cid in open_cams:
+                    rates[cid] = remaining * limits[cid][0] / total_weight
+                break
+            open_cams = [cid for cid in open_cams if cid not in rates]
+
+        # กล้องที่ได้ 0 (min_fps = 0 และงบหมด) ยังได้ detect บ้างนานๆ ครั้ง
+        self.rates = {cid: max(r, 0.01) for cid, r in rates.items()}
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "frame_ms": round(self.frame_cost * 1000, 1) if self.frame_cost is not None else None,
+                "threads": self.threads,
+                "budget_fps": round(self.budget, 2),
+                "rates": {cid: round(r, 2) for cid, r in self.rates.items()},
+            }
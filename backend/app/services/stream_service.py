@@ -1,17 +1,19 @@
 import threading, time
 import cv2
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from ..infrastructure.camera_adapter import open_capture
 from ..core.logger import get_logger
+from .frame_slot import FrameSlot
 
 log = get_logger("stream_service")
 
 class StreamWorker:
-    def __init__(self, cam: dict):
+    def __init__(self, cam: dict, scheduler=None):
         self.cam = cam
+        self.scheduler = scheduler  # InferenceScheduler (ถ้ามี) รับเฟรมไป detect
         self.cap = None
-        self.frame = None
-        self.lock = threading.Lock()
+        self.slot = FrameSlot()    # เฟรมล่าสุด + seq (read-only, ไม่ copy)
         self.running = False
         self.thread: Optional[threading.Thread] = None
 
@@ -38,15 +40,15 @@ class StreamWorker:
                     log.warning(f"Read fail {self.cam['id']}, retry in 1s")
                     time.sleep(1)
                     continue
-                with self.lock:
-                    self.frame = frame
+                seq = self.slot.put(frame)
+                if self.scheduler is not None:
+                    self.scheduler.submit(self.cam, frame, seq)
             except cv2.error as e:
                 log.warning(f"OpenCV read error for {self.cam['id']}: {e}")
                 break
             except Exception as e:
                 log.warning(f"Unknown error while reading {self.cam['id']}: {e}")
                 break
-            time.sleep(0.01)
 
         # cleanup หลังออกจาก loop
         if self.cap:
@@ -58,14 +60,23 @@ class StreamWorker:
         log.info(f"Stopped worker loop for {self.cam['id']}")
 
     def get_latest(self):
-        with self.lock:
-            return None if self.frame is None else self.frame.copy()
+        """
+        เฟรมล่าสุดแบบ read-only (ไม่ copy) ถ้าจะแก้ไขภาพให้ copy เอง
+        """
+        return self.slot.get()[1]
+
+    def wait_frame(self, after_seq: int, timeout: float = 1.0):
+        """
+        รอเฟรมที่ใหม่กว่า after_seq คืน (seq, frame) หรือ None ถ้าหมดเวลา
+        """
+        return self.slot.wait_newer(after_seq, timeout)
 
     def stop(self):
         if not self.running:
             return
         log.info(f"Stopping worker for {self.cam['id']}")
         self.running = False
+        self.slot.wake_all()
         try:
             if self.cap:
                 self.cap.release()
@@ -78,19 +89,60 @@ class StreamWorker:
 
 
 class StreamService:
-    def __init__(self):
+    def __init__(self, scheduler=None, hub=None):
         self.workers: Dict[str, StreamWorker] = {}
+        self.scheduler = scheduler
+        self.hub = hub
+        self.lock = threading.Lock()
+        self.start_locks: Dict[str, threading.Lock] = {}
 
     def ensure_worker(self, cam: dict) -> StreamWorker:
-        w = self.workers.get(cam["id"])
-        if w is None:
-            w = StreamWorker(cam)
-            self.workers[cam["id"]] = w
-            w.start()
+        """
+        คืน worker ของกล้อง (เปิดใหม่ถ้ายังไม่มี) เรียกพร้อมกันหลาย thread ได้
+        การเปิดกล้องล็อกแยกต่อกล้อง กล้องที่เปิดช้าจะไม่ถ่วงกล้องอื่น
+        """
+        cam_id = cam["id"]
+        w = self.workers.get(cam_id)
+        if w is not None:
+            return w
+        with self.lock:
+            start_lock = self.start_locks.setdefault(cam_id, threading.Lock())
+        with start_lock:
+            w = self.workers.get(cam_id)
+            if w is None:
+                w = StreamWorker(cam, self.scheduler)
+                w.start()   # เปิดไม่ได้ → raise และไม่ค้างอยู่ใน registry
+                self.workers[cam_id] = w
         return w
 
+    def start_many(self, cams: List[dict], max_workers: int = 8) -> dict:
+        """
+        เปิดหลายกล้องพร้อมกัน คืน {"started": [...], "failed": {cam_id: error}}
+        """
+        started, failed = [], {}
+        if not cams:
+            return {"started": started, "failed": failed}
+        t0 = time.time()
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(cams))), thread_name_prefix="cam-start") as pool:
+            futures = {pool.submit(self.ensure_worker, cam): cam["id"] for cam in cams}
+            for fut, cam_id in futures.items():
+                try:
+                    fut.result()
+                    started.append(cam_id)
+                except Exception as e:
+                    failed[cam_id] = str(e)
+                    log.warning(f"Cannot start camera {cam_id}: {e}")
+        log.info(f"Started {len(started)}/{len(cams)} cameras in {time.time() - t0:.2f}s")
+        return {"started": started, "failed": failed}
+
     def stop_worker(self, cam_id: str):
         w = self.workers.pop(cam_id, None)
+        with self.lock:
+            self.start_locks.pop(cam_id, None)
         if w:
             w.stop()
             log.info(f"Removed worker {cam_id} from registry")
+        if self.scheduler is not None:
+            self.scheduler.remove_camera(cam_id)
+        if self.hub is not None:
+            self.hub.remove(cam_id)
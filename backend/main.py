@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.detection_routes import router as detection_router
+from fastapi.responses import JSONResponse
+from app.api.detection_routes import router as detection_router, lifecycle
 from app.api.websocket_routes import router as ws_router
 import uvicorn
 import traceback
@@ -22,11 +23,29 @@ app.include_router(detection_router, prefix="/api", tags=["detection"])
 app.include_router(ws_router, prefix="/ws", tags=["websocket"])
 
 
+@app.on_event("startup")
+def on_startup():
+    # โหลดโมเดล + warm-up ใน background, server รับ request ได้ทันที
+    lifecycle.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    lifecycle.stop()
+
+
 @app.get("/")
 def root():
     return {"ok": True, "name": "face-detect-clean", "status": "running"}
 
 
+@app.get("/ready")
+def ready():
+    # 200 เมื่อโมเดลโหลด + warm-up เสร็จ, 503 ระหว่างเริ่มระบบ (ใช้กับ readiness probe)
+    status = lifecycle.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
 # main.py
 if __name__ == "__main__":
     try:
@@ -1,12 +1,18 @@
 import os
 import time
 import cv2
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from datetime import datetime
 import pytz
 
-from app.infrastructure.yolo_model import YoloDetector
+from app.infrastructure.yolo_model import get_detector
+from app.infrastructure.annotator import annotate
+from app.infrastructure.notification_client import get_dispatcher
+from app.infrastructure.file_storage import get_writer
+from app.core.config import DETECT_BATCH_SIZE, CAMERA_START_WORKERS, WARMUP_WIDTH, WARMUP_HEIGHT
+from app.services.event_policy import EventPolicy
+from app.services.motion_gate import MotionGate
 from app.core.logger import get_logger
 
 # ======================
@@ -25,7 +31,13 @@ CAMERA_LIST = os.getenv("CAMERA_LIST", "")
 NOTIFY_URL = os.getenv("NOTIFY_URL", "")
 DETECT_CLASSES = os.getenv("DETECT_CLASSES", "person,car").split(",")
 
-DETECT_INTERVAL = 5  # save every 5 seconds
+DETECT_INTERVAL = 5  # save every 5 seconds (EVENT_POLICY=interval หรือเมื่อไม่มี track id)
+
+# เซฟ/แจ้งเตือนครั้งเดียวต่อ track ใหม่ (ตาม EVENT_POLICY)
+events = EventPolicy(interval=DETECT_INTERVAL)
+
+# ข้าม YOLO เมื่อภาพนิ่ง (MOTION_GATE=1)
+motion = MotionGate()
 
 TH_TZ = pytz.timezone("Asia/Bangkok")
 UTC_TZ = pytz.utc
@@ -52,6 +64,7 @@ def parse_camera_env():
         name, location, protocol, source = parts[:4]
 
         cams.append({
+            "id": name,     # MotionGate / state ต่อกล้องใช้ id
             "name": name,
             "location": location,
             "protocol": protocol.upper(),
@@ -67,12 +80,17 @@ def parse_camera_env():
 # ======================
 def get_class_ids(detector, target_classes):
     target_classes = [c.strip().lower() for c in target_classes]
+    if "all" in target_classes:
+        return None  # ทุก class
+
     class_ids = []
 
     for cid, name in detector.names.items():
         if name.lower() in target_classes:
             class_ids.append(cid)
 
+    if not class_ids:
+        log.warning(f"No known classes in {target_classes}; nothing will be detected")
     return class_ids
 
 
@@ -94,14 +112,29 @@ def get_video_source(cam):
     return src
 
 
+# ======================
+# Open one camera (run in parallel)
+# ======================
+def open_camera(cam):
+    src = get_video_source(cam)
+    if src is None:
+        return None
+
+    cap = cv2.VideoCapture(src)
+    if not cap.isOpened():
+        log.error(f"Cannot open camera: {cam['name']} source={src}")
+        return None
+
+    cam["cap"] = cap
+    log.info(f"Camera started: {cam['name']} ({cam['protocol']})")
+    return cam
+
+
 # ======================
 # Save annotated frame
 # ======================
-def save_image(cam, detections, frame):
+def save_image(cam, cls_name, frame):
     folder = f"captures/{cam['location']}/"
-    os.makedirs(folder, exist_ok=True)
-
-    cls_id, cls_name, conf, box, track_id = detections[0]
 
     now_th = datetime.now(TH_TZ)
     date_str = now_th.strftime("%Y%m%d")
@@ -110,14 +143,46 @@ def save_image(cam, detections, frame):
     filename = f"{cam['name']}_{cls_name}_{date_str}_{time_str}.jpg"
     filepath = os.path.join(folder, filename)
 
-    cv2.imwrite(filepath, frame)
-    log.info(f"Saved: {filepath}")
+    # encode ที่นี่ แล้วให้ writer เขียนลงดิสก์ใน background
+    ok, jpg = cv2.imencode(".jpg", frame)
+    if ok:
+        get_writer().submit(filepath, jpg.tobytes())
+    else:
+        log.warning(f"Encode failed: {filepath}")
 
     utc_time = datetime.utcnow().replace(tzinfo=UTC_TZ)
 
     return filepath, filename, now_th, utc_time
 
 
+# ======================
+# Save + notify (once per new track)
+# ======================
+def handle_detections(cam, detections, frame):
+    hit = events.check(cam["name"], detections)
+    if not hit:
+        return
+
+    # วาดกรอบเฉพาะเฟรมที่ต้องเซฟจริง
+    reason, i = hit
+    filepath, filename, th_time, utc_time = save_image(cam, detections.label(i), annotate(frame, detections))
+
+    # JSON payload
+    payload = {
+        "camera": cam["name"],
+        "location": cam["location"],
+        "filename": filename,
+        "thai_time": th_time.strftime("%Y-%m-%d %H:%M:%S"),
+        "utc_time": utc_time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+    log.debug(f"Notify payload: {payload}")
+
+    # ส่งผ่าน dispatcher (ไม่ block loop ของกล้อง)
+    if NOTIFY_URL:
+        get_dispatcher().submit(NOTIFY_URL, payload)
+
+
 # ======================
 # Main processing loop
 # ======================
@@ -127,69 +192,67 @@ if __name__ == "__main__":
         log.error("No cameras configured.")
         exit()
 
-    detector = YoloDetector()
+    # โหลดโมเดลใน background ระหว่างเปิดกล้องพร้อมกันหลายตัว
+    model_loader = ThreadPoolExecutor(max_workers=1)
+    detector_future = model_loader.submit(get_detector)
 
-    active_cams = []
-    for cam in cams:
-        src = get_video_source(cam)
-        if src is None:
-            continue
-
-        cap = cv2.VideoCapture(src)
-        if not cap.isOpened():
-            log.error(f"Cannot open camera: {cam['name']} source={src}")
-            continue
-
-        cam["cap"] = cap
-        cam["class_ids"] = get_class_ids(detector, cam["detect_classes"])
-        cam["last_save"] = 0
-
-        active_cams.append(cam)
-        log.info(f"Camera started: {cam['name']} ({cam['protocol']})")
+    with ThreadPoolExecutor(max_workers=max(1, min(CAMERA_START_WORKERS, len(cams)))) as pool:
+        active_cams = [cam for cam in pool.map(open_camera, cams) if cam is not None]
 
     if not active_cams:
         log.error("No working cameras.")
         exit()
 
-    log.info("Headless detection running...")
+    detector = detector_future.result()
+    model_loader.shutdown()
+    for cam in active_cams:
+        cam["class_ids"] = get_class_ids(detector, cam["detect_classes"])
+
+    # warm-up ด้วยขนาดภาพของกล้องแรก (ถ้าอ่านได้) ก่อนเริ่ม loop จริง
+    cap = active_cams[0]["cap"]
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or WARMUP_WIDTH
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or WARMUP_HEIGHT
+    batch = min(len(active_cams), DETECT_BATCH_SIZE) if DETECT_BATCH_SIZE > 1 else 1
+    detector.warmup(width, height, batch)
+
+    if DETECT_BATCH_SIZE > 1:
+        log.info(f"Headless detection running (batched, batch size {DETECT_BATCH_SIZE})...")
+    else:
+        log.info("Headless detection running...")
 
     while True:
-        for cam in active_cams:
-            ret, frame = cam["cap"].read()
-            if not ret:
-                log.warning(f"No frame: {cam['name']}")
-                continue
-
-            annotated, detections = detector.detect(frame, cam["class_ids"])
-
-            if len(detections) == 0:
-                continue
-
-            now = time.time()
-            if now - cam["last_save"] < DETECT_INTERVAL:
-                continue
-
-            filepath, filename, th_time, utc_time = save_image(cam, detections, annotated)
-
-            cam["last_save"] = now
-
-            # JSON payload
-            payload = {
-                "camera": cam["name"],
-                "location": cam["location"],
-                "filename": filename,
-                "thai_time": th_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "utc_time": utc_time.strftime("%Y-%m-%d %H:%M:%S")
-            }
-
-            print("\n======= JSON SENT TO API =======")
-            print(payload)
-            print("================================\n")
-
-            try:
-                res = requests.post(NOTIFY_URL, json=payload, timeout=10)
-                log.info(f"API: {res.status_code}")
-            except Exception as e:
-                log.error(f"API ERROR: {e}")
+        if DETECT_BATCH_SIZE > 1:
+            # เก็บเฟรมล่าสุดจากทุกกล้องก่อน แล้วส่งเข้า YOLO ทีเดียว
+            batch_cams, batch_frames = [], []
+            for cam in active_cams:
+                ret, frame = cam["cap"].read()
+                if not ret:
+                    log.warning(f"No frame: {cam['name']}")
+                    continue
+                if not motion.should_infer(cam, frame):
+                    continue
+                batch_cams.append(cam)
+                batch_frames.append(frame)
+
+            if batch_frames:
+                results = detector.infer_batch(
+                    batch_frames,
+                    [cam["class_ids"] for cam in batch_cams],
+                    batch_size=DETECT_BATCH_SIZE,
+                    cam_ids=[cam["name"] for cam in batch_cams]
+                )
+                for cam, frame, detections in zip(batch_cams, batch_frames, results):
+                    handle_detections(cam, detections, frame)
+        else:
+            for cam in active_cams:
+                ret, frame = cam["cap"].read()
+                if not ret:
+                    log.warning(f"No frame: {cam['name']}")
+                    continue
+                if not motion.should_infer(cam, frame):
+                    continue
+
+                detections = detector.infer(frame, cam["class_ids"], cam_id=cam["name"])
+                handle_detections(cam, detections, frame)
 
         time.sleep(0.01)
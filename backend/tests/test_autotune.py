@@ -0,0 +1,16 @@
+from app.services import autotune as at
+
+
+def test_failing_model_is_skipped(monkeypatch):
+    def fake_benchmark(model_name, imgsz, batch, runs):
+        if model_name == "broken.pt":
+            raise RuntimeError("cannot load")
+        ms = {"n.pt": 10.0, "s.pt": 20.0}[model_name] * imgsz / 320
+        return {"model": model_name, "imgsz": imgsz, "backend": "torch", "batch_ms": ms, "per_frame_ms": ms}
+
+    monkeypatch.setattr(at, "benchmark", fake_benchmark)
+    result = at.autotune(["n.pt", "broken.pt", "s.pt"], [320, 640], cameras=1, target_ms=30.0, save=False)
+    assert [(m["model"], m["imgsz"]) for m in result["measured"]] == [
+        ("n.pt", 320), ("n.pt", 640), ("s.pt", 320), ("s.pt", 640),
+    ]
+    assert (result["model"], result["imgsz"]) == ("s.pt", 320)
@@ -0,0 +1,26 @@
+import time
+
+from app.domain.detections import Detections
+from app.services.broadcast_hub import BroadcastHub, EncodedFrame
+
+
+def _frame(seq: int, inferred: bool) -> EncodedFrame:
+    return EncodedFrame("c1", seq, time.time(), b"", Detections.empty(), inferred)
+
+
+def test_older_frame_is_not_published():
+    hub = BroadcastHub()
+    hub.publish(_frame(3, False))
+    hub.publish(_frame(2, True))           # ผล detect ของเฟรมก่อนหน้ามาช้า
+    assert hub.latest("c1").seq == 3
+    assert hub.last_inferred("c1").seq == 2
+    assert hub.channel("c1").stale == 1
+
+
+def test_last_inferred_only_moves_forward():
+    hub = BroadcastHub()
+    hub.publish(_frame(5, True))
+    hub.publish(_frame(4, True))
+    assert hub.last_inferred("c1").seq == 5
+    hub.publish(_frame(6, True))
+    assert hub.latest("c1").seq == 6 and hub.last_inferred("c1").seq == 6
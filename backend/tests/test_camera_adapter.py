@@ -0,0 +1,53 @@
+import sys
+import time
+
+from app.infrastructure.camera_adapter import FFmpegPipeCapture
+
+# แทน ffmpeg: ส่ง 2 เฟรม 4x2 แล้วจบด้วย exit code 1 พร้อมข้อความ error
+FAKE_FFMPEG = (
+    "import sys; sys.stdout.buffer.write(bytes(4 * 2 * 3) * 2); sys.stdout.flush();"
+    "sys.stderr.write('Connection reset by peer\\n'); sys.exit(1)"
+)
+
+
+def _capture(monkeypatch, **kwargs) -> FFmpegPipeCapture:
+    monkeypatch.setattr(FFmpegPipeCapture, "_command", lambda self: [sys.executable, "-c", FAKE_FFMPEG])
+    return FFmpegPipeCapture("rtsp://cam", width=4, height=2, **kwargs)
+
+
+def _read_until(cap, ok: bool, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        ret, frame = cap.read()
+        if ret == ok:
+            return frame
+        time.sleep(0.01)
+    raise AssertionError(f"read() never returned {ok}")
+
+
+def test_ffmpeg_exit_is_logged_and_restarted(monkeypatch):
+    cap = _capture(monkeypatch, restart_min=0.05, restart_max=0.2)
+    try:
+        assert _read_until(cap, True).shape == (2, 4, 3)
+        _read_until(cap, True)
+        _read_until(cap, False)              # ffmpeg จบ
+        assert cap.restart_at > 0
+        assert cap.isOpened()
+        assert _read_until(cap, True).shape == (2, 4, 3)   # เปิดใหม่หลัง backoff
+        assert cap.restarts == 1
+        assert any("Connection reset" in line for line in cap.stderr_tail)
+    finally:
+        cap.release()
+
+
+def test_restart_waits_for_backoff(monkeypatch):
+    cap = _capture(monkeypatch, restart_min=10, restart_max=10)
+    try:
+        _read_until(cap, True)
+        _read_until(cap, True)
+        _read_until(cap, False)
+        assert cap.read() == (False, None)
+        assert cap.restarts == 0
+    finally:
+        cap.release()
+    assert not cap.isOpened()
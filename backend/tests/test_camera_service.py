@@ -0,0 +1,24 @@
+from app.services import camera_service as cs
+
+
+def _service(tmp_path, monkeypatch) -> cs.CameraService:
+    monkeypatch.setattr(cs, "CAMERAS_JSON", tmp_path / "cameras.json")
+    return cs.CameraService()
+
+
+def test_global_classes_is_not_a_camera(tmp_path, monkeypatch):
+    svc = _service(tmp_path, monkeypatch)
+    cam = svc.add("gate", None, "rtsp", "rtsp://x", None)
+    svc.set_global_classes("person")
+    assert svc.list() == [cam]
+    assert svc.get(cs.GLOBAL_CLASSES_KEY) is None
+    assert not svc.delete(cs.GLOBAL_CLASSES_KEY)
+    assert svc.get_global_classes() == "person"
+
+
+def test_global_classes_survives_reload(tmp_path, monkeypatch):
+    svc = _service(tmp_path, monkeypatch)
+    svc.set_global_classes("car,truck")
+    svc = cs.CameraService()
+    assert svc.list() == []
+    assert svc.get_global_classes() == "car,truck"
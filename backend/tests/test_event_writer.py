@@ -0,0 +1,62 @@
+import threading
+import time
+
+import numpy as np
+
+from app.domain.detections import Detections
+from app.services import event_writer
+from app.services.broadcast_hub import BroadcastHub
+from app.services.detection_service import DetectionService
+from app.services.event_writer import EventWriter
+from app.services.inference_scheduler import InferenceResult
+
+
+class _Worker:
+    running = True
+
+
+class _Streams:
+    workers = {"c1": _Worker()}
+
+
+def _result(seq: int) -> InferenceResult:
+    frame = np.zeros((64, 64, 3), np.uint8)
+    dets = Detections(
+        np.array([[4, 4, 30, 30]], np.float32), np.array([0.9], np.float32),
+        np.array([0], np.int32), np.array([seq], np.int32), {0: "person"},
+    )
+    return InferenceResult("c1", seq, time.time(), frame, dets, True)
+
+
+def test_slow_webhook_does_not_block_process(monkeypatch):
+    release = threading.Event()
+    saved, notified = [], []
+    monkeypatch.setattr(event_writer, "save_frame", lambda loc, fname, jpg: saved.append((loc, jpg[:2])))
+    monkeypatch.setattr(event_writer, "notify_saved", lambda fname, dt: (release.wait(5), notified.append(fname)))
+
+    service = DetectionService(_Streams(), BroadcastHub(), EventWriter(max_queue=8))
+    cam = {"id": "c1", "name": "cam1", "location": "gate"}
+
+    t0 = time.time()
+    for seq in range(1, 4):
+        service.process(cam, _result(seq))   # track ใหม่ทุกเฟรม → event ทุกเฟรม
+    assert time.time() - t0 < 1.0
+
+    release.set()
+    assert service.writer.flush()
+    assert saved and saved[0] == ("gate", b"\xff\xd8")
+    assert len(notified) == len(saved)
+
+
+def test_full_queue_drops_new_events(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(event_writer, "save_frame", lambda *a: release.wait(5))
+    monkeypatch.setattr(event_writer, "notify_saved", lambda *a: None)
+
+    writer = EventWriter(max_queue=1)
+    jobs = [event_writer.EventJob("gate", f"e{i}", None, _result(i), b"jpg") for i in range(4)]
+    accepted = [writer.submit(job) for job in jobs]
+    assert accepted[0] and not all(accepted)
+    assert writer.stats()["dropped"] >= 1
+    release.set()
+    assert writer.flush()
@@ -0,0 +1,92 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from app.domain.detections import Detections
+from app.services.inference_scheduler import InferenceScheduler
+
+
+class StubModel:
+    """inference ช้ากว่ากล้อง เพื่อให้เฟรมที่ไม่ detect มาถึงระหว่างที่ batch ยังไม่เสร็จ"""
+
+    names = {0: "person"}
+
+    def __init__(self, delay: float = 0.02, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+
+    def infer_batch(self, frames, filters, **kwargs):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("boom")
+        return [Detections.empty() for _ in frames]
+
+    def drop_tracker(self, cam_id):
+        pass
+
+
+def _run(model, n_frames: int = 20, detect_every_n: int = 2):
+    sched = InferenceScheduler(model, max_batch=1, queue_depth=2, detect_every_n=detect_every_n, workers=1)
+    published, done = [], threading.Event()
+
+    def on_result(cam, result):
+        published.append((result.seq, result.inferred))
+        if result.seq == n_frames:
+            done.set()
+
+    sched.add_listener(on_result)
+    sched.start()
+    try:
+        cam = {"id": "cam1"}
+        frame = np.zeros((8, 8, 3), np.uint8)
+        for seq in range(1, n_frames + 1):
+            sched.submit(cam, frame, seq)
+            time.sleep(0.005)
+        assert done.wait(2.0)
+    finally:
+        sched.stop()
+    return published
+
+
+def test_frames_published_in_source_order():
+    published = _run(StubModel())
+    seqs = [seq for seq, _ in published]
+    assert seqs == sorted(seqs)
+    assert len(seqs) == len(set(seqs))
+    assert any(inferred for _, inferred in published)
+
+
+def test_failed_batch_is_published_without_detections():
+    published = _run(StubModel(fail=True))
+    seqs = [seq for seq, _ in published]
+    assert seqs == sorted(seqs)
+    assert 20 in seqs                                   # เฟรมของ batch ที่ล้มเหลวไม่หายไป
+    assert not any(inferred for _, inferred in published)
+
+
+class SlowLeasePool(StubModel):
+    """เหมือน DetectorPool: ต้องรอ replica ว่างก่อน inference"""
+
+    @contextmanager
+    def lease(self):
+        time.sleep(0.2)
+        yield StubModel(delay=0.01)
+
+
+class RecordingRate:
+    def __init__(self):
+        self.observed = []
+
+    def observe(self, n_frames, seconds):
+        self.observed.append((n_frames, seconds))
+
+
+def test_rate_observe_excludes_replica_wait():
+    rate = RecordingRate()
+    sched = InferenceScheduler(SlowLeasePool(), max_batch=1, workers=1)
+    sched.rate = rate
+    sched._run_batch([({"id": "cam1"}, 1, np.zeros((8, 8, 3), np.uint8))])
+    [(n_frames, seconds)] = rate.observed
+    assert n_frames == 1 and seconds < 0.15
@@ -0,0 +1,108 @@
+from pathlib import Path
+
+from app.infrastructure import model_backends as mb
+
+
+class FakeYOLO:
+    """แทน ultralytics.YOLO: export เขียนโฟลเดอร์ชื่อเดียวกับที่ ultralytics 8.3 ตั้ง"""
+    exports = []
+
+    def __init__(self, path, task=None):
+        self.path = Path(path)
+        self.ckpt_path = str(path)
+
+    def export(self, **kwargs):
+        FakeYOLO.exports.append(kwargs)
+        int8 = "int8_" if kwargs.get("int8") else ""
+        out = self.path.parent / f"{self.path.stem}_{int8}openvino_model"
+        out.mkdir()
+        (out / "model.xml").write_text("x")
+        return str(out)
+
+
+def _weights(tmp_path, monkeypatch) -> Path:
+    monkeypatch.setattr(mb, "YOLO", FakeYOLO)
+    FakeYOLO.exports = []
+    weights = tmp_path / "tiny.pt"
+    weights.write_bytes(b"weights")
+    return weights
+
+
+def test_int8_export_path_exists_and_is_reused(tmp_path, monkeypatch):
+    weights = _weights(tmp_path, monkeypatch)
+    cache = tmp_path / "cache"
+
+    first = mb.export_model(str(weights), "openvino", 320, True, cache)
+    assert first.name == "tiny_int8_openvino_model"
+    assert (first / "model.xml").exists()
+
+    again = mb.export_model(str(weights), "openvino", 320, True, cache)
+    assert again == first
+    assert len(FakeYOLO.exports) == 1
+
+
+def test_fp32_and_int8_use_separate_cache_entries(tmp_path, monkeypatch):
+    weights = _weights(tmp_path, monkeypatch)
+    cache = tmp_path / "cache"
+
+    int8 = mb.export_model(str(weights), "openvino", 320, True, cache)
+    fp32 = mb.export_model(str(weights), "openvino", 320, False, cache)
+    assert fp32.name == "tiny_openvino_model"
+    assert int8.parent != fp32.parent
+    assert len(FakeYOLO.exports) == 2
+
+
+def test_incomplete_cache_dir_is_replaced(tmp_path, monkeypatch):
+    weights = _weights(tmp_path, monkeypatch)
+    cache = tmp_path / "cache"
+    key = mb.artifact_key(str(weights), weights.resolve(), "openvino", 320, True)
+    (cache / key).mkdir(parents=True)   # โฟลเดอร์ค้างที่ไม่มีผล export
+
+    path = mb.export_model(str(weights), "openvino", 320, True, cache)
+    assert path.exists()
+    assert mb.export_model(str(weights), "openvino", 320, True, cache) == path
+    assert len(FakeYOLO.exports) == 1
+
+
+def test_export_name():
+    assert mb.export_name("m", "onnx", False) == "m.onnx"
+    assert mb.export_name("m", "onnx", True) == "m.onnx"
+    assert mb.export_name("m", "openvino", True) == "m_int8_openvino_model"
+
+
+def test_cpu_without_autotune_uses_small_model(monkeypatch):
+    monkeypatch.setattr(mb, "DEVICE", "cpu")
+    monkeypatch.setattr(mb, "load_autotune", lambda: None)
+    monkeypatch.setattr(mb, "CPU_MODEL_NAME", "yolov8n.pt")
+    monkeypatch.setattr(mb, "MODEL_NAME", "yolov8l.pt")
+    assert mb.select_model()[0] == "yolov8n.pt"
+
+    monkeypatch.setattr(mb, "CPU_MODEL_NAME", "")
+    assert mb.select_model()[0] == "yolov8l.pt"
+
+
+def test_matching_autotune_result_wins(monkeypatch):
+    monkeypatch.setattr(mb, "DEVICE", "cpu")
+    monkeypatch.setattr(mb, "AUTOTUNE_APPLY", True)
+    result = {"model": "yolov8s.pt", "imgsz": 480, "host": mb.host_fingerprint()}
+    monkeypatch.setattr(mb, "load_autotune", lambda: result)
+    assert mb.select_model() == ("yolov8s.pt", 480, "autotune")
+
+
+def test_fingerprint_ignores_torch_thread_setting(monkeypatch):
+    before = mb.host_fingerprint()
+    monkeypatch.setattr(mb.torch, "get_num_threads", lambda: 1)
+    assert mb.host_fingerprint() == before
+
+
+def test_resolve_weights_downloads_without_building_model(tmp_path, monkeypatch):
+    class NoYOLO:
+        def __init__(self, *args, **kwargs):
+            raise AssertionError("YOLO should not be built")
+
+    downloaded = tmp_path / "yolov8n.pt"
+    downloaded.write_bytes(b"weights")
+    monkeypatch.setattr(mb, "YOLO", NoYOLO)
+    monkeypatch.setattr(mb, "attempt_download_asset", lambda name: str(downloaded))
+    monkeypatch.chdir(tmp_path / "..")
+    assert mb._resolve_weights("yolov8n.pt") == downloaded.resolve()
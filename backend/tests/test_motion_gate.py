@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from app.services.motion_gate import MotionGate, min_area_for
+
+W, H = 160, 120
+
+
+def _frame(block=None) -> np.ndarray:
+    """ภาพดำ 160x120 (เท่าความกว้างที่ gate ย่อ) block = (x, y, ขนาด) สี่เหลี่ยมขาว"""
+    frame = np.zeros((H, W, 3), np.uint8)
+    if block is not None:
+        x, y, size = block
+        frame[y:y + size, x:x + size] = 255
+    return frame
+
+
+def _gate(**kwargs) -> MotionGate:
+    opts = dict(enabled=True, width=W, sensitivity=0.5, pixel_delta=25, bg_alpha=0.05,
+                keepalive_seconds=10, hold_seconds=2)
+    opts.update(kwargs)
+    return MotionGate(**opts)
+
+
+CAM = {"id": "c1"}
+
+
+def test_min_area_for_bounds():
+    assert min_area_for(1.0) == pytest.approx(0.0005)
+    assert min_area_for(0.0) == pytest.approx(0.0205)
+    assert min_area_for(5.0) == min_area_for(1.0)      # clamp
+    assert min_area_for(-1.0) == min_area_for(0.0)
+
+
+def test_disabled_gate_always_infers():
+    gate = _gate(enabled=False)
+    assert all(gate.should_infer(CAM, _frame(), now=1000.0 + i) for i in range(3))
+    assert gate.should_infer({"id": "c2", "motion_enabled": False}, _frame(), now=1000.0)
+    assert gate.stats() == {}
+
+
+def test_static_scene_skips_until_keepalive():
+    gate = _gate()
+    assert gate.should_infer(CAM, _frame(), now=1000.0)          # เฟรมแรก = ตั้ง background
+    assert not gate.should_infer(CAM, _frame(), now=1001.0)
+    assert not gate.should_infer(CAM, _frame(), now=1009.9)
+    assert gate.should_infer(CAM, _frame(), now=1010.0)          # keep-alive
+    assert not gate.should_infer(CAM, _frame(), now=1010.5)
+    st = gate.stats()["c1"]
+    assert (st["keepalive"], st["skipped"], st["motion"]) == (1, 3, 0)
+
+
+def test_motion_then_hold_then_skip():
+    gate = _gate()
+    gate.should_infer(CAM, _frame(), now=1000.0)
+    assert gate.should_infer(CAM, _frame((40, 40, 40)), now=1001.0)   # ~8% ของภาพเปลี่ยน
+    assert gate.should_infer(CAM, _frame(), now=1002.5)                # ยังอยู่ใน hold 2 วินาที
+    assert not gate.should_infer(CAM, _frame(), now=1003.5)            # หมด hold
+    assert gate.stats()["c1"]["motion"] == 1
+
+
+def test_sensitivity_threshold():
+    block = (40, 40, 16)        # 256 / 19200 ≈ 1.3% (ระหว่างเกณฑ์ของ sensitivity 0 กับ 1)
+    for sensitivity, expected in ((0.0, False), (1.0, True)):
+        gate = _gate(sensitivity=sensitivity, keepalive_seconds=100)
+        gate.should_infer(CAM, _frame(), now=1000.0)
+        assert gate.should_infer(CAM, _frame(block), now=1001.0) is expected
+
+    # ค่าต่อกล้องแทนค่าของ gate
+    gate = _gate(sensitivity=0.0, keepalive_seconds=100)
+    cam = {"id": "c1", "motion_sensitivity": 1.0}
+    gate.should_infer(cam, _frame(), now=1000.0)
+    assert gate.should_infer(cam, _frame(block), now=1001.0)
+
+
+def test_masked_region_is_ignored():
+    gate = _gate(keepalive_seconds=100)
+    cam = {"id": "c1", "motion_mask": [[[0.0, 0.0], [0.5, 0.0], [0.5, 0.5], [0.0, 0.5]]]}
+    gate.should_infer(cam, _frame(), now=1000.0)
+    assert not gate.should_infer(cam, _frame((10, 10, 30)), now=1001.0)    # อยู่ใน mask
+    assert gate.should_infer(cam, _frame((110, 70, 30)), now=1002.0)       # นอก mask
+
+
+def test_forget_resets_background():
+    gate = _gate()
+    gate.should_infer(CAM, _frame(), now=1000.0)
+    gate.forget("c1")
+    assert gate.stats() == {}
+    assert gate.should_infer(CAM, _frame((40, 40, 40)), now=1001.0)
+    assert gate.stats()["c1"]["motion"] == 0                              # เฟรมแรกหลัง forget
@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+from app.infrastructure.notification_outbox import NotificationOutbox
+
+
+def _outbox(tmp_path, **kwargs) -> NotificationOutbox:
+    return NotificationOutbox(path=tmp_path / "outbox.sqlite3", **kwargs)
+
+
+def test_append_does_not_block_on_locked_database(tmp_path):
+    outbox = _outbox(tmp_path, submit_timeout=0.05)
+    other = sqlite3.connect(str(outbox.path), isolation_level=None)
+    other.execute("BEGIN EXCLUSIVE")   # อีก process ถือ lock อยู่
+
+    t0 = time.time()
+    assert outbox.append("http://x", {"n": 1}) is False
+    assert time.time() - t0 < 1.0
+    assert outbox.pending_count() == 1
+
+    other.execute("COMMIT")
+    outbox.drain_spill()
+    assert list(outbox.spill) == []
+    assert outbox.pending_count() == 1
+    url, items, _attempts = outbox.claim(1, 0)
+    assert url == "http://x" and items[0][1] == {"n": 1}
+
+
+def test_dead_rows_are_capped(tmp_path):
+    outbox = _outbox(tmp_path, dead_max=3, dead_hours=0)
+    for n in range(5):
+        outbox.append("http://x", {"n": n})
+        _url, items, _attempts = outbox.claim(1, 0)
+        outbox.bury([i for i, _ in items])
+    assert outbox.dead_count() == 3
+    assert outbox.pending_count() == 0
+
+
+def test_old_dead_rows_expire(tmp_path):
+    outbox = _outbox(tmp_path, dead_max=0, dead_hours=1)
+    outbox.append("http://x", {"n": 0})
+    outbox.conn.execute("UPDATE outbox SET created = ?", (time.time() - 7200,))
+    outbox.append("http://x", {"n": 1})
+    rows = outbox.conn.execute("SELECT id FROM outbox ORDER BY id").fetchall()
+    outbox.bury([r[0] for r in rows])
+    assert outbox.dead_count() == 1
@@ -0,0 +1,122 @@
+import pytest
+
+from app.services.rate_controller import RateController
+
+
+def _cam(cam_id: str, **kwargs) -> dict:
+    return {"id": cam_id, **kwargs}
+
+
+def test_gated_frame_does_not_consume_detect_slot():
+    rc = RateController(max_fps=1.0)
+    cam = _cam("a")
+    assert rc.due(cam, now=1000.0)
+    # motion gate ตัดเฟรมนี้ทิ้ง (ไม่เรียก queued) → เฟรมถัดไปยังถึงรอบ
+    assert rc.due(cam, now=1000.1)
+    rc.queued("a", now=1000.1)
+    assert not rc.due(cam, now=1000.2)
+    assert rc.due(cam, now=1001.2)
+
+
+def _controller(budget_fps: float, threads: int = 1, **kwargs) -> RateController:
+    """frame_cost ตั้งให้งบรวม (threads / cost * util) เท่ากับ budget_fps"""
+    opts = dict(target_util=1.0, max_fps=15.0, min_fps=0.0, update_seconds=1000.0)
+    opts.update(kwargs)
+    rc = RateController(**opts)
+    rc.set_threads(threads)
+    rc.observe(10, 10 * threads / budget_fps)
+    return rc
+
+
+def _feed(rc: RateController, cams, camera_fps: float = 25.0, start: float = 1000.0, seconds: float = 1.0) -> float:
+    """ส่งเฟรมของทุกกล้องที่ camera_fps (ถึงรอบเมื่อไรก็เข้าคิว) คืนเวลาสุดท้าย"""
+    t = start
+    while t < start + seconds:
+        for cam in cams:
+            if rc.due(cam, now=t):
+                rc.queued(cam["id"], now=t)
+        t += 1.0 / camera_fps
+    return t
+
+
+def _rebalance(rc: RateController, now: float) -> dict:
+    with rc.lock:
+        rc._rebalance(now)
+    return rc.rates
+
+
+def test_budget_split_by_priority():
+    rc = _controller(budget_fps=8.0)
+    cams = [_cam("a", priority=3), _cam("b", priority=1)]
+    now = _feed(rc, cams)
+    rates = _rebalance(rc, now)
+    assert rates["a"] == pytest.approx(6.0)
+    assert rates["b"] == pytest.approx(2.0)
+    assert rc.budget == pytest.approx(8.0)
+
+
+def test_capped_camera_releases_budget_to_others():
+    rc = _controller(budget_fps=10.0, max_fps=4.0)
+    cams = [_cam("a", priority=9), _cam("b", priority=1), _cam("c", priority=1)]
+    rates = _rebalance(rc, _feed(rc, cams))
+    assert rates["a"] == pytest.approx(4.0)           # ชนเพดาน DETECT_MAX_FPS
+    assert rates["b"] == pytest.approx(3.0)           # ส่วนที่เหลือแบ่งเท่ากัน
+    assert rates["c"] == pytest.approx(3.0)
+
+
+def test_camera_fps_caps_its_rate():
+    rc = _controller(budget_fps=20.0)
+    slow, fast = _cam("slow"), _cam("fast")
+    t = 1000.0
+    for i in range(50):                               # slow ส่ง 2 fps, fast 25 fps
+        now = t + i * 0.04
+        if rc.due(fast, now=now):
+            rc.queued("fast", now=now)
+        if i % 12 == 0 and rc.due(slow, now=now):
+            rc.queued("slow", now=now)
+    rates = _rebalance(rc, t + 2.0)
+    assert rates["slow"] == pytest.approx(1 / 0.48)
+    assert rates["fast"] == pytest.approx(15.0)       # DETECT_MAX_FPS
+
+
+def test_min_fps_floor_is_kept_and_rest_redistributed():
+    rc = _controller(budget_fps=10.0)
+    cams = [_cam("a", priority=9), _cam("b", priority=1, min_fps=4)]
+    rates = _rebalance(rc, _feed(rc, cams))
+    assert rates["b"] == pytest.approx(4.0)
+    assert rates["a"] == pytest.approx(6.0)
+
+
+def test_overcommitted_floors_and_zero_share():
+    rc = _controller(budget_fps=1.0, min_fps=1.0)
+    cams = [_cam("a"), _cam("b"), _cam("c", min_fps=0)]
+    rates = _rebalance(rc, _feed(rc, cams))
+    assert rates["a"] == rates["b"] == pytest.approx(1.0)   # min_fps มาก่อนงบ
+    assert rates["c"] == pytest.approx(0.01)                  # ไม่เหลืองบ ยัง detect บ้าง
+
+
+def test_idle_camera_drops_out_of_allocation():
+    rc = _controller(budget_fps=8.0, active_seconds=5.0)
+    a, b = _cam("a"), _cam("b")
+    now = _feed(rc, [a, b])
+    now = _feed(rc, [a], start=now + 10.0)            # b ไม่ได้เข้าคิวเกิน active_seconds
+    rates = _rebalance(rc, now)
+    assert set(rates) == {"a"}
+    assert rates["a"] == pytest.approx(8.0)
+
+
+def test_unallocated_camera_uses_max_fps_until_rebalance():
+    rc = _controller(budget_fps=2.0, max_fps=5.0)
+    cam = _cam("a")
+    assert rc.due(cam, now=1000.0)
+    rc.queued("a", now=1000.0)
+    assert not rc.due(cam, now=1000.1)
+    assert rc.due(cam, now=1000.2)                    # 1 / 5 fps
+
+
+def test_forget_clears_camera_state():
+    rc = _controller(budget_fps=8.0)
+    _rebalance(rc, _feed(rc, [_cam("a")]))
+    rc.forget("a")
+    assert "a" not in rc.rates and "a" not in rc.last_detect
+    assert rc.due(_cam("a"), now=2000.0)
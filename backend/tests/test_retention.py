@@ -0,0 +1,58 @@
+import os
+import time
+
+from app.infrastructure import file_storage
+from app.infrastructure.retention import RetentionEngine, RetentionPolicy
+
+
+def _jpg(d, name, mtime):
+    d.mkdir(parents=True, exist_ok=True)
+    p = d / name
+    p.write_bytes(b"x" * 10)
+    os.utime(p, (mtime, mtime))
+    return p
+
+
+def _drain(engine):
+    while not engine.deletions.empty():
+        engine.deletions.get().unlink(missing_ok=True)
+
+
+def test_folder_is_scanned_on_first_use(tmp_path):
+    _jpg(tmp_path / "a", "old.jpg", 100)
+    _jpg(tmp_path / "b", "other.jpg", 100)
+    engine = RetentionEngine(root=tmp_path, policy=RetentionPolicy(max_files=5), overrides={})
+
+    assert [p.name for p in engine.list("a")] == ["old.jpg"]
+    assert set(engine.indexes) == {"a"}
+
+
+def test_file_written_before_first_scan_is_not_counted_twice(tmp_path):
+    engine = RetentionEngine(root=tmp_path, policy=RetentionPolicy(max_files=5), overrides={})
+    p = _jpg(tmp_path / "a", "new.jpg", time.time())
+    engine.add("a", p, 10)
+    assert len(engine.index("a").heap) == 1
+    assert engine.index("a").total_bytes == 10
+
+
+def test_unpruned_add_does_not_disable_policy(tmp_path):
+    engine = RetentionEngine(root=tmp_path, policy=RetentionPolicy(max_files=2), overrides={})
+    for i in range(3):
+        p = _jpg(tmp_path / "a", f"keep{i}.jpg", 100 + i)
+        engine.add("a", p, 10, mtime=100 + i, enforce=False)
+    assert len(engine.list("a")) == 3
+
+    p = _jpg(tmp_path / "a", "normal.jpg", 200)
+    engine.add("a", p, 10, mtime=200)
+    _drain(engine)
+    assert [p.name for p in engine.list("a")] == ["keep2.jpg", "normal.jpg"]
+    assert sorted(p.name for p in (tmp_path / "a").glob("*.jpg")) == ["keep2.jpg", "normal.jpg"]
+
+
+def test_headless_writes_do_not_touch_retention(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_storage, "_retention", None)
+    writer = file_storage.StorageWriter(on_written=file_storage._on_written)
+    writer.submit(tmp_path / "x.jpg", b"jpg")
+    assert writer.flush()
+    writer.close()
+    assert file_storage._retention is None
@@ -0,0 +1,90 @@
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+from app.domain.roi import Roi, RoiCache, parse_roi
+from app.infrastructure.yolo_model import crop_to_roi, map_to_frame
+
+TRIANGLE = [[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]]   # ครึ่งซ้ายบนของภาพ (เส้นทแยง x + y = 1)
+
+
+def test_parse_roi_accepts_rects_and_polygons():
+    roi = parse_roi([[0.1, 0.2, 0.3, 0.4], TRIANGLE])
+    assert len(roi.polygons) == 2
+    assert roi.polygons[0].tolist() == np.array([[0.1, 0.2], [0.3, 0.2], [0.3, 0.4], [0.1, 0.4]], np.float32).tolist()
+    assert roi.polygons[1].dtype == np.float32
+
+
+def test_parse_roi_skips_invalid_entries_and_clips():
+    roi = parse_roi(["bad", [[0, 0], [1, 0]], [[-1, -1], [2, 0], [0, 2]]])
+    assert len(roi.polygons) == 1                       # string / polygon 2 จุด ถูกข้าม
+    assert roi.polygons[0].min() == 0.0 and roi.polygons[0].max() == 1.0
+    assert parse_roi(None) is None
+    assert parse_roi([]) is None
+    assert parse_roi(["bad"]) is None
+
+
+def test_crop_box_pads_and_clamps():
+    roi = parse_roi([[0.25, 0.25, 0.75, 0.75]])
+    assert Roi(roi.polygons, pad=0.0).crop_box(100, 100) == (25, 25, 75, 75)
+    assert roi.crop_box(100, 100) == (23, 23, 77, 77)
+    assert parse_roi([[0.0, 0.0, 1.0, 1.0]]).crop_box(100, 50) == (0, 0, 100, 50)
+
+
+def test_crop_box_degenerate_uses_full_frame():
+    roi = Roi((np.array([[0.5, 0.5], [0.5, 0.5], [0.5, 0.5]], np.float32),), pad=0.0)
+    assert roi.crop_box(100, 100) == (0, 0, 100, 100)
+
+
+def test_contains_union_of_polygons():
+    roi = parse_roi([TRIANGLE, [0.8, 0.8, 1.0, 1.0]])
+    points = np.array([[10, 10], [90, 90], [60, 60], [85, 10]], np.float32)
+    assert roi.contains(points, 100, 100).tolist() == [True, True, False, True]
+    assert roi.contains(np.zeros((0, 2), np.float32), 100, 100).shape == (0,)
+
+
+def test_roi_cache_reparses_only_on_change():
+    cache = RoiCache()
+    cam = {"id": "c1", "roi": [[0.1, 0.1, 0.5, 0.5]]}
+    first = cache.for_camera(cam)
+    assert cache.for_camera(cam) is first
+    cam["roi"][0][2] = 0.9                              # แก้ list เดิมในที่ (ต้องเห็นการเปลี่ยน)
+    changed = cache.for_camera(cam)
+    assert changed is not first
+    assert changed.polygons[0][:, 0].max() == np.float32(0.9)
+    cache.invalidate("c1")
+    assert cache.for_camera({"id": "c1"}) is None
+
+
+def _result(crop: np.ndarray, boxes) -> Results:
+    return Results(orig_img=crop, path="", names={0: "person"}, boxes=torch.tensor(boxes, dtype=torch.float32))
+
+
+def test_crop_and_map_back_to_full_frame():
+    frame = np.zeros((100, 200, 3), np.uint8)
+    roi = Roi(parse_roi([[0.5, 0.5, 1.0, 1.0]]).polygons, pad=0.0)
+    crop, offset = crop_to_roi(frame, roi)
+    assert crop.shape == (50, 100, 3) and offset == (100, 50)
+    assert crop.flags["C_CONTIGUOUS"]
+
+    mapped = map_to_frame(_result(crop, [[10, 10, 30, 20, 0.9, 0]]), frame, offset, roi)
+    assert mapped.orig_shape == (100, 200)
+    assert mapped.boxes.xyxy.tolist() == [[110.0, 60.0, 130.0, 70.0]]
+
+
+def test_map_drops_boxes_centred_outside_polygon():
+    frame = np.zeros((100, 100, 3), np.uint8)
+    roi = Roi(parse_roi([TRIANGLE]).polygons, pad=0.0)
+    crop, offset = crop_to_roi(frame, roi)
+    assert offset == (0, 0)
+    boxes = [[0, 0, 20, 20, 0.9, 0], [70, 70, 90, 90, 0.8, 0]]   # กึ่งกลาง (10,10) ใน, (80,80) นอก
+    mapped = map_to_frame(_result(crop, boxes), frame, offset, roi)
+    assert mapped.boxes.xyxy.tolist() == [[0.0, 0.0, 20.0, 20.0]]
+
+
+def test_no_roi_is_passthrough():
+    frame = np.zeros((10, 10, 3), np.uint8)
+    crop, offset = crop_to_roi(frame, None)
+    assert crop is frame and offset == (0, 0)
+    result = _result(frame, [[1, 1, 2, 2, 0.5, 0]])
+    assert map_to_frame(result, frame, offset, None) is result
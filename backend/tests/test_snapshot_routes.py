@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import detection_routes as routes
+from app.domain.detections import Detections
+from app.services.broadcast_hub import BroadcastHub, EncodedFrame
+
+
+@pytest.fixture
+def client(monkeypatch):
+    cams = [{"id": "c1", "name": "c1"}]
+    monkeypatch.setattr(routes.camera_service, "get", lambda cam_id: next((c for c in cams if c["id"] == cam_id), None))
+    monkeypatch.setattr(routes.camera_service, "list", lambda: cams)
+    monkeypatch.setattr(routes, "hub", BroadcastHub())
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api")
+    return TestClient(app)
+
+
+def _publish(n_boxes: int):
+    boxes = np.tile(np.array([[1, 1, 20, 20]], np.float32), (n_boxes, 1))
+    dets = Detections(
+        boxes, np.full(n_boxes, 0.5, np.float32), np.zeros(n_boxes, np.int32),
+        np.arange(n_boxes, dtype=np.int32), {0: "person"},
+    )
+    frame = np.zeros((48, 64, 3), np.uint8)
+    routes.hub.publish(EncodedFrame("c1", 1, time.time(), b"", dets, True, width=64, height=48, frame=frame))
+
+
+def test_busy_frame_keeps_headers_small(client):
+    _publish(500)
+    r = client.get("/api/snapshot/c1")
+    assert r.status_code == 200 and r.headers["content-type"] == "image/jpeg"
+    assert r.headers["x-detections"] == "500"
+    assert sum(len(k) + len(v) for k, v in r.headers.items()) < 1024
+
+
+def test_meta_returns_full_detections_with_etag(client):
+    _publish(2)
+    r = client.get("/api/snapshot/c1?meta=1")
+    assert r.json()["detections"]["labels"] == ["person", "person"]
+    assert client.get("/api/snapshot/c1?meta=1", headers={"If-None-Match": r.headers["etag"]}).status_code == 304
+    assert r.headers["etag"] != client.get("/api/snapshot/c1").headers["etag"]
+
+
+def test_no_frame_yet(client):
+    assert client.get("/api/snapshot/c1").status_code == 503
+    assert client.get("/api/snapshot/missing").status_code == 404
+
+
+def test_global_classes_entry_is_not_listed(tmp_path, monkeypatch):
+    from app.services import camera_service as cs
+
+    monkeypatch.setattr(cs, "CAMERAS_JSON", tmp_path / "cameras.json")
+    monkeypatch.setattr(routes, "camera_service", cs.CameraService())
+    monkeypatch.setattr(routes, "hub", BroadcastHub())
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api")
+    client = TestClient(app)
+
+    cam = routes.camera_service.add("gate", None, "rtsp", "rtsp://x", None)
+    assert client.post("/api/classes", json={"detect_classes": "person"}).status_code == 200
+    r = client.get("/api/cameras")
+    assert r.status_code == 200 and [c["id"] for c in r.json()] == [cam["id"]]
+    r = client.get("/api/snapshots")
+    assert r.status_code == 200
+    assert [c["cam_id"] for c in r.json()["cameras"]] == [cam["id"]]
@@ -0,0 +1,23 @@
+import React, { useEffect, useRef } from 'react'
+import useCameraStream from '../hooks/useCameraStream.js'
+import useDetections from '../hooks/useDetections.js'
+import drawBoundingBoxes from '../utils/drawBoundingBoxes.js'
+
+// ภาพดิบจาก /ws/video (ย่อ + จำกัด fps ที่ server) + วาดกรอบเองที่ browser จาก /ws/detections
+export default function CameraView({ cam }) {
+  const videoRef = useRef(null)
+  const overlayRef = useRef(null)
+  useCameraStream(cam.id, videoRef, { fps: 10, width: 640, raw: true })
+  const record = useDetections(cam.id)
+
+  useEffect(() => {
+    drawBoundingBoxes(overlayRef.current, record)
+  }, [record])
+
+  return (
+    <div className="stream-layer">
+      <canvas ref={videoRef} className="stream-video" />
+      <canvas ref={overlayRef} className="stream-overlay" />
+    </div>
+  )
+}
@@ -1,4 +1,5 @@
 import React, { useEffect, useState } from 'react'
+import CameraView from './CameraView.jsx'
 import '../styles/DetectionUI.css'
 
 const protoOptions = [
@@ -91,7 +92,7 @@ export default function DetectionUI() {
                 <button onClick={() => delCam(c.id)}>ลบ</button>
               </div>
               <div className="stream-box">
-                <img src={c.stream_url} alt={c.name} />
+                <CameraView cam={c} />
               </div>
               <div className="muted">Protocol: {c.protocol} • Classes: {c.detect_classes || '(ไม่ตั้งค่า)'}</div>
             </div>
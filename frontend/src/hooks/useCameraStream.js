@@ -1 +1,54 @@
-// reserved for future websocket/HLS enhancements
+import { useEffect, useState } from 'react'
+
+// วิดีโอแบบ binary จาก /ws/video/{camId} วาดลง canvas
+// ack ทุกเฟรมหลังวาดเสร็จ server จะส่งเฟรมถัดไปเมื่อ browser พร้อมเท่านั้น (เน็ตช้า = ข้ามเฟรม ไม่ค้างสะสม)
+export default function useCameraStream(camId, canvasRef, { fps = 10, width = 0, raw = false } = {}) {
+  const [header, setHeader] = useState(null)
+
+  useEffect(() => {
+    if (!camId) return
+    const proto = window.location.protocol === 'https:' ? 'wss' : 'ws'
+    const query = new URLSearchParams({ fps, width, raw: raw ? 1 : 0 })
+    const url = `${proto}://${window.location.host}/ws/video/${camId}?${query}`
+    let ws = null
+    let retry = null
+    let closed = false
+
+    const onFrame = async buf => {
+      // [ความยาว header 4 ไบต์][header JSON][JPEG]
+      const n = new DataView(buf).getUint32(0)
+      const head = JSON.parse(new TextDecoder().decode(new Uint8Array(buf, 4, n)))
+      try {
+        const bitmap = await createImageBitmap(new Blob([new Uint8Array(buf, 4 + n)], { type: 'image/jpeg' }))
+        const canvas = canvasRef.current
+        if (canvas) {
+          if (canvas.width !== bitmap.width) canvas.width = bitmap.width
+          if (canvas.height !== bitmap.height) canvas.height = bitmap.height
+          canvas.getContext('2d').drawImage(bitmap, 0, 0)
+        }
+        bitmap.close()
+        setHeader(head)
+      } finally {
+        if (ws && ws.readyState === WebSocket.OPEN) ws.send(JSON.stringify({ ack: head.seq }))
+      }
+    }
+
+    const connect = () => {
+      ws = new WebSocket(url)
+      ws.binaryType = 'arraybuffer'
+      ws.onmessage = e => onFrame(e.data)
+      ws.onclose = () => {
+        if (!closed) retry = setTimeout(connect, 2000)
+      }
+    }
+    connect()
+
+    return () => {
+      closed = true
+      clearTimeout(retry)
+      if (ws) ws.close()
+    }
+  }, [camId, canvasRef, fps, width, raw])
+
+  return header
+}
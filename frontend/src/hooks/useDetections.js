@@ -0,0 +1,32 @@
+import { useEffect, useState } from 'react'
+
+// ผล detect ล่าสุดของกล้องจาก /ws/detections/{camId} (ต่อใหม่อัตโนมัติเมื่อหลุด)
+export default function useDetections(camId) {
+  const [record, setRecord] = useState(null)
+
+  useEffect(() => {
+    if (!camId) return
+    const proto = window.location.protocol === 'https:' ? 'wss' : 'ws'
+    const url = `${proto}://${window.location.host}/ws/detections/${camId}`
+    let ws = null
+    let retry = null
+    let closed = false
+
+    const connect = () => {
+      ws = new WebSocket(url)
+      ws.onmessage = e => setRecord(JSON.parse(e.data))
+      ws.onclose = () => {
+        if (!closed) retry = setTimeout(connect, 2000)
+      }
+    }
+    connect()
+
+    return () => {
+      closed = true
+      clearTimeout(retry)
+      if (ws) ws.close()
+    }
+  }, [camId])
+
+  return record
+}
@@ -1 +1,37 @@
-// ทำที่ backend แล้ว
+// วาดกรอบจากผล /ws/detections ลงบน canvas ที่ซ้อนอยู่บนภาพ
+// canvas ใช้ความละเอียดเท่าเฟรมต้นทาง (record.w x record.h) แล้วให้ CSS ย่อ/ขยายตามภาพ
+
+const TRACKED_COLOR = 'rgb(0, 255, 0)'
+const UNTRACKED_COLOR = 'rgb(0, 0, 255)'
+
+export default function drawBoundingBoxes(canvas, record) {
+  if (!canvas) return
+  const ctx = canvas.getContext('2d')
+
+  if (!record || !record.w || !record.h) {
+    ctx.clearRect(0, 0, canvas.width, canvas.height)
+    return
+  }
+  if (canvas.width !== record.w) canvas.width = record.w
+  if (canvas.height !== record.h) canvas.height = record.h
+  ctx.clearRect(0, 0, canvas.width, canvas.height)
+
+  // ขนาดเส้น/ตัวอักษรเทียบกับขนาดเฟรม เหมือนที่ backend วาด
+  const base = Math.min(record.w, record.h)
+  const lineWidth = Math.max(1, Math.round(base / 500))
+  const fontSize = Math.max(12, Math.round(base / 30))
+  ctx.lineWidth = lineWidth
+  ctx.font = `${fontSize}px sans-serif`
+  ctx.textBaseline = 'bottom'
+
+  record.boxes.forEach(([x1, y1, x2, y2], i) => {
+    const track = record.track[i]
+    const color = track >= 0 ? TRACKED_COLOR : UNTRACKED_COLOR
+    const label = `${record.labels[i]} ${track >= 0 ? track : '-'} ${record.conf[i].toFixed(2)}`
+
+    ctx.strokeStyle = color
+    ctx.strokeRect(x1, y1, x2 - x1, y2 - y1)
+    ctx.fillStyle = color
+    ctx.fillText(label, x1 + 2, Math.max(fontSize, y1 - 4))
+  })
+}